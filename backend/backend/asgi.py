@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# serve the upload, history and report endpoints from async views
+os.environ.setdefault('EQUIPMENT_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'equipment.instrumentation.TimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -137,3 +139,75 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Process-local cache. With several worker processes use a shared backend
+# (e.g. FileBasedCache or Redis) so the equipment caches stay consistent.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Equipment app
+
+# Rows per chunk when streaming an uploaded CSV into the dataset summary.
+EQUIPMENT_INGEST_CHUNK_SIZE = 50_000
+
+# CSV parser: "pyarrow", "c" (pandas) or "auto" to use pyarrow when installed.
+EQUIPMENT_CSV_ENGINE = "auto"
+
+# Rendered PDF reports are cached here, least recently used evicted past the cap.
+EQUIPMENT_REPORT_CACHE_DIR = BASE_DIR / 'report_cache'
+EQUIPMENT_REPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Parsed rows of every upload, memory-mapped on read (see equipment/row_store.py).
+# FORMAT: "arrow" (Arrow IPC, needs pyarrow), "npy" (raw numpy columns) or "auto".
+EQUIPMENT_ROW_STORE_DIR = BASE_DIR / 'row_store'
+EQUIPMENT_ROW_STORE_FORMAT = 'auto'
+
+# Comparison PDFs are built in memory up to this size, then spooled to a temp file.
+EQUIPMENT_REPORT_SPOOL_BYTES = 1024 * 1024
+
+# Report charts: "vector" draws them with reportlab.graphics, "raster" embeds
+# matplotlib PNGs (the pre-vector output, kept for comparison).
+EQUIPMENT_REPORT_CHARTS = 'vector'
+
+# Pool for background report jobs (/api/report/<id>/?async=1) and bulk exports
+# (/api/report/export/?ids=...): "process" or "thread", one worker per core.
+EQUIPMENT_REPORT_JOB_BACKEND = 'process'
+EQUIPMENT_REPORT_JOB_WORKERS = os.cpu_count() or 1
+
+# Dataset retention, applied after every upload and by `manage.py prune_datasets`.
+# MAX_COUNT keeps the newest N overall, MAX_AGE (timedelta) drops older uploads,
+# PER_USER_QUOTA keeps the newest N per uploader. None disables a rule.
+EQUIPMENT_RETENTION = {
+    'MAX_COUNT': 5,
+    'MAX_AGE': None,
+    'PER_USER_QUOTA': None,
+}
+
+# Default page size of /api/history/ (?limit= overrides, up to 100).
+EQUIPMENT_HISTORY_PAGE_SIZE = 5
+
+# Server-Timing headers and /api/metrics/ for the upload, history and report
+# endpoints. When False the middleware is not loaded at all.
+EQUIPMENT_INSTRUMENTATION = True
+
+# /api/metrics/ is for staff users (JWT), or for a scraper that sends
+# "Authorization: Bearer <token>" with this token. Unset, only staff can read it.
+EQUIPMENT_METRICS_TOKEN = os.environ.get('EQUIPMENT_METRICS_TOKEN') or None
+
+# Async upload, history and report views. backend/asgi.py turns them on;
+# set EQUIPMENT_ASYNC_VIEWS=0 in the environment to serve the sync views there.
+EQUIPMENT_ASYNC_VIEWS = os.environ.get('EQUIPMENT_ASYNC_VIEWS') == '1'
+
+# Thread pool for the async views' parsing and PDF rendering. Calls beyond
+# WORKERS + QUEUE in flight are answered 503 with Retry-After. More workers
+# than cores only slows the event loop down (see benchmarks/bench_asgi.py).
+EQUIPMENT_ASYNC_WORKERS = os.cpu_count() or 1
+EQUIPMENT_ASYNC_QUEUE = 16
+
+# History pages and datasets looked up by id are cached in this cache and
+# invalidated by Dataset signals (see equipment/dataset_cache.py).
+EQUIPMENT_CACHE_ALIAS = 'default'
+EQUIPMENT_CACHE_TIMEOUT = 3600
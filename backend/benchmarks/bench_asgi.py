@@ -0,0 +1,232 @@
+"""
+Mixed-workload latency under WSGI, ASGI with the sync views, and ASGI with the async views.
+
+    python -m benchmarks.bench_asgi --duration 20 --uploaders 4 --rows 200000
+
+Each setup gets a real server process on a fresh database: ``manage.py
+runserver`` (threaded WSGI), then uvicorn on ``backend.asgi`` with
+``EQUIPMENT_ASYNC_VIEWS=0`` and with it on. Clients then run
+concurrently for ``--duration`` seconds over HTTP:
+
+- uploaders post distinct CSVs of ``--rows`` rows, back to back;
+- one reporter downloads the PDF of each new dataset (a cold render);
+- history clients poll ``/api/history/`` to measure the cheap path.
+
+The table shows per-endpoint request counts, p50/p99 latency and 503s
+(a saturated CPU pool, async views only). uvicorn is not a requirement of
+the app; without it only the WSGI setup runs.
+"""
+import argparse
+import importlib.util
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from .datagen import make_csv
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+USERNAME, PASSWORD = "bench", "bench-password"
+
+UVICORN = [sys.executable, "-m", "uvicorn", "backend.asgi:application", "--log-level", "warning"]
+SETUPS = {
+    "wsgi": (["manage.py", "runserver", "--noreload"], {}),
+    "asgi-sync": (UVICORN, {"EQUIPMENT_ASYNC_VIEWS": "0"}),
+    "asgi-async": (UVICORN, {"EQUIPMENT_ASYNC_VIEWS": "1"}),
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(samples, q):
+    if not samples:
+        return float("nan")
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1] if len(samples) > 1 else samples[0]
+
+
+class Server:
+    """One server process on its own database, with a user to log in as."""
+
+    def __init__(self, name):
+        self.name = name
+        self.tmp = tempfile.mkdtemp(prefix=f"bench-{name}-")
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "benchmarks.server_settings",
+            "BENCH_DATABASE": os.path.join(self.tmp, "db.sqlite3"),
+            "BENCH_REPORT_CACHE_DIR": os.path.join(self.tmp, "reports"),
+        }
+        self.process = None
+
+    def manage(self, *args):
+        subprocess.run(
+            [sys.executable, "manage.py", *args], cwd=BACKEND_DIR, env=self.env,
+            check=True, stdout=subprocess.DEVNULL,
+        )
+
+    def start(self):
+        self.manage("migrate")
+        self.manage(
+            "shell", "-c",
+            f"from django.contrib.auth.models import User; "
+            f"User.objects.create_user({USERNAME!r}, password={PASSWORD!r})",
+        )
+
+        command, extra_env = SETUPS[self.name]
+        if command is UVICORN:
+            command = command + ["--port", str(self.port)]
+        else:
+            command = [sys.executable] + command + [f"127.0.0.1:{self.port}"]
+        self.process = subprocess.Popen(
+            command, cwd=BACKEND_DIR, env={**self.env, **extra_env},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                requests.get(f"{self.url}/api/history/", timeout=1)
+                return
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        raise RuntimeError(f"{self.name} server did not start")
+
+    def token(self):
+        res = requests.post(f"{self.url}/api/token/", data={"username": USERNAME, "password": PASSWORD})
+        res.raise_for_status()
+        return res.json()["access"]
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.rejected = {}
+
+    def add(self, endpoint, seconds, status):
+        with self.lock:
+            if status == 503:
+                self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+            else:
+                self.latencies.setdefault(endpoint, []).append(seconds)
+
+
+def _timed(results, endpoint, send):
+    start = time.perf_counter()
+    res = send()
+    results.add(endpoint, time.perf_counter() - start, res.status_code)
+    return res
+
+
+def run_load(server, args, base_csv):
+    headers = {"Authorization": f"Bearer {server.token()}"}
+    results = Results()
+    deadline = time.monotonic() + args.duration
+    counter = iter(range(10**9))
+    counter_lock = threading.Lock()
+
+    def upload_loop():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            with counter_lock:
+                n = next(counter)
+            # one extra row keeps every upload distinct, past the dedupe check
+            body = base_csv + f"Unique-{n},Pump,{n % 97 + 1},5.0,100.0\n".encode()
+            res = _timed(results, "upload", lambda: session.post(
+                f"{server.url}/api/upload/", headers=headers,
+                files={"file": (f"plant-{n}.csv", body, "text/csv")},
+            ))
+            if res.status_code == 503:
+                time.sleep(float(res.headers.get("Retry-After", 1)))
+
+    def report_loop():
+        session, seen = requests.Session(), set()
+        while time.monotonic() < deadline:
+            res = session.get(f"{server.url}/api/history/?fields=id&limit=20", headers=headers)
+            fresh = [d["id"] for d in res.json() if d["id"] not in seen] if res.ok else []
+            if not fresh:
+                time.sleep(0.1)
+                continue
+            seen.add(fresh[0])
+            _timed(results, "report", lambda: session.get(f"{server.url}/api/report/{fresh[0]}/"))
+
+    def history_loop():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            _timed(results, "history", lambda: session.get(f"{server.url}/api/history/", headers=headers))
+            time.sleep(args.history_interval)
+
+    threads = (
+        [threading.Thread(target=upload_loop) for _ in range(args.uploaders)]
+        + [threading.Thread(target=report_loop)]
+        + [threading.Thread(target=history_loop) for _ in range(args.history_clients)]
+    )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--uploaders", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--history-clients", type=int, default=4)
+    parser.add_argument("--history-interval", type=float, default=0.05)
+    parser.add_argument("--async-workers", type=int, help="EQUIPMENT_ASYNC_WORKERS for the async views.")
+    parser.add_argument("--only", choices=SETUPS, action="append", help="Run only these setups.")
+    args = parser.parse_args()
+
+    setups = args.only or list(SETUPS)
+    if importlib.util.find_spec("uvicorn") is None:
+        print("uvicorn is not installed; running the WSGI setup only\n")
+        setups = [name for name in setups if name == "wsgi"]
+
+    if args.async_workers:
+        os.environ["BENCH_ASYNC_WORKERS"] = str(args.async_workers)
+
+    base_csv = make_csv(args.rows)
+    print(
+        f"{args.uploaders} uploaders x {args.rows} rows, 1 reporter, "
+        f"{args.history_clients} history clients, {args.duration:.0f}s\n"
+    )
+    print(f"{'setup':<12}{'endpoint':<10}{'requests':>10}{'p50':>11}{'p99':>11}{'503s':>7}")
+    for name in setups:
+        server = Server(name)
+        try:
+            server.start()
+            results = run_load(server, args, base_csv)
+        finally:
+            server.stop()
+        for endpoint in ("history", "upload", "report"):
+            samples = results.latencies.get(endpoint, [])
+            print(
+                f"{name:<12}{endpoint:<10}{len(samples):>10}"
+                f"{_percentile(samples, 50) * 1000:>9.0f}ms{_percentile(samples, 99) * 1000:>9.0f}ms"
+                f"{results.rejected.get(endpoint, 0):>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
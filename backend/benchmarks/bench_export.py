@@ -0,0 +1,114 @@
+"""
+Bulk ZIP export wall time vs. one report request per dataset.
+
+    python -m benchmarks.bench_export --datasets 24 --workers 1 2 4
+
+Every run starts from a cold report cache. "serial" downloads
+GET /api/report/<id>/ for each dataset in turn, the way a client had to
+before the export endpoint existed. "export" is one GET
+/api/report/export/?ids=... with the process pool at each ``--workers``
+size. It reports the wall time and the time to the first archive byte,
+which shows that the archive streams while the remaining reports render.
+Both paths render one report untimed first, so neither pays for
+starting up (imports, fonts, spawning the pool's processes).
+"""
+import argparse
+import time
+
+from .harness import client_for, create_test_database, make_user, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from equipment import jobs, report_cache  # noqa: E402
+from equipment.models import Dataset  # noqa: E402
+
+SUMMARY = {
+    "count": 15,
+    "avg_flowrate": 98.5,
+    "avg_pressure": 6.3,
+    "avg_temperature": 118.2,
+    "type_distribution": {"Pump": 5, "Valve": 4, "Compressor": 3, "Reactor": 3},
+}
+
+
+def cold(datasets):
+    for dataset in datasets:
+        report_cache.invalidate(dataset.id)
+
+
+def serial(client, datasets):
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for dataset in datasets:
+        res = client.get(f"/api/report/{dataset.id}/")
+        for chunk in res.streaming_content:
+            first = first or time.perf_counter()
+            size += len(chunk)
+    return time.perf_counter() - start, first - start, size
+
+
+def export(client, datasets):
+    ids = ",".join(str(d.id) for d in datasets)
+    start = time.perf_counter()
+    first = None
+    size = 0
+    res = client.get(f"/api/report/export/?ids={ids}")
+    for chunk in res.streaming_content:
+        first = first or time.perf_counter()
+        size += len(chunk)
+    return time.perf_counter() - start, first - start, size
+
+
+def warm_pool(workers):
+    # processes are spawned on demand, so keep every one of them busy once
+    dataset = Dataset(id=0, name="warmup", summary=SUMMARY, uploaded_at=None)
+    for future in [jobs.render(dataset, f"warmup{i}") for i in range(workers * 2)]:
+        future.result()
+    report_cache.invalidate(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--datasets", type=int, default=24)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--backend", choices=["process", "thread"], default=None)
+    args = parser.parse_args()
+
+    if args.backend:
+        settings.EQUIPMENT_REPORT_JOB_BACKEND = args.backend
+
+    teardown = create_test_database()
+    try:
+        client = client_for(make_user())
+        datasets = [
+            Dataset.objects.create(name=f"bench-{i}.csv", summary=SUMMARY)
+            for i in range(args.datasets)
+        ]
+
+        print(f"{args.datasets} reports, cold cache\n")
+        print(f"{'mode':<10}{'workers':>8}{'wall':>10}{'first byte':>12}{'size':>10}")
+
+        serial(client, datasets[:1])  # fonts and chart modules, in this process
+        cold(datasets)
+        wall, first, size = serial(client, datasets)
+        print(f"{'serial':<10}{'-':>8}{wall:>9.2f}s{first * 1000:>10.0f}ms{size / 1024:>8.0f}KB")
+
+        for workers in args.workers:
+            jobs.shutdown()
+            settings.EQUIPMENT_REPORT_JOB_WORKERS = workers
+            warm_pool(workers)
+            cold(datasets)
+            wall, first, size = export(client, datasets)
+            print(f"{'export':<10}{workers:>8}{wall:>9.2f}s{first * 1000:>10.0f}ms{size / 1024:>8.0f}KB")
+
+        cold(datasets)
+    finally:
+        jobs.shutdown()
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Parse-time and memory comparison for the equipment CSV readers.
+
+    python -m benchmarks.bench_parse --rows 1000000
+
+Compares the old ``pd.read_csv(file)`` call against the projected, typed
+reader in ``equipment.parsing`` for each available engine.
+"""
+import argparse
+import gc
+import io
+import time
+import tracemalloc
+
+import pandas as pd
+
+from .datagen import make_csv
+from .harness import setup_django
+
+setup_django()
+
+from equipment import parsing  # noqa: E402
+
+
+def legacy(data):
+    return pd.read_csv(io.BytesIO(data))
+
+
+def measure(fn, data, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        df = fn(data)
+        times.append(time.perf_counter() - start)
+        del df
+
+    gc.collect()
+    tracemalloc.start()
+    df = fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    return min(times), peak, frame_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_csv(args.rows)
+    print(f"{args.rows} rows, {len(data) / 2**20:.1f} MiB of CSV\n")
+
+    candidates = [("pd.read_csv(file)", legacy)]
+    engines = ["c"] + (["pyarrow"] if parsing.pa_csv is not None else [])
+    for engine in engines:
+        candidates.append((
+            f"read_equipment_csv[{engine}]",
+            lambda d, engine=engine: parsing.read_equipment_csv(io.BytesIO(d), engine=engine),
+        ))
+
+    print(f"{'reader':<30}{'best time':>12}{'py peak':>12}{'frame':>12}")
+    baseline = None
+    for name, fn in candidates:
+        seconds, peak, frame_bytes = measure(fn, data, args.repeat)
+        baseline = baseline or seconds
+        print(
+            f"{name:<30}{seconds * 1000:>10.1f}ms"
+            f"{peak / 2**20:>10.1f}MB{frame_bytes / 2**20:>10.1f}MB"
+            f"   x{baseline / seconds:.2f}"
+        )
+
+    if "pyarrow" not in engines:
+        print("\npyarrow is not installed; only the pandas C engine was measured")
+    else:
+        print("\npy peak does not include pyarrow's own allocator")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Report build time and PDF size with vector (reportlab.graphics) vs. raster (matplotlib PNG) charts.
+
+    python -m benchmarks.bench_report_charts --repeat 30 --types 11 25
+
+Builds the dataset report in-process, without the database or the report
+cache, for summaries with each ``--types`` count of equipment types. It
+prints the median build time and the PDF size for each chart backend. The
+first build of each backend is a warmup (font, import and figure caches).
+The last column is the time to import the backend's chart module in a
+fresh interpreter, which the first report after a server start also pays.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+from .harness import setup_django
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+
+from equipment.models import Dataset  # noqa: E402
+from equipment.reports import build_report  # noqa: E402
+
+BACKENDS = {"raster": "equipment.charts", "vector": "equipment.vector_charts"}
+
+
+def make_dataset(types):
+    distribution = {f"Type-{i}": 1000 // (i + 1) for i in range(types)}
+    summary = {
+        "count": sum(distribution.values()),
+        "avg_flowrate": 98.5,
+        "avg_pressure": 6.3,
+        "avg_temperature": 118.2,
+        "type_distribution": distribution,
+    }
+    return Dataset(id=1, name="bench.csv", uploaded_at=datetime.now(timezone.utc), summary=summary)
+
+
+def build(dataset):
+    out = BytesIO()
+    build_report(dataset, out)
+    return out.getvalue()
+
+
+def import_time(module):
+    # reportlab itself is loaded by both paths
+    code = (
+        "import time, reportlab.platypus; start = time.perf_counter();"
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    return float(subprocess.check_output([sys.executable, "-c", code]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--types", type=int, nargs="+", default=[11, 25])
+    args = parser.parse_args()
+
+    imports = {backend: import_time(module) for backend, module in BACKENDS.items()}
+
+    print(f"{'types':>6}  {'charts':<8}{'build p50':>11}{'pdf size':>11}{'import':>10}")
+    for types in args.types:
+        dataset = make_dataset(types)
+        for backend in BACKENDS:
+            with override_settings(EQUIPMENT_REPORT_CHARTS=backend):
+                size = len(build(dataset))
+                times = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    build(dataset)
+                    times.append(time.perf_counter() - start)
+            print(
+                f"{types:>6}  {backend:<8}{statistics.median(times) * 1000:>9.1f}ms"
+                f"{size / 1024:>9.1f}KB{imports[backend] * 1000:>8.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
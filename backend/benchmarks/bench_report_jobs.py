@@ -0,0 +1,132 @@
+"""
+Report throughput with N concurrent requests, synchronous vs. async jobs.
+
+    python -m benchmarks.bench_report_jobs --requests 16 --clients 8
+
+Each request asks for a different dataset with a cold report cache. In
+sync mode every client waits on GET /api/report/<id>/; in async mode it
+submits ?async=1, polls the job and then downloads the result. Alongside
+the reports a probe client keeps calling /api/history/ to show how long
+cheap requests wait while reports render.
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .harness import client_for, create_test_database, make_user, setup_django
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+
+from equipment import jobs, report_cache  # noqa: E402
+from equipment.models import Dataset  # noqa: E402
+
+SUMMARY = {
+    "count": 15,
+    "avg_flowrate": 98.5,
+    "avg_pressure": 6.3,
+    "avg_temperature": 118.2,
+    "type_distribution": {"Pump": 5, "Valve": 4, "Compressor": 3, "Reactor": 3},
+}
+
+
+def fetch_sync(user, dataset_id):
+    client = client_for(user)
+    res = client.get(f"/api/report/{dataset_id}/")
+    b"".join(res.streaming_content)
+    assert res.status_code == 200, res.status_code
+
+
+def fetch_async(user, dataset_id):
+    client = client_for(user)
+    status_url = client.get(f"/api/report/{dataset_id}/?async=1")["Location"]
+    while True:
+        body = client.get(status_url).json()
+        if body["status"] != jobs.PENDING:
+            break
+        time.sleep(0.02)
+    assert body["status"] == jobs.DONE, body
+    res = client.get(body["result_url"])
+    b"".join(res.streaming_content)
+
+
+def run(mode, user, datasets, clients):
+    for dataset in datasets:
+        report_cache.invalidate(dataset.id)
+
+    fetch = fetch_sync if mode == "sync" else fetch_async
+    stop = threading.Event()
+    probe_latencies = []
+
+    def probe():
+        client = client_for(user)
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/api/history/")
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+        connection.close()
+
+    def task(dataset):
+        try:
+            fetch(user, dataset.id)
+        finally:
+            connection.close()
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(task, datasets))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    print(
+        f"{mode:<6}{elapsed:>10.2f}s{len(datasets) / elapsed:>10.2f}/s"
+        f"{statistics.median(probe_latencies) * 1000:>12.1f}ms"
+        f"{max(probe_latencies) * 1000:>12.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--backend", choices=["process", "thread"], default=None)
+    args = parser.parse_args()
+
+    from django.conf import settings
+
+    if args.backend:
+        settings.EQUIPMENT_REPORT_JOB_BACKEND = args.backend
+
+    teardown = create_test_database()
+    try:
+        user = make_user()
+        datasets = [
+            Dataset.objects.create(name=f"bench-{i}.csv", summary=SUMMARY)
+            for i in range(args.requests)
+        ]
+        # start the pool outside the timed run
+        warmup = jobs.submit(datasets[0], "warmup")
+        while jobs.get(warmup.id).status == jobs.PENDING:
+            time.sleep(0.05)
+
+        print(f"{args.requests} reports, {args.clients} concurrent clients\n")
+        print(f"{'mode':<6}{'wall':>11}{'reports':>12}{'probe p50':>12}{'probe max':>12}")
+        run("sync", user, datasets, args.clients)
+        run("async", user, datasets, args.clients)
+
+        for dataset in datasets:
+            report_cache.invalidate(dataset.id)
+    finally:
+        jobs.shutdown()
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
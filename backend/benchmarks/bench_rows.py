@@ -0,0 +1,86 @@
+"""
+Latency of the stored-rows endpoint on a large dataset.
+
+    python -m benchmarks.bench_rows --rows 2000000 --format arrow npy
+
+Each query fetches its first page and the page after it, through
+GET /api/datasets/<id>/rows/. "pandas" is the work the endpoint replaces:
+reading the uploaded CSV whole and filtering and sorting it in memory.
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from io import BytesIO
+
+from .datagen import make_csv
+from .harness import client_for, create_test_database, make_user, setup_django
+
+setup_django()
+
+import pandas as pd  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from equipment import row_store  # noqa: E402
+from equipment.ingest import summarize_csv  # noqa: E402
+from equipment.models import Dataset  # noqa: E402
+
+QUERIES = [
+    "?limit=100",
+    "?ordering=-pressure&limit=100",
+    "?type=Pump&pressure__gte=8&ordering=temperature&fields=type,temperature&limit=100",
+    "?flowrate__lt=5&ordering=-row&limit=1000",
+]
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def two_pages(client, dataset_id, query):
+    res = client.get(f"/api/datasets/{dataset_id}/rows/{query}")
+    link = res.get("Link")
+    if link:
+        client.get(link[1:link.index(">")])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--format", nargs="+", default=[row_store.get_format()])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = make_csv(args.rows, missing=0.01)
+    settings.EQUIPMENT_ROW_STORE_DIR = store_dir = tempfile.mkdtemp()
+    teardown = create_test_database()
+    try:
+        client = client_for(make_user())
+        pandas = timed(lambda: pd.read_csv(BytesIO(data)).sort_values("Pressure"), 1)
+        print(f"{args.rows} rows; pandas (read, sort): {pandas * 1000:.0f}ms\n")
+        print(f"{'format':<8}{'p50':>9}  query")
+
+        for fmt in args.format:
+            settings.EQUIPMENT_ROW_STORE_FORMAT = fmt
+            dataset = Dataset.objects.create(name=f"bench-{fmt}.csv", summary={})
+            with row_store.RowWriter() as rows:
+                summarize_csv(BytesIO(data), rows=rows)
+                rows.commit(dataset.id)
+
+            for query in QUERIES:
+                two_pages(client, dataset.id, query)  # page cache
+                p50 = timed(lambda: two_pages(client, dataset.id, query), args.repeat)
+                print(f"{fmt:<8}{p50 * 1000:>7.1f}ms  {query}")
+    finally:
+        teardown()
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-row cost of building the dataset summary.
+
+    python -m benchmarks.bench_summary --rows 1000000
+
+Compares the original summary (three means and a value_counts), a naive
+extended summary that calls pandas once per statistic, and the stats
+engine in exact (describe) and streaming (StatsAccumulator) modes.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from .harness import setup_django
+
+setup_django()
+
+from equipment.parsing import NUMERIC_COLUMNS  # noqa: E402
+from equipment.stats import QUANTILES, StatsAccumulator, describe  # noqa: E402
+
+TYPES = ["Pump", "Compressor", "Valve", "HeatExchanger", "Reactor", "Tank", "Filter"]
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Type": pd.Categorical(rng.choice(TYPES, rows)),
+        "Flowrate": rng.normal(100, 25, rows),
+        "Pressure": rng.normal(6, 1.5, rows),
+        "Temperature": rng.normal(120, 20, rows),
+    })
+
+
+def legacy(df):
+    return {
+        "count": len(df),
+        "avg_flowrate": float(df["Flowrate"].mean()),
+        "avg_pressure": float(df["Pressure"].mean()),
+        "avg_temperature": float(df["Temperature"].mean()),
+        "type_distribution": df["Type"].value_counts().to_dict(),
+    }
+
+
+def naive_extended(df):
+    out = {}
+    for col in NUMERIC_COLUMNS:
+        s = df[col]
+        out[col] = [s.count(), s.mean(), s.std(), s.min(), s.max()] + [s.quantile(q) for q in QUANTILES]
+    for label in df["Type"].unique():
+        sub = df[df["Type"] == label]
+        for col in NUMERIC_COLUMNS:
+            s = sub[col]
+            out[(label, col)] = [s.count(), s.mean(), s.std(), s.min(), s.max()] + [
+                s.quantile(q) for q in QUANTILES
+            ]
+    return out
+
+
+def streaming(df, chunk_size=50_000):
+    acc = StatsAccumulator()
+    for start in range(0, len(df), chunk_size):
+        acc.update(df.iloc[start:start + chunk_size])
+    return acc.result()
+
+
+def best_of(fn, df, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    print(f"{args.rows} rows, {len(TYPES)} equipment types\n")
+    print(f"{'summary':<34}{'best time':>12}{'ns/row':>10}")
+
+    for name, fn in (
+        ("legacy (avg + counts only)", legacy),
+        ("naive extended (per-stat calls)", naive_extended),
+        ("stats.describe (exact)", describe),
+        ("StatsAccumulator (streaming)", streaming),
+    ):
+        seconds = best_of(fn, df, args.repeat)
+        print(f"{name:<34}{seconds * 1000:>10.1f}ms{seconds * 1e9 / args.rows:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Synthetic equipment datasets in the ``sample_equipment_data.csv`` schema.
+
+    python -m benchmarks.datagen --rows 1000000 --types 25 -o plant.csv
+
+Rows are ``Equipment Name,Type,Flowrate,Pressure,Temperature``. The first
+types and their operating ranges follow the sample files. Past those,
+``Type-12``, ``Type-13``… get seeded random ranges. Type frequencies
+follow a Zipf-like curve, so a few types dominate as in real plants.
+The output is deterministic for a given seed and is generated in chunks,
+so 10M-row files don't need 10M rows in memory.
+"""
+import argparse
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature"]
+
+# Typical (flowrate, pressure, temperature) per type, from the sample files
+PROFILES = {
+    "Pump": (85.0, 10.0, 210.0),
+    "Valve": (35.0, 5.0, 195.0),
+    "Compressor": (80.0, 16.0, 240.0),
+    "HeatExchanger": (90.0, 13.0, 280.0),
+    "Reactor": (100.0, 19.0, 390.0),
+    "Tank": (21.0, 3.6, 298.0),
+    "Filter": (31.0, 8.2, 313.0),
+    "Condenser": (162.0, 6.8, 126.0),
+    "Boiler": (91.0, 30.7, 605.0),
+    "Mixer": (40.7, 12.6, 327.0),
+    "Cooler": (50.6, 16.0, 285.0),
+}
+
+DEFAULT_TYPES = len(PROFILES)
+CHUNK_ROWS = 500_000
+
+
+def type_profiles(types, seed=0):
+    """``types`` names and their (flowrate, pressure, temperature) centres."""
+    names = list(PROFILES)[:types]
+    centres = [PROFILES[name] for name in names]
+
+    rng = np.random.default_rng(seed + 1)
+    for i in range(len(names), types):
+        names.append(f"Type-{i + 1}")
+        centres.append((rng.uniform(10, 200), rng.uniform(2, 35), rng.uniform(80, 650)))
+    return names, np.array(centres)
+
+
+def iter_frames(rows, types=DEFAULT_TYPES, seed=0, missing=0.0, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of at most ``chunk_rows`` rows, ``rows`` in total."""
+    names, centres = type_profiles(types, seed)
+    weights = 1.0 / np.arange(1, types + 1)
+    weights /= weights.sum()
+    rng = np.random.default_rng(seed)
+
+    start = 0
+    while start < rows:
+        n = min(chunk_rows, rows - start)
+        codes = rng.choice(types, n, p=weights)
+        # readings scatter around the type's centre by ~15%
+        values = centres[codes] * rng.normal(1.0, 0.15, (n, 3))
+        scale = np.array([10.0, 100.0, 10.0])  # 1, 2 and 1 decimals, as in the samples
+        values = np.round(np.abs(values) * scale) / scale
+        if missing:
+            values[rng.random((n, 3)) < missing] = np.nan
+
+        type_names = np.asarray(names, dtype=object)[codes]
+        yield pd.DataFrame({
+            "Equipment Name": [f"{t}-{i}" for i, t in enumerate(type_names, start + 1)],
+            "Type": type_names,
+            "Flowrate": values[:, 0],
+            "Pressure": values[:, 1],
+            "Temperature": values[:, 2],
+        }, columns=COLUMNS)
+        start += n
+
+
+def write_csv(out, rows, types=DEFAULT_TYPES, seed=0, missing=0.0):
+    """Write the dataset to the text stream ``out``."""
+    out.write(",".join(COLUMNS) + "\n")
+    for frame in iter_frames(rows, types, seed, missing):
+        frame.to_csv(out, index=False, header=False)
+
+
+def make_csv(rows, types=DEFAULT_TYPES, seed=0, missing=0.0):
+    """The dataset as CSV bytes."""
+    out = io.StringIO()
+    write_csv(out, rows, types, seed, missing)
+    return out.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--types", type=int, default=DEFAULT_TYPES, help="Type cardinality.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--missing", type=float, default=0.0,
+                        help="Fraction of numeric cells left empty.")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout).")
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_csv(out, args.rows, args.types, args.seed, args.missing)
+    else:
+        write_csv(sys.stdout, args.rows, args.types, args.seed, args.missing)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Shared setup for the benchmark scripts: Django, a throwaway database and clients."""
+import os
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+
+def create_test_database():
+    """Create Django's test database and return a callable that drops it again."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    def teardown():
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return teardown
+
+
+def make_user(username="bench"):
+    from django.contrib.auth.models import User
+
+    user, _ = User.objects.get_or_create(username=username)
+    return user
+
+
+def client_for(user):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
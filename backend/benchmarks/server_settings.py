@@ -0,0 +1,12 @@
+"""Settings for servers started by ``bench_asgi``: a throwaway database and report cache."""
+import os
+
+from backend.settings import *  # noqa: F401,F403
+from backend.settings import DATABASES
+
+DATABASES = {"default": {**DATABASES["default"], "NAME": os.environ["BENCH_DATABASE"]}}
+EQUIPMENT_REPORT_CACHE_DIR = os.environ["BENCH_REPORT_CACHE_DIR"]
+# keep every upload, so reports never ask for a pruned dataset
+EQUIPMENT_RETENTION = {"MAX_COUNT": None, "MAX_AGE": None, "PER_USER_QUOTA": None}
+if os.environ.get("BENCH_ASYNC_WORKERS"):
+    EQUIPMENT_ASYNC_WORKERS = int(os.environ["BENCH_ASYNC_WORKERS"])
@@ -0,0 +1,283 @@
+"""
+Upload, history and report benchmarks with regression baselines.
+
+    python -m benchmarks.suite                      # quick profile
+    python -m benchmarks.suite --profile full       # up to 10M-row uploads
+    python -m benchmarks.suite --check              # exit 1 on regressions
+    python -m benchmarks.suite --save-baseline      # record the current run
+
+Every scenario runs in its own spawned process with a throwaway test
+database and goes through the Django test client. Each scenario reports
+its throughput, p50/p99 latency and the process's peak RSS. ``--check``
+compares them with ``baselines.json`` and fails when any is worse than
+the baseline by more than ``--tolerance``. p99 gets twice the tolerance
+because it is the noisiest. Each scenario runs ``--rounds`` times and
+the best value of each metric is kept, which filters out most scheduler
+noise. Baselines depend on the machine, so record them on the machine
+that runs the checks.
+"""
+import argparse
+import json
+import multiprocessing
+import queue
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .harness import client_for, create_test_database, make_user, setup_django
+
+BASELINE_FILE = Path(__file__).with_name("baselines.json")
+
+PROFILES = {
+    "quick": {"upload_rows": [1_000, 100_000], "types": 11},
+    "full": {"upload_rows": [1_000, 100_000, 1_000_000, 10_000_000], "types": 11},
+}
+
+HISTORY_DATASETS = 100
+HISTORY_REQUESTS = 200
+REPORT_REQUESTS = 20
+
+# metric -> True if bigger is better
+METRICS = {"throughput": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def _label(rows):
+    for size, suffix in ((1_000_000, "M"), (1_000, "k")):
+        if rows >= size and rows % size == 0:
+            return f"{rows // size}{suffix}"
+    return str(rows)
+
+
+def _percentile(samples, q):
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1] if len(samples) > 1 else samples[0]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _summarise(latencies, units):
+    p50 = _percentile(latencies, 50)
+    return {
+        "throughput": units / p50,
+        "p50_ms": p50 * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _timed(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()  # imports, first queries, font and template caches
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+# --- Scenarios (run in the child process) ---
+
+def bench_upload(client, rows, types):
+    """Throughput in rows/s; includes writing the rows to the row store."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import override_settings
+
+    from equipment.models import Dataset
+    from .datagen import make_csv
+
+    data = make_csv(rows, types)
+    if rows <= 100_000:
+        repeat, warmup = 20, 1
+    elif rows <= 1_000_000:
+        repeat, warmup = 5, 1
+    else:
+        repeat, warmup = 2, 0
+
+    def upload():
+        Dataset.objects.all().delete()  # or the duplicate check short-circuits
+        file = SimpleUploadedFile("plant.csv", data, content_type="text/csv")
+        res = client.post("/api/upload/", {"file": file}, format="multipart")
+        assert res.status_code == 201, res.status_code
+
+    store_dir = tempfile.mkdtemp()
+    try:
+        with override_settings(EQUIPMENT_ROW_STORE_DIR=store_dir):
+            return _summarise(_timed(upload, repeat, warmup), rows)
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+def _seed_datasets(count, types):
+    from equipment.ingest import summarize_csv
+    from equipment.models import Dataset
+    from io import BytesIO
+    from .datagen import make_csv
+
+    summary = summarize_csv(BytesIO(make_csv(1_000, types)))
+    return Dataset.objects.bulk_create(
+        Dataset(name=f"plant-{i}.csv", summary=summary) for i in range(count)
+    )
+
+
+def bench_history(client, types, cached=False):
+    """
+    Throughput in requests/s. Uncached, every request runs the keyset query
+    and serializes the page; cached, all but the first hit ``dataset_cache``.
+    """
+    from equipment import dataset_cache
+
+    _seed_datasets(HISTORY_DATASETS, types)
+
+    def history():
+        if not cached:
+            dataset_cache.invalidate()
+        res = client.get("/api/history/")
+        assert res.status_code == 200, res.status_code
+
+    return _summarise(_timed(history, HISTORY_REQUESTS), 1)
+
+
+def bench_report(client, types):
+    """Cold-cache report renders; throughput in requests/s."""
+    from django.test import override_settings
+
+    from equipment import report_cache
+
+    dataset = _seed_datasets(1, types)[0]
+    cache_dir = tempfile.mkdtemp()
+
+    def report():
+        report_cache.invalidate(dataset.id)
+        res = client.get(f"/api/report/{dataset.id}/")
+        b"".join(res.streaming_content)
+        assert res.status_code == 200, res.status_code
+
+    try:
+        with override_settings(EQUIPMENT_REPORT_CACHE_DIR=cache_dir):
+            return _summarise(_timed(report, REPORT_REQUESTS), 1)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def _run_scenario(kind, params, results):
+    setup_django()
+    teardown = create_test_database()
+    try:
+        client = client_for(make_user())
+        scenario = {"upload": bench_upload, "history": bench_history, "report": bench_report}[kind]
+        results.put(scenario(client, **params))
+    finally:
+        teardown()
+
+
+def run_isolated(kind, params):
+    """Run one scenario in a fresh process so its peak RSS is its own."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_run_scenario, args=(kind, params, results))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"{kind} scenario failed (exit code {process.exitcode})")
+    process.join()
+    return result
+
+
+def best_of(runs):
+    return {
+        metric: (max if higher_is_better else min)(run[metric] for run in runs)
+        for metric, higher_is_better in METRICS.items()
+    }
+
+
+def scenarios(profile):
+    config = PROFILES[profile]
+    for rows in config["upload_rows"]:
+        yield f"upload-{_label(rows)}", "upload", {"rows": rows, "types": config["types"]}
+    yield "history", "history", {"types": config["types"]}
+    yield "history-cached", "history", {"types": config["types"], "cached": True}
+    yield "report", "report", {"types": config["types"]}
+
+
+# --- Baselines ---
+
+def compare(results, baselines, tolerance):
+    """Return a list of ``(scenario, metric, value, baseline)`` regressions."""
+    regressions = []
+    for name, metrics in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            allowed = tolerance * (2 if metric == "p99_ms" else 1)
+            value, reference = metrics[metric], baseline[metric]
+            if higher_is_better:
+                worse = value < reference / (1 + allowed)
+            else:
+                worse = value > reference * (1 + allowed)
+            if worse:
+                regressions.append((name, metric, value, reference))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profile", choices=PROFILES, default="quick")
+    parser.add_argument("--only", help="Run only scenarios whose name starts with this.")
+    parser.add_argument("--check", action="store_true", help="Fail on regressions against the baselines.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baselines.")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per scenario; the best is kept.")
+    parser.add_argument("--baseline-file", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--json", type=Path, help="Also write the results here.")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<16}{'throughput':>16}{'p50':>11}{'p99':>11}{'peak rss':>11}")
+    results = {}
+    for name, kind, params in scenarios(args.profile):
+        if args.only and not name.startswith(args.only):
+            continue
+        runs = [run_isolated(kind, params) for _ in range(args.rounds)]
+        metrics = results[name] = best_of(runs)
+        unit = "rows/s" if kind == "upload" else "req/s"
+        print(
+            f"{name:<16}{metrics['throughput']:>10.0f} {unit:<5}"
+            f"{metrics['p50_ms']:>9.1f}ms{metrics['p99_ms']:>9.1f}ms"
+            f"{metrics['peak_rss_mb']:>9.0f}MB"
+        )
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.save_baseline:
+        stored = json.loads(args.baseline_file.read_text()) if args.baseline_file.exists() else {}
+        stored.update(results)
+        args.baseline_file.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"\nbaselines written to {args.baseline_file}")
+
+    if args.check:
+        if not args.baseline_file.exists():
+            sys.exit(f"no baselines at {args.baseline_file}; run with --save-baseline first")
+        regressions = compare(results, json.loads(args.baseline_file.read_text()), args.tolerance)
+        if regressions:
+            print("\nregressions:")
+            for name, metric, value, reference in regressions:
+                print(f"  {name} {metric}: {value:.1f} (baseline {reference:.1f})")
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Async versions of the upload, history, report and bulk export endpoints, for ASGI.
+
+Under ASGI, Django runs synchronous views one at a time on a single
+thread, so one slow upload holds up every ``/api/history/`` call behind
+it. These views stay on the event loop instead. The database goes through
+the async ORM, and parsing and PDF rendering go through ``offload.run()``.
+``backend/asgi.py`` routes these endpoints here (see
+``EQUIPMENT_ASYNC_VIEWS``). Response bodies and headers match the
+synchronous views, except for a 503 when the CPU pool is saturated.
+
+DRF's ``APIView`` cannot serve async handlers, so ``AsyncAPIView`` does the
+parts of it these endpoints need: JWT authentication and JSON errors.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import PermissionDenied as DjangoPermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, PermissionDenied
+from rest_framework.parsers import FileUploadParser, FormParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import permission_classes
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import bulk_export, dataset_cache, jobs, offload, ranges, report_cache, retention, row_store
+from .ingest import summarize_csv
+from .instrumentation import phase
+from .models import Dataset
+from .pagination import KeysetPagination
+from .parsing import ParseError, UnsupportedFormat, detect_format, strip_compression
+from .reports import report_version
+from .serializers import DatasetSerializer
+from .uploads import ContentHashUploadHandler, hash_file
+from .views import (
+    MAX_EXPORT_DATASETS,
+    SparseFieldsMixin,
+    _job_payload,
+    _report_headers,
+    _requested_datasets,
+    _upload_error,
+    _zip_response,
+    history_page,
+)
+
+_jwt = JWTAuthentication()
+
+
+def _json(data, status=status.HTTP_200_OK):
+    # the same renderer as DRF's Response, so bodies are identical
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def _saturated():
+    response = _json({"error": "Server busy, try again shortly."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response["Retry-After"] = str(offload.RETRY_AFTER)
+    return response
+
+
+async def authenticate(request):
+    """The user named by the request's bearer token, or None without one."""
+    result = await sync_to_async(_jwt.authenticate)(request)
+    return result[0] if result else None
+
+
+class AsyncAPIView(View):
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # token-authenticated, like APIView, so no CSRF check
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+            if user is None:
+                raise NotAuthenticated()
+            request.user = user
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+        except Http404 as exc:
+            # converted as DRF's exception handler does, so the body is JSON
+            return self.handle_exception(request, NotFound(*exc.args))
+        except DjangoPermissionDenied as exc:
+            return self.handle_exception(request, PermissionDenied(*exc.args))
+        except offload.Saturated:
+            return _saturated()
+
+    def handle_exception(self, request, exc):
+        response = _json(
+            exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail},
+            status=exc.status_code,
+        )
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            response["WWW-Authenticate"] = _jwt.authenticate_header(request)
+        return response
+
+
+class AsyncHistoryView(SparseFieldsMixin, AsyncAPIView):
+    async def get(self, request):
+        request = Request(request)  # for query_params
+        fields = self.get_fields(request)
+        paginator = KeysetPagination(request)
+
+        key = await dataset_cache.ahistory_key(paginator.cursor, paginator.limit, fields)
+        with phase("cache"):
+            page = await dataset_cache.aget_page(key)
+        if page is None:
+            page = await self.build_page(paginator, fields)
+            await dataset_cache.aset_page(key, page)
+        paginator.next_params = page["next_params"]
+
+        not_modified = get_conditional_response(request, etag=page["etag"])
+        if not_modified is not None:
+            return paginator.add_headers(not_modified)
+
+        response = _json(page["data"])
+        response["ETag"] = page["etag"]
+        return paginator.add_headers(response)
+
+    async def build_page(self, paginator, fields):
+        with phase("query"):
+            keys = await paginator.apage_keys(Dataset.objects.all())
+
+        datasets = Dataset.objects.filter(id__in=[pk for pk, _ in keys])
+        if fields is not None:
+            datasets = datasets.only(*fields)
+        datasets = datasets.order_by('-uploaded_at', '-id')
+
+        with phase("query"):
+            datasets = [dataset async for dataset in datasets]
+        with phase("serialize"):
+            data = DatasetSerializer(datasets, many=True, fields=fields).data
+        return history_page(keys, fields, paginator, data)
+
+
+def _receive(request, hasher):
+    """Parse the upload (this spools it to disk); returns it and its hash if it was taken."""
+    return request.FILES.get('file'), hasher.digests.get('file')
+
+
+class AsyncUploadView(AsyncAPIView):
+    async def post(self, request):
+        owner = request.user
+        hasher = ContentHashUploadHandler(request)
+        request.upload_handlers.insert(0, hasher)
+        request = Request(request, parsers=[MultiPartParser(), FormParser(), FileUploadParser()])
+
+        with phase("receive"):
+            file, content_hash = await offload.run(_receive, request, hasher)
+        if not file:
+            return _json({"error": "No file uploaded"}, status=400)
+
+        try:
+            file_format, compression = detect_format(
+                file.name, file.content_type, request.headers.get("Content-Encoding")
+            )
+        except UnsupportedFormat as exc:
+            return _json(*_upload_error(exc))
+
+        with phase("dedupe"):
+            if compression or not content_hash:
+                # compressed uploads are hashed decompressed (see hash_file)
+                try:
+                    content_hash = await offload.run(hash_file, file, compression)
+                except ParseError as exc:
+                    return _json(*_upload_error(exc, file_format))
+            existing = await (
+                Dataset.objects.filter(content_hash=content_hash)
+                .only('summary')
+                .afirst()
+            )
+        if existing:
+            return _json(existing.summary, status=status.HTTP_200_OK)
+
+        with row_store.RowWriter() as rows:
+            try:
+                summary = await offload.run(
+                    summarize_csv, file, file_format=file_format, compression=compression, rows=rows
+                )
+            except ParseError as exc:
+                return _json(*_upload_error(exc, file_format))
+
+            # both run in a transaction, which the async ORM has no API for
+            with phase("db"):
+                dataset = await sync_to_async(Dataset.objects.create_from_summary)(
+                    summary,
+                    name=strip_compression(file.name),
+                    content_hash=content_hash,
+                    owner=owner,
+                )
+            with phase("store"):
+                await sync_to_async(rows.commit, thread_sensitive=False)(dataset.id)
+
+        with phase("retention"):
+            await sync_to_async(retention.prune)()
+
+        return _json(summary, status=status.HTTP_201_CREATED)
+
+
+@permission_classes([IsAuthenticated])
+async def generate_pdf_report(request, dataset_id):
+    try:
+        dataset = await dataset_cache.aget_dataset(dataset_id)
+    except Dataset.DoesNotExist:
+        raise Http404("No Dataset matches the given query.")
+
+    version = report_version(dataset)
+    not_modified = get_conditional_response(
+        request, etag=f'"{version}"', last_modified=int(dataset.uploaded_at.timestamp())
+    )
+    if not_modified is not None:
+        return not_modified
+
+    if request.GET.get("async") in ("1", "true"):
+        job = jobs.submit(dataset, version)
+        payload = _job_payload(request, job)
+        response = JsonResponse(payload, status=202)
+        response["Location"] = payload["status_url"]
+        return response
+
+    path = report_cache.get(dataset.id, version)
+    try:
+        file = open(path, "rb") if path is not None else None
+    except FileNotFoundError:
+        file = None
+    if file is None:
+        try:
+            file = await offload.run(report_cache.open_or_build, dataset, version)
+        except offload.Saturated:
+            return _saturated()
+
+    response = ranges.async_file_response(
+        request,
+        file,
+        "application/pdf",
+        etag=f'"{version}"',
+        last_modified=http_date(dataset.uploaded_at.timestamp()),
+    )
+    return _report_headers(response, dataset, version)
+
+
+class AsyncExportReportsView(AsyncAPIView):
+    async def get(self, request):
+        datasets = await sync_to_async(_requested_datasets)(request, 1, MAX_EXPORT_DATASETS)
+        # an async iterator: Django would read a sync one whole before sending it
+        return _zip_response(bulk_export.aiter_zip(datasets))
@@ -0,0 +1,107 @@
+"""
+Many dataset reports in one streamed ZIP archive.
+
+``iter_zip()`` renders the reports that are not in the report cache on the
+``jobs`` pool, all at once, so a bulk export takes about as long as its
+datasets divided by the pool's workers. Each PDF goes into the archive as
+soon as it is ready, in the order they finish, and the archive bytes are
+yielded as they are written. Only one block of one report is in memory at a
+time, never the whole archive. The archive is written without seeking, so
+sizes and CRCs follow each entry in a data descriptor.
+
+The response status is sent before the first report is rendered. A report
+that fails to render is therefore left out and named in an ``errors.txt``
+entry at the end of the archive. A client that goes away cancels the
+renders that have not started yet.
+"""
+import zipfile
+from concurrent.futures import Future, as_completed
+
+from asgiref.sync import sync_to_async
+
+from . import jobs, report_cache
+from .ranges import BLOCK_SIZE
+from .reports import report_version
+
+ERRORS_ENTRY = "errors.txt"
+
+
+class _Buffer:
+    """Write-only file that hands its contents over with ``take()``."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def entry_name(dataset):
+    # ids keep the names unique; uploads of the same file name are common
+    name = dataset.name.replace("/", "_").replace("\\", "_")
+    return f"{dataset.id}-{name}_report.pdf"
+
+
+def _render(dataset, version):
+    if report_cache.get(dataset.id, version) is not None:
+        future = Future()
+        future.set_result(None)
+        return future
+    return jobs.render(dataset, version)
+
+
+def iter_zip(datasets):
+    """Yield a ZIP archive of the reports of ``datasets``, a chunk at a time."""
+    pending = {}
+    for dataset in datasets:
+        version = report_version(dataset)
+        pending[_render(dataset, version)] = (dataset, version)
+
+    buffer = _Buffer()
+    failures = []
+    try:
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for future in as_completed(pending):
+                dataset, version = pending[future]
+                try:
+                    future.result()
+                    # a miss here (evicted already) renders in this thread
+                    file = report_cache.open_or_build(dataset, version)
+                except Exception as exc:
+                    failures.append(f"{entry_name(dataset)}: {exc}")
+                    continue
+
+                with file, archive.open(entry_name(dataset), "w") as entry:
+                    while block := file.read(BLOCK_SIZE):
+                        entry.write(block)
+                        if chunk := buffer.take():
+                            yield chunk
+                if chunk := buffer.take():
+                    yield chunk
+
+            if failures:
+                archive.writestr(ERRORS_ENTRY, "\n".join(failures) + "\n")
+        yield buffer.take()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def aiter_zip(datasets):
+    """``iter_zip()`` for async views; each chunk is produced off the event loop."""
+    chunks = iter_zip(datasets)
+    step = sync_to_async(next, thread_sensitive=False)
+    try:
+        while (chunk := await step(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=False)()
@@ -0,0 +1,115 @@
+"""
+Matplotlib (PNG) chart rendering, for reports with
+``EQUIPMENT_REPORT_CHARTS = "raster"``; reports draw vector charts with
+``vector_charts`` by default.
+
+Everything here uses matplotlib's object-oriented API (``Figure`` plus an
+Agg canvas) and never touches ``matplotlib.pyplot``, whose global figure
+manager is not safe to share between server threads. Each worker thread
+keeps one figure per template and clears it between charts, so the
+figure, canvas and renderer are only built once per thread.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+from django.conf import settings
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+DEFAULT_WORKERS = 4
+
+BAR_COLOR = "#6366f1"
+
+
+@dataclass(frozen=True)
+class ChartTemplate:
+    figsize: tuple = (4, 4)
+    dpi: int = 150
+    format: str = "png"
+    facecolor: str = "white"
+
+
+TEMPLATES = {
+    "pie": ChartTemplate(),
+    "bar": ChartTemplate(),
+}
+
+_local = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "EQUIPMENT_CHART_WORKERS", DEFAULT_WORKERS),
+                thread_name_prefix="charts",
+            )
+        return _executor
+
+
+def _figure(name):
+    """This thread's figure for template ``name``, cleared and ready to draw on."""
+    figures = getattr(_local, "figures", None)
+    if figures is None:
+        figures = _local.figures = {}
+
+    fig = figures.get(name)
+    if fig is None:
+        template = TEMPLATES[name]
+        fig = Figure(figsize=template.figsize, dpi=template.dpi, facecolor=template.facecolor)
+        FigureCanvasAgg(fig)
+        figures[name] = fig
+    else:
+        fig.clear()
+    return fig
+
+
+def _save(fig, name):
+    template = TEMPLATES[name]
+    fig.tight_layout()
+    buffer = BytesIO()
+    fig.savefig(buffer, format=template.format, dpi=template.dpi, facecolor=template.facecolor)
+    buffer.seek(0)
+    return buffer
+
+
+def render_pie(distribution, title="Equipment Type Distribution"):
+    fig = _figure("pie")
+    ax = fig.add_subplot()
+    ax.pie(
+        list(distribution.values()),
+        labels=list(distribution.keys()),
+        autopct="%1.1f%%",
+        startangle=140,
+    )
+    ax.set_title(title)
+    return _save(fig, "pie")
+
+
+def render_bar(labels, values, title="Average Parameters", ylabel="Value"):
+    fig = _figure("bar")
+    ax = fig.add_subplot()
+    ax.bar(labels, values, color=BAR_COLOR)
+    ax.set_title(title)
+    ax.set_ylabel(ylabel)
+    return _save(fig, "bar")
+
+
+def render_summary_charts(summary):
+    """
+    Render the pie and bar charts for a dataset summary in parallel and
+    return them as ``(pie_png, bar_png)`` buffers.
+    """
+    executor = _get_executor()
+    pie = executor.submit(render_pie, summary["type_distribution"])
+    bar = executor.submit(
+        render_bar,
+        ["Flowrate", "Pressure", "Temperature"],
+        [summary["avg_flowrate"], summary["avg_pressure"], summary["avg_temperature"]],
+    )
+    return pie.result(), bar.result()
@@ -0,0 +1,112 @@
+"""
+Combined statistics across several datasets, from their stored summaries.
+
+Counts and type distributions add up. Averages are weighted by each
+dataset's non-null count for the column, and the extended ``stats``
+(count, mean, std, min, max) merge exactly through ``stats.Moments``.
+Percentiles cannot be recovered from stored percentiles, so the merged
+stats leave them out. Nothing here touches raw rows, and the work is
+linear in the number of datasets.
+"""
+import math
+
+from .ingest import SUMMARY_KEYS
+from .stats import Moments, stat_key
+
+MERGED_STATS = ("count", "mean", "std", "min", "max")
+
+
+def _number(value):
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+
+def _weight(summary, column):
+    """Non-null values behind ``summary``'s average of ``column``."""
+    stats = (summary.get("stats") or {}).get(stat_key(column))
+    if stats is not None:
+        return stats["count"]
+    # summaries from before the stats engine only know the row count
+    return summary.get("count", 0) if _number(summary.get(SUMMARY_KEYS[column])) is not None else 0
+
+
+def _moments(stats):
+    count = stats["count"]
+    if not count:
+        return Moments()
+    std = _number(stats.get("std"))
+    return Moments(
+        count=count,
+        mean=stats["mean"],
+        m2=std * std * (count - 1) if std is not None else 0.0,
+        min=stats["min"],
+        max=stats["max"],
+    )
+
+
+def _merge_stats(summaries):
+    if not all("stats" in s for s in summaries):
+        return None
+
+    merged = {}
+    for column in SUMMARY_KEYS:
+        key = stat_key(column)
+        moments = Moments()
+        for summary in summaries:
+            moments.merge(_moments(summary["stats"][key]))
+        merged[key] = {
+            "count": moments.count,
+            "mean": moments.mean if moments.count else None,
+            "std": _number(moments.std),
+            "min": moments.min if moments.count else None,
+            "max": moments.max if moments.count else None,
+        }
+    return merged
+
+
+def merge_summaries(summaries):
+    """One summary, shaped like an upload's, for all of ``summaries`` together."""
+    merged = {"count": sum(s.get("count", 0) for s in summaries)}
+
+    for column, key in SUMMARY_KEYS.items():
+        total = weight = 0
+        for summary in summaries:
+            w = _weight(summary, column)
+            if w:
+                total += summary[key] * w
+                weight += w
+        merged[key] = total / weight if weight else None
+
+    types = {}
+    for summary in summaries:
+        for name, n in summary.get("type_distribution", {}).items():
+            types[name] = types.get(name, 0) + n
+    merged["type_distribution"] = dict(sorted(types.items(), key=lambda item: -item[1]))
+
+    stats = _merge_stats(summaries)
+    if stats is not None:
+        merged["stats"] = stats
+    return merged
+
+
+def compare(datasets):
+    """The merged summary of ``datasets`` and how each one differs from it."""
+    merged = merge_summaries([d.summary for d in datasets])
+    total = merged["count"]
+
+    rows = []
+    for dataset in datasets:
+        s = dataset.summary
+        row = {
+            "id": dataset.id,
+            "name": dataset.name,
+            "uploaded_at": dataset.uploaded_at,
+            "count": s.get("count", 0),
+            "share": s.get("count", 0) / total if total else None,
+        }
+        for key in SUMMARY_KEYS.values():
+            value, overall = _number(s.get(key)), merged[key]
+            row[key] = value
+            row[f"{key}_delta"] = value - overall if value is not None and overall is not None else None
+        rows.append(row)
+
+    return {"merged": merged, "datasets": rows}
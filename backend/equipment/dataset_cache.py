@@ -0,0 +1,121 @@
+"""
+History pages and datasets cached on Django's cache framework.
+
+Entries live in the ``EQUIPMENT_CACHE_ALIAS`` cache. A history page is
+stored with its body data, ETag and next-page parameters, under a key
+that includes the current *generation*. The generation is a random token
+in the cache, and ``signals`` replaces it whenever a dataset is saved or
+deleted. One write therefore strands every cached page at once, and the
+stranded pages expire after ``EQUIPMENT_CACHE_TIMEOUT``. Datasets fetched
+by id (reports, comparisons) are cached per id and dropped by the same
+signals.
+
+Writes that skip model signals, such as ``QuerySet.update()`` or
+``bulk_create()``, must call ``invalidate()`` themselves. The locmem
+backend is private to each process. When several worker processes serve
+the API, point the alias at a shared backend (file-based, Redis, ...),
+or the workers that did not take a write keep serving their old pages.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Dataset
+
+DEFAULT_TIMEOUT = 3600
+
+GENERATION_KEY = "equipment:history:generation"
+
+
+def get_cache():
+    return caches[getattr(settings, "EQUIPMENT_CACHE_ALIAS", "default")]
+
+
+def get_timeout():
+    return getattr(settings, "EQUIPMENT_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def _page_key(generation, cursor, limit, fields):
+    shape = repr((cursor, limit, fields)).encode()
+    return f"equipment:history:{generation}:{hashlib.sha256(shape).hexdigest()[:32]}"
+
+
+def _dataset_key(pk):
+    return f"equipment:dataset:{pk}"
+
+
+def history_key(cursor, limit, fields):
+    """Cache key of one history page as of now; take it before querying."""
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return _page_key(generation, cursor, limit, fields)
+
+
+async def ahistory_key(cursor, limit, fields):
+    cache = get_cache()
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = await cache.aget(GENERATION_KEY)
+    return _page_key(generation, cursor, limit, fields)
+
+
+def get_page(key):
+    return get_cache().get(key)
+
+
+async def aget_page(key):
+    return await get_cache().aget(key)
+
+
+def set_page(key, page):
+    get_cache().set(key, page, get_timeout())
+
+
+async def aset_page(key, page):
+    await get_cache().aset(key, page, get_timeout())
+
+
+def get_dataset(pk):
+    """``Dataset`` ``pk``, from the cache when possible; raises ``Dataset.DoesNotExist``."""
+    datasets = get_datasets([pk])
+    if pk not in datasets:
+        raise Dataset.DoesNotExist(f"Dataset {pk} does not exist.")
+    return datasets[pk]
+
+
+def get_datasets(pks):
+    """``{pk: Dataset}`` for the ``pks`` that exist, like ``in_bulk``."""
+    cache = get_cache()
+    found = {
+        dataset.pk: dataset
+        for dataset in cache.get_many([_dataset_key(pk) for pk in pks]).values()
+    }
+    missing = [pk for pk in pks if pk not in found]
+    if missing:
+        fetched = Dataset.objects.in_bulk(missing)
+        cache.set_many({_dataset_key(pk): d for pk, d in fetched.items()}, get_timeout())
+        found.update(fetched)
+    return found
+
+
+async def aget_dataset(pk):
+    cache = get_cache()
+    dataset = await cache.aget(_dataset_key(pk))
+    if dataset is None:
+        dataset = await Dataset.objects.aget(pk=pk)
+        await cache.aset(_dataset_key(pk), dataset, get_timeout())
+    return dataset
+
+
+def invalidate(pk=None):
+    """Start a new history generation, and drop dataset ``pk`` if given."""
+    cache = get_cache()
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+    if pk is not None:
+        cache.delete(_dataset_key(pk))
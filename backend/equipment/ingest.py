@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from . import row_store
+from .instrumentation import phase
+from .parsing import CSV, NUMERIC_COLUMNS, TYPE_COLUMN, iter_equipment_chunks
+from .stats import StatsAccumulator, describe
+
+SUMMARY_KEYS = {
+    "Flowrate": "avg_flowrate",
+    "Pressure": "avg_pressure",
+    "Temperature": "avg_temperature",
+}
+
+
+class SummaryAccumulator:
+    """Running totals for the dataset summary, fed one DataFrame chunk at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.sums = {col: 0.0 for col in NUMERIC_COLUMNS}
+        self.non_null = {col: 0 for col in NUMERIC_COLUMNS}
+        self.type_counts = {}
+        self.stats = StatsAccumulator()
+        # Held back so a file that fits in one chunk gets exact statistics;
+        # it is folded into the sketches as soon as a second chunk arrives.
+        self.first_chunk = None
+
+    def update(self, chunk):
+        if len(chunk) == 0:
+            return  # an empty record batch, or a header-only CSV
+        if self.count == 0 and self.first_chunk is None:
+            self.first_chunk = chunk
+        else:
+            if self.first_chunk is not None:
+                self.stats.update(self.first_chunk)
+                self.first_chunk = None
+            self.stats.update(chunk)
+
+        self.count += len(chunk)
+
+        for col in NUMERIC_COLUMNS:
+            values = chunk[col]
+            self.sums[col] += float(values.sum())
+            self.non_null[col] += int(values.count())
+
+        self._count_types(chunk[TYPE_COLUMN])
+
+    def _count_types(self, types):
+        # Counts are merged in first-appearance order, which is the order
+        # value_counts() breaks frequency ties with.
+        if isinstance(types.dtype, pd.CategoricalDtype):
+            codes = types.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(types.cat.categories))
+            for code in pd.unique(codes):
+                if code >= 0:
+                    key = types.cat.categories[code]
+                    self.type_counts[key] = self.type_counts.get(key, 0) + int(counts[code])
+        else:
+            for key, n in types.value_counts(sort=False).items():
+                self.type_counts[key] = self.type_counts.get(key, 0) + int(n)
+
+    def result(self):
+        summary = {"count": self.count}
+
+        for col, key in SUMMARY_KEYS.items():
+            n = self.non_null[col]
+            summary[key] = self.sums[col] / n if n else float("nan")
+
+        counts = pd.Series(self.type_counts, dtype="int64")
+        summary["type_distribution"] = {
+            key: int(n) for key, n in counts.sort_values(ascending=False).items()
+        }
+
+        if self.first_chunk is not None:
+            extended = describe(self.first_chunk)
+        else:
+            extended = self.stats.result()
+        summary["stats"] = extended["stats"]
+        summary["type_stats"] = {
+            key: extended["type_stats"][key]
+            for key in summary["type_distribution"]
+            if key in extended["type_stats"]
+        }
+        return summary
+
+
+def summarize_chunks(chunks, rows=None):
+    """
+    Build the dataset summary from DataFrame chunks, handing each chunk to
+    ``rows.append()`` too when a ``row_store.RowWriter`` is given.
+    """
+    accumulator = SummaryAccumulator()
+
+    while True:
+        with phase("parse"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with phase("aggregate"):
+            accumulator.update(chunk)
+        if rows is not None:
+            with phase("store"):
+                rows.append(chunk)
+
+    with phase("aggregate"):
+        return accumulator.result()
+
+
+def summarize_csv(file, chunk_size=None, engine=None, file_format=CSV, compression=None, rows=None):
+    """
+    Build the dataset summary from an uploaded file object without loading
+    it whole. Compressed CSV, Parquet and Arrow IPC are read through
+    ``file_format``/``compression`` (see ``parsing.detect_format``). The
+    parsed chunks also go to ``rows``, a ``row_store.RowWriter``, if given.
+    """
+    chunks = iter_equipment_chunks(
+        file, chunk_size=chunk_size, engine=engine,
+        file_format=file_format, compression=compression,
+    )
+    return summarize_chunks(chunks, rows)
+
+
+def summarize_stored(dataset_id):
+    """The summary of a dataset recomputed from its stored rows, without any parsing."""
+    return summarize_chunks(row_store.iter_batches(dataset_id))
@@ -0,0 +1,192 @@
+"""
+Per-request phase timings, ``Server-Timing`` headers and latency metrics.
+
+``TimingMiddleware`` starts a recording for the instrumented endpoints
+(upload, history, dataset and row queries and the PDF reports). Code on
+the request path marks its phases:
+
+    with instrumentation.phase("parse"):
+        ...
+
+Phases with the same name add up, so a phase entered once per chunk
+reports its total. When the response leaves, the phase totals go out as a
+``Server-Timing`` header and into latency histograms, which
+``/api/metrics/`` exposes in the Prometheus text format to staff users
+and to scrapers holding ``EQUIPMENT_METRICS_TOKEN``.
+
+With ``EQUIPMENT_INSTRUMENTATION = False`` the middleware removes itself
+at startup and ``phase()`` hands back a shared no-op context manager.
+"""
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Upper bounds in seconds, Prometheus-style (cumulative, plus +Inf)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# URL names of the instrumented endpoints
+ENDPOINTS = {"upload", "history", "datasets", "dataset-rows", "report", "compare-report"}
+
+_recording = ContextVar("equipment_phases", default=None)
+_noop = nullcontext()
+
+
+def is_enabled():
+    return getattr(settings, "EQUIPMENT_INSTRUMENTATION", False)
+
+
+class _Phase:
+    __slots__ = ("phases", "name", "start")
+
+    def __init__(self, phases, name):
+        self.phases = phases
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.phases[self.name] = self.phases.get(self.name, 0.0) + elapsed
+
+
+def phase(name):
+    """Time a block as phase ``name`` of the current request, if one is recorded."""
+    phases = _recording.get()
+    if phases is None:
+        return _noop
+    return _Phase(phases, name)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Registry:
+    """Latency histograms per endpoint, and per endpoint and phase."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # (endpoint, method, status) -> Histogram
+        self.phases = {}  # (endpoint, phase) -> Histogram
+
+    def record(self, endpoint, method, status, total, phases):
+        with self.lock:
+            key = (endpoint, method, str(status))
+            self.requests.setdefault(key, Histogram()).observe(total)
+            for name, seconds in phases.items():
+                self.phases.setdefault((endpoint, name), Histogram()).observe(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.phases.clear()
+
+    def render(self):
+        with self.lock:
+            lines = []
+            _render_family(
+                lines, "equipment_request_duration_seconds",
+                "Time spent in instrumented API requests.",
+                ("endpoint", "method", "status"), self.requests,
+            )
+            _render_family(
+                lines, "equipment_phase_duration_seconds",
+                "Time spent in each phase of instrumented API requests.",
+                ("endpoint", "phase"), self.phases,
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _render_family(lines, metric, help_text, label_names, histograms):
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for key, hist in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip(hist.buckets + ("+Inf",), hist.counts):
+            cumulative += n
+            le = bound if bound == "+Inf" else repr(float(bound))
+            lines.append(f"{metric}_bucket{{{_labels(label_names, key, [('le', le)])}}} {cumulative}")
+        lines.append(f"{metric}_sum{{{_labels(label_names, key)}}} {hist.sum!r}")
+        lines.append(f"{metric}_count{{{_labels(label_names, key)}}} {hist.count}")
+
+
+registry = Registry()
+
+
+def server_timing(phases, total):
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in phases.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        # under ASGI, stay async so async views are not pushed onto a thread
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        phases = {}
+        token = _recording.set(phases)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recording.reset(token)
+        return self.finish(request, response, phases, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        phases = {}
+        token = _recording.set(phases)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recording.reset(token)
+        return self.finish(request, response, phases, time.perf_counter() - start)
+
+    def finish(self, request, response, phases, total):
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.url_name if match else None
+        if endpoint in ENDPOINTS:
+            response["Server-Timing"] = server_timing(phases, total)
+            registry.record(endpoint, request.method, response.status_code, total, phases)
+        return response
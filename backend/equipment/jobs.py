@@ -0,0 +1,176 @@
+"""
+Background report rendering.
+
+Jobs run on a local executor owned by this process: a process pool by
+default, or a thread pool with ``EQUIPMENT_REPORT_JOB_BACKEND = "thread"``.
+No broker is involved, so job ids are only known to the server process
+that created them. Workers write the PDF into the report cache and the
+result endpoint serves it from there. Bulk exports (``bulk_export``)
+render on the same pool through ``render()``.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_JOB_TTL = 3600
+DEFAULT_MAX_JOBS = 1000
+
+_executor = None
+_jobs = {}
+_lock = threading.Lock()
+
+
+@dataclass
+class ReportJob:
+    id: str
+    dataset_id: int
+    version: str
+    status: str = PENDING
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    finished_at: float = None
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "dataset_id": self.dataset_id,
+            "status": self.status,
+            "error": self.error or None,
+        }
+
+
+def _init_worker():
+    # spawned workers start from a bare interpreter
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+
+def _render(dataset, version):
+    from . import report_cache
+
+    report_cache.open_or_build(dataset, version).close()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, "EQUIPMENT_REPORT_JOB_WORKERS", DEFAULT_WORKERS)
+        if getattr(settings, "EQUIPMENT_REPORT_JOB_BACKEND", "process") == "thread":
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-job")
+        else:
+            # spawn rather than fork: the server already runs threads
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+    return _executor
+
+
+def _submit(fn, *args):
+    """
+    ``executor.submit()`` on the pool. A worker process that dies breaks a
+    ``ProcessPoolExecutor`` for good, so a broken pool is replaced and the
+    submission tried once more.
+    """
+    global _executor
+    with _lock:
+        executor = _get_executor()
+    try:
+        return executor.submit(fn, *args)
+    except BrokenExecutor:
+        with _lock:
+            if _executor is executor:  # not already replaced by another thread
+                _executor = None
+            executor.shutdown(wait=False)
+            executor = _get_executor()
+    return executor.submit(fn, *args)
+
+
+def _prune():
+    ttl = getattr(settings, "EQUIPMENT_REPORT_JOB_TTL", DEFAULT_JOB_TTL)
+    max_jobs = getattr(settings, "EQUIPMENT_REPORT_JOB_MAX", DEFAULT_MAX_JOBS)
+    now = time.time()
+
+    finished = sorted(
+        (job for job in _jobs.values() if job.finished_at is not None),
+        key=lambda job: job.finished_at,
+    )
+    for job in finished:
+        if now - job.finished_at > ttl or len(_jobs) > max_jobs:
+            del _jobs[job.id]
+
+
+def _finish(job, error=None):
+    with _lock:
+        job.status = FAILED if error else DONE
+        job.error = str(error) if error else ""
+        job.finished_at = time.time()
+
+
+def submit(dataset, version):
+    """Queue a render of ``dataset``'s report and return the new job."""
+    from . import report_cache
+
+    job = ReportJob(id=uuid.uuid4().hex, dataset_id=dataset.id, version=version)
+
+    with _lock:
+        _prune()
+        _jobs[job.id] = job
+        if report_cache.get(dataset.id, version):
+            job.status = DONE
+            job.finished_at = time.time()
+            return job
+
+    try:
+        future = _submit(_render, _snapshot(dataset), version)
+    except Exception as exc:
+        # it was never queued; don't leave it pending forever
+        _finish(job, exc)
+        return job
+    future.add_done_callback(lambda f: _finish(job, f.exception()))
+    return job
+
+
+def _snapshot(dataset):
+    # a detached instance, so the worker never touches the database
+    return type(dataset)(
+        id=dataset.id,
+        name=dataset.name,
+        uploaded_at=dataset.uploaded_at,
+        summary=dataset.summary,
+    )
+
+
+def render(dataset, version):
+    """
+    Render ``dataset``'s report into the report cache on the pool, without
+    tracking a job; returns the ``Future``.
+    """
+    return _submit(_render, _snapshot(dataset), version)
+
+
+def get(job_id):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def shutdown(wait=True):
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
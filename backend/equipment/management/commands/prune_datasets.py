@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from equipment import retention
+
+
+class Command(BaseCommand):
+    help = "Delete datasets outside the retention policy (EQUIPMENT_RETENTION)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-count", type=int, help="Keep only the newest N datasets.")
+        parser.add_argument("--max-age-days", type=float, help="Drop datasets older than this.")
+        parser.add_argument("--per-user", type=int, help="Keep only the newest N datasets per owner.")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Rows deleted per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report how many datasets would be deleted without deleting them.",
+        )
+
+    def handle(self, *args, **options):
+        policy = retention.get_policy(
+            MAX_COUNT=options["max_count"],
+            MAX_AGE=options["max_age_days"],
+            PER_USER_QUOTA=options["per_user"],
+        )
+
+        if options["dry_run"]:
+            count = retention.expired(policy).count()
+            self.stdout.write(f"{count} dataset(s) would be deleted.")
+            return
+
+        deleted = retention.prune(policy, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} dataset(s)."))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0003_dataset_owner_retention_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='avg_flowrate',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='avg_pressure',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='avg_temperature',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='row_count',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='EquipmentTypeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_type', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField()),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='type_counts', to='equipment.dataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['equipment_type', 'count'], name='type_count_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'equipment_type'), name='type_count_unique_per_dataset')],
+            },
+        ),
+    ]
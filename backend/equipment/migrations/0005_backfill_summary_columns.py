@@ -0,0 +1,54 @@
+import math
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+SUMMARY_COLUMNS = {
+    "count": "row_count",
+    "avg_flowrate": "avg_flowrate",
+    "avg_pressure": "avg_pressure",
+    "avg_temperature": "avg_temperature",
+}
+
+
+def backfill(apps, schema_editor):
+    Dataset = apps.get_model("equipment", "Dataset")
+    EquipmentTypeCount = apps.get_model("equipment", "EquipmentTypeCount")
+
+    batch, type_rows = [], []
+
+    def flush():
+        Dataset.objects.bulk_update(batch, list(SUMMARY_COLUMNS.values()))
+        EquipmentTypeCount.objects.bulk_create(type_rows)
+        batch.clear()
+        type_rows.clear()
+
+    for dataset in Dataset.objects.only("id", "summary").iterator(chunk_size=BATCH_SIZE):
+        summary = dataset.summary or {}
+        for key, column in SUMMARY_COLUMNS.items():
+            value = summary.get(key)
+            if isinstance(value, float) and math.isnan(value):
+                value = None
+            setattr(dataset, column, value)
+        batch.append(dataset)
+
+        for name, count in (summary.get("type_distribution") or {}).items():
+            type_rows.append(
+                EquipmentTypeCount(dataset_id=dataset.id, equipment_type=name, count=count)
+            )
+
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0004_summary_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,91 @@
-from django.db import models
+import math
+
+from django.conf import settings
+from django.db import models, transaction
+
+from .parsing import MAX_TYPE_LENGTH
+
+# summary key -> indexed Dataset column holding a copy of it
+SUMMARY_COLUMNS = {
+    "count": "row_count",
+    "avg_flowrate": "avg_flowrate",
+    "avg_pressure": "avg_pressure",
+    "avg_temperature": "avg_temperature",
+}
+
+
+def summary_columns(summary):
+    """Column values for the hot fields of ``summary`` (NaN averages become NULL)."""
+    columns = {}
+    for key, column in SUMMARY_COLUMNS.items():
+        value = summary.get(key)
+        if isinstance(value, float) and math.isnan(value):
+            value = None
+        columns[column] = value
+    return columns
+
+
+class DatasetManager(models.Manager):
+    def create_from_summary(self, summary, **kwargs):
+        """Create a dataset with its summary columns and type distribution rows."""
+        with transaction.atomic():
+            dataset = self.create(summary=summary, **summary_columns(summary), **kwargs)
+            EquipmentTypeCount.objects.bulk_create(
+                EquipmentTypeCount(dataset=dataset, equipment_type=name, count=count)
+                for name, count in summary.get("type_distribution", {}).items()
+            )
+        return dataset
+
 
 class Dataset(models.Model):
     name = models.CharField(max_length=200)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     summary = models.JSONField()
+    # sha256 of the uploaded file, used to answer repeat uploads
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='datasets',
+    )
+
+    # copies of summary fields, so they can be filtered and sorted in SQL
+    row_count = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    avg_flowrate = models.FloatField(null=True, blank=True, db_index=True)
+    avg_pressure = models.FloatField(null=True, blank=True, db_index=True)
+    avg_temperature = models.FloatField(null=True, blank=True, db_index=True)
+
+    objects = DatasetManager()
+
+    class Meta:
+        indexes = [
+            # newest-first scans for history and retention
+            models.Index(fields=['uploaded_at', 'id'], name='dataset_uploaded_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class EquipmentTypeCount(models.Model):
+    """One row of a dataset's ``type_distribution``."""
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='type_counts')
+    equipment_type = models.CharField(max_length=MAX_TYPE_LENGTH)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dataset', 'equipment_type'], name='type_count_unique_per_dataset'
+            ),
+        ]
+        indexes = [
+            # "datasets containing Compressors", optionally by how many
+            models.Index(fields=['equipment_type', 'count'], name='type_count_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset_id}: {self.equipment_type} x{self.count}"
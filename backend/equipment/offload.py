@@ -0,0 +1,70 @@
+"""
+Bounded executor for the CPU-bound work of the async views.
+
+The event loop must never parse a CSV or lay out a PDF itself, so the
+ASGI views hand that work to ``run()``, which executes it on a thread pool
+of ``EQUIPMENT_ASYNC_WORKERS`` threads, one per core by default. At most
+``EQUIPMENT_ASYNC_QUEUE`` more calls may wait for a free thread. Past
+that, ``run()`` raises ``Saturated`` straight away, and the views answer
+503 with ``Retry-After`` instead of queueing without bound.
+
+Threads rather than processes: uploads arrive as open files that cannot
+be sent to another process, and the pandas and pyarrow parsers release
+the GIL for most of their work. PDF rendering holds the GIL, so a busy
+pool still slows the loop a little, but it never blocks it.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_QUEUE = 16
+RETRY_AFTER = 1
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class Saturated(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+
+def _get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, "EQUIPMENT_ASYNC_WORKERS", DEFAULT_WORKERS)
+            queue = getattr(settings, "EQUIPMENT_ASYNC_QUEUE", DEFAULT_QUEUE)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="equipment-cpu")
+            _slots = threading.BoundedSemaphore(workers + queue)
+        return _executor, _slots
+
+
+async def run(fn, *args, **kwargs):
+    """Await ``fn(*args, **kwargs)`` on the pool; raise ``Saturated`` when it is full."""
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise Saturated()
+    # the caller's context goes along, so instrumentation phases still record
+    context = contextvars.copy_context()
+    try:
+        future = executor.submit(context.run, fn, *args, **kwargs)
+    except BaseException:
+        slots.release()
+        raise
+    # the slot is held until the work finishes, even if the request is cancelled
+    future.add_done_callback(lambda f: slots.release())
+    return await asyncio.wrap_future(future)
+
+
+def shutdown(wait=True):
+    global _executor, _slots
+    with _lock:
+        executor, _executor, _slots = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
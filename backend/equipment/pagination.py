@@ -0,0 +1,150 @@
+"""
+Pagination for the dataset endpoints.
+
+History uses keyset (cursor) pagination over ``(uploaded_at, id)``, newest
+first. Pages are fetched with a ``WHERE (uploaded_at, id) < cursor`` seek
+on the ``dataset_uploaded_idx`` index instead of an OFFSET, so page cost
+does not grow with depth. The dataset query API sorts on arbitrary
+(nullable) columns and pages with limit/offset instead. Stored rows
+(``row_queries``) page on an opaque cursor over their sort key and row
+number, with larger pages.
+
+Either way the body stays a plain list, as before; the next page is
+advertised in a ``Link: <...>; rel="next"`` header.
+"""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+DEFAULT_PAGE_SIZE = 5
+MAX_PAGE_SIZE = 100
+DEFAULT_ROWS_PAGE_SIZE = 100
+MAX_ROWS_PAGE_SIZE = 1000
+
+
+def encode_cursor(uploaded_at, pk):
+    raw = f"{uploaded_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        uploaded_at, pk = raw.split("|")
+        return datetime.fromisoformat(uploaded_at), int(pk)
+    except ValueError:
+        raise ValidationError({"cursor": "Invalid cursor."})
+
+
+class LinkHeaderPagination:
+    limit_query_param = "limit"
+    max_limit = MAX_PAGE_SIZE
+
+    def __init__(self, request):
+        self.request = request
+        self.limit = self.get_limit()
+        self.next_params = None
+
+    def get_default_limit(self):
+        return getattr(settings, "EQUIPMENT_HISTORY_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+
+    def get_limit(self):
+        raw = self.request.query_params.get(self.limit_query_param)
+        if raw is None:
+            return self.get_default_limit()
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer."})
+        return max(1, min(limit, self.max_limit))
+
+    def get_next_link(self):
+        if self.next_params is None:
+            return None
+        params = self.request.query_params.copy()
+        for key, value in self.next_params.items():
+            params[key] = value
+        return self.request.build_absolute_uri(f"{self.request.path}?{params.urlencode()}")
+
+    def add_headers(self, response):
+        next_link = self.get_next_link()
+        if next_link:
+            response["Link"] = f'<{next_link}>; rel="next"'
+        return response
+
+
+class KeysetPagination(LinkHeaderPagination):
+    cursor_query_param = "cursor"
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cursor = request.query_params.get(self.cursor_query_param)
+        self.next_cursor = None
+
+    def _keys_query(self, queryset):
+        queryset = queryset.order_by("-uploaded_at", "-id")
+        if self.cursor:
+            uploaded_at, pk = decode_cursor(self.cursor)
+            queryset = queryset.filter(
+                Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=pk)
+            )
+        return queryset.values_list("id", "uploaded_at")[: self.limit + 1]
+
+    def page_keys(self, queryset):
+        """``(id, uploaded_at)`` pairs for this page, read straight off the index."""
+        return self._page(list(self._keys_query(queryset)))
+
+    async def apage_keys(self, queryset):
+        """Async ``page_keys``, for the ASGI views."""
+        return self._page([key async for key in self._keys_query(queryset)])
+
+    def _page(self, keys):
+        if len(keys) > self.limit:
+            keys = keys[: self.limit]
+            self.next_cursor = encode_cursor(keys[-1][1], keys[-1][0])
+            self.next_params = {self.cursor_query_param: self.next_cursor}
+        return keys
+
+
+class OffsetPagination(LinkHeaderPagination):
+    offset_query_param = "offset"
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.offset = self.get_offset()
+
+    def get_offset(self):
+        raw = self.request.query_params.get(self.offset_query_param, "0")
+        try:
+            offset = int(raw)
+        except ValueError:
+            raise ValidationError({"offset": "Must be an integer."})
+        return max(0, offset)
+
+    def paginate(self, queryset):
+        page = list(queryset[self.offset: self.offset + self.limit + 1])
+        if len(page) > self.limit:
+            page = page[: self.limit]
+            self.next_params = {self.offset_query_param: str(self.offset + self.limit)}
+        return page
+
+
+class RowPagination(LinkHeaderPagination):
+    """Cursor pages of a dataset's stored rows; the cursor comes from ``row_queries``."""
+
+    cursor_query_param = "cursor"
+    max_limit = MAX_ROWS_PAGE_SIZE
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cursor = request.query_params.get(self.cursor_query_param)
+
+    def get_default_limit(self):
+        return getattr(settings, "EQUIPMENT_ROWS_PAGE_SIZE", DEFAULT_ROWS_PAGE_SIZE)
+
+    def set_next_cursor(self, cursor):
+        if cursor is not None:
+            self.next_params = {self.cursor_query_param: cursor}
@@ -0,0 +1,291 @@
+import gzip
+import io
+import zlib
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from django.conf import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the install
+    pa = None
+    pa_csv = None
+    pq = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the install
+    zstandard = None
+
+_CODEC_ERRORS = (zstandard.ZstdError,) if zstandard is not None else ()
+
+# Columns of the equipment CSV that the summary actually reads.
+# "Equipment Name" is never projected.
+TYPE_COLUMN = "Type"
+NUMERIC_COLUMNS = ("Flowrate", "Pressure", "Temperature")
+USED_COLUMNS = (TYPE_COLUMN,) + NUMERIC_COLUMNS
+
+# longest Type value; the length of EquipmentTypeCount.equipment_type
+MAX_TYPE_LENGTH = 100
+
+PANDAS_DTYPES = {TYPE_COLUMN: "category", **{col: "float64" for col in NUMERIC_COLUMNS}}
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# pyarrow reads in byte blocks rather than rows; this is roughly what a
+# 50k-row chunk of the equipment schema takes on disk.
+ARROW_BLOCK_SIZE = 2 << 20
+
+
+# Upload formats and the compressions CSV may arrive in
+CSV = "csv"
+PARQUET = "parquet"
+ARROW = "arrow"
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+FORMAT_EXTENSIONS = {
+    ".csv": CSV,
+    ".parquet": PARQUET,
+    ".pq": PARQUET,
+    ".arrow": ARROW,
+    ".arrows": ARROW,
+    ".ipc": ARROW,
+    ".feather": ARROW,
+}
+FORMAT_CONTENT_TYPES = {
+    "application/vnd.apache.parquet": PARQUET,
+    "application/x-parquet": PARQUET,
+    "application/vnd.apache.arrow.file": ARROW,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+COMPRESSION_EXTENSIONS = {".gz": GZIP, ".gzip": GZIP, ".zst": ZSTD, ".zstd": ZSTD}
+COMPRESSION_CONTENT_TYPES = {
+    "application/gzip": GZIP,
+    "application/x-gzip": GZIP,
+    "application/zstd": ZSTD,
+}
+CONTENT_ENCODINGS = {"identity": None, "gzip": GZIP, "x-gzip": GZIP, "zstd": ZSTD}
+
+
+class ParseError(ValueError):
+    pass
+
+
+class UnsupportedFormat(ParseError):
+    pass
+
+
+def detect_format(name, content_type=None, content_encoding=None):
+    """
+    Return ``(format, compression)`` for an upload from its file name, its
+    part's Content-Type and the request's Content-Encoding. Anything not
+    recognised is read as plain CSV, as before.
+    """
+    name = (name or "").lower()
+    content_type = (content_type or "").split(";")[0].strip().lower()
+
+    compression = None
+    if content_encoding:
+        encoding = content_encoding.strip().lower()
+        if encoding not in CONTENT_ENCODINGS:
+            raise UnsupportedFormat(f"Unsupported Content-Encoding: {content_encoding}")
+        compression = CONTENT_ENCODINGS[encoding]
+
+    for ext, kind in COMPRESSION_EXTENSIONS.items():
+        if name.endswith(ext):
+            compression = compression or kind
+            name = name[: -len(ext)]
+            break
+    else:
+        compression = compression or COMPRESSION_CONTENT_TYPES.get(content_type)
+
+    file_format = FORMAT_CONTENT_TYPES.get(content_type, CSV)
+    for ext, kind in FORMAT_EXTENSIONS.items():
+        if name.endswith(ext):
+            file_format = kind
+            break
+
+    if compression and file_format != CSV:
+        # both columnar formats compress internally
+        raise UnsupportedFormat(f"{file_format} files cannot be {compression}-compressed")
+    return file_format, compression
+
+
+def strip_compression(name):
+    """``name`` without its compression extension: ``plant.csv.gz`` -> ``plant.csv``."""
+    lower = name.lower()
+    for ext in COMPRESSION_EXTENSIONS:
+        if lower.endswith(ext) and len(name) > len(ext):
+            return name[: -len(ext)]
+    return name
+
+
+def get_chunk_size():
+    return getattr(settings, "EQUIPMENT_INGEST_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+
+def get_engine(engine=None):
+    engine = engine or getattr(settings, "EQUIPMENT_CSV_ENGINE", "auto")
+    if engine == "auto":
+        return "pyarrow" if pa_csv is not None else "c"
+    if engine == "pyarrow" and pa_csv is None:
+        return "c"
+    return engine
+
+
+def _as_binary(file):
+    # Django upload wrappers and text buffers both end up here; pyarrow
+    # wants a binary stream.
+    if isinstance(file, io.TextIOBase):
+        return io.BytesIO(file.read().encode())
+    return getattr(file, "file", file)
+
+
+def _decompressed(file, compression):
+    """A binary stream that decompresses ``file`` as it is read."""
+    binary = _as_binary(file)
+    if compression == GZIP:
+        return gzip.GzipFile(fileobj=binary, mode="rb")
+    if compression == ZSTD:
+        if zstandard is None:
+            raise UnsupportedFormat("zstd uploads need the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(binary)
+    return binary
+
+
+def iter_decompressed(file, compression, block_size=1 << 20):
+    """Yield the decompressed bytes of ``file`` a block at a time."""
+    try:
+        # not closed: zstandard's reader would close ``file`` with it
+        stream = _decompressed(file, compression)
+        while block := stream.read(block_size):
+            yield block
+    except ParseError:
+        raise
+    except (OSError, EOFError, zlib.error, *_CODEC_ERRORS) as exc:
+        raise ParseError(str(exc)) from exc
+
+
+def _conform(df):
+    """Project a columnar chunk and give it the CSV readers' dtypes."""
+    return df[list(USED_COLUMNS)].astype(PANDAS_DTYPES)
+
+
+def _require_pyarrow(file_format):
+    if pa is None:
+        raise UnsupportedFormat(f"{file_format} uploads need pyarrow")
+
+
+def _iter_parquet_chunks(file, chunk_size):
+    _require_pyarrow(PARQUET)
+    parquet = pq.ParquetFile(_as_binary(file))
+    # only the used columns' pages are read
+    for batch in parquet.iter_batches(batch_size=chunk_size, columns=list(USED_COLUMNS)):
+        yield _conform(batch.to_pandas())
+
+
+def _iter_arrow_ipc_chunks(file):
+    _require_pyarrow(ARROW)
+    source = _as_binary(file)
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        # not the random-access file format; try the streaming one
+        source.seek(0)
+        batches = pa.ipc.open_stream(source)
+
+    for batch in batches:
+        projected = pa.RecordBatch.from_arrays(
+            [batch.column(col) for col in USED_COLUMNS], names=list(USED_COLUMNS)
+        )
+        yield _conform(projected.to_pandas())
+
+
+def _iter_arrow_chunks(file):
+    reader = pa_csv.open_csv(
+        file,
+        read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(USED_COLUMNS),
+            column_types={
+                TYPE_COLUMN: pa.dictionary(pa.int32(), pa.string()),
+                **{col: pa.float64() for col in NUMERIC_COLUMNS},
+            },
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def _iter_pandas_chunks(file, chunk_size):
+    reader = pd.read_csv(
+        file,
+        usecols=list(USED_COLUMNS),
+        dtype=PANDAS_DTYPES,
+        chunksize=chunk_size,
+    )
+    with reader:
+        yield from reader
+
+
+def _check_types(chunk):
+    # type names become EquipmentTypeCount rows; a longer one would fail
+    # the insert on databases that enforce the column length
+    types = chunk[TYPE_COLUMN]
+    names = types.cat.categories if isinstance(types.dtype, pd.CategoricalDtype) else types.dropna().unique()
+    for name in names:
+        if len(str(name)) > MAX_TYPE_LENGTH:
+            raise ParseError(
+                f"Type names can be at most {MAX_TYPE_LENGTH} characters; "
+                f"{str(name)[:20]!r}... has {len(str(name))}"
+            )
+
+
+def iter_equipment_chunks(file, chunk_size=None, engine=None, file_format=CSV, compression=None):
+    """
+    Yield DataFrame chunks of the equipment data with only the used columns,
+    float64 numerics and a categorical Type.
+
+    ``file_format`` and ``compression`` come from :func:`detect_format`.
+    Compressed CSV is decompressed as it streams through the reader.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    try:
+        if file_format == PARQUET:
+            chunks = _iter_parquet_chunks(file, chunk_size)
+        elif file_format == ARROW:
+            chunks = _iter_arrow_ipc_chunks(file)
+        elif get_engine(engine) == "pyarrow":
+            chunks = _iter_arrow_chunks(_decompressed(file, compression))
+        else:
+            stream = _decompressed(file, compression) if compression else file
+            chunks = _iter_pandas_chunks(stream, chunk_size)
+        for chunk in chunks:
+            _check_types(chunk)
+            yield chunk
+    except ParseError:
+        raise
+    except (ValueError, KeyError, OSError, EOFError, zlib.error, *_CODEC_ERRORS) as exc:
+        # pyarrow's ArrowInvalid and ArrowKeyError subclass these too, and
+        # corrupt compressed input surfaces as OSError, EOFError or zlib.error
+        raise ParseError(str(exc)) from exc
+
+
+def read_equipment_csv(file, engine=None):
+    chunks = list(iter_equipment_chunks(file, engine=engine))
+    if not chunks:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in PANDAS_DTYPES.items()})
+
+    # chunks carry their own categories, so merge them instead of letting
+    # concat fall back to an object column
+    types = union_categoricals([chunk[TYPE_COLUMN] for chunk in chunks])
+    df = pd.concat([chunk[list(NUMERIC_COLUMNS)] for chunk in chunks], ignore_index=True)
+    df.insert(0, TYPE_COLUMN, types)
+    return df
@@ -0,0 +1,83 @@
+"""
+Filtering and sorting datasets on their indexed summary columns.
+
+``/api/datasets/`` takes Django-style lookups on the numeric columns,
+``type=`` for datasets containing an equipment type, and ``ordering=``:
+
+    ?avg_pressure__gt=7&type=Compressor&ordering=-avg_pressure
+
+Every condition becomes SQL on ``Dataset``'s columns or an EXISTS on the
+``EquipmentTypeCount`` table, so no summary JSON is decoded to answer it.
+"""
+from django.db.models import Exists, F, OuterRef
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import EquipmentTypeCount
+
+
+def _datetime(raw):
+    value = parse_datetime(raw)
+    if value is None:
+        raise ValueError(raw)
+    return value
+
+
+FILTER_FIELDS = {
+    "row_count": int,
+    "avg_flowrate": float,
+    "avg_pressure": float,
+    "avg_temperature": float,
+    "uploaded_at": _datetime,
+}
+LOOKUPS = ("exact", "gt", "gte", "lt", "lte")
+ORDERING_FIELDS = ("id", "name", "uploaded_at") + tuple(
+    name for name in FILTER_FIELDS if name != "uploaded_at"
+)
+DEFAULT_ORDERING = "-uploaded_at"
+
+# query parameters that are not filters
+RESERVED_PARAMS = {"type", "ordering", "fields", "limit", "offset", "format"}
+
+
+def parse_filters(params):
+    """``{"avg_pressure__gt": 7.0, ...}`` from the query parameters."""
+    filters = {}
+    for key in params:
+        if key in RESERVED_PARAMS:
+            continue
+        field, _, lookup = key.partition("__")
+        lookup = lookup or "exact"
+        if field not in FILTER_FIELDS or lookup not in LOOKUPS:
+            raise ValidationError({key: "Unknown filter."})
+        try:
+            filters[f"{field}__{lookup}"] = FILTER_FIELDS[field](params[key])
+        except ValueError:
+            raise ValidationError({key: "Invalid value."})
+    return filters
+
+
+def parse_ordering(raw):
+    """Order expressions for ``ordering=a,-b``; NULLs sort last either way."""
+    terms = [term.strip() for term in (raw or DEFAULT_ORDERING).split(",") if term.strip()]
+    order_by = []
+    for term in terms:
+        name = term.lstrip("-")
+        if name not in ORDERING_FIELDS:
+            raise ValidationError({"ordering": f"Cannot order by {name}."})
+        expression = F(name)
+        order_by.append(
+            expression.desc(nulls_last=True) if term.startswith("-") else expression.asc(nulls_last=True)
+        )
+    if not any(term.lstrip("-") == "id" for term in terms):
+        order_by.append(F("id").desc())  # stable pages
+    return order_by
+
+
+def filter_datasets(queryset, params):
+    queryset = queryset.filter(**parse_filters(params))
+    for equipment_type in params.getlist("type"):
+        queryset = queryset.filter(Exists(
+            EquipmentTypeCount.objects.filter(dataset=OuterRef("pk"), equipment_type=equipment_type)
+        ))
+    return queryset.order_by(*parse_ordering(params.get("ordering")))
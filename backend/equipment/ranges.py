@@ -0,0 +1,149 @@
+"""
+File responses with ``Content-Length`` and single-range ``Range`` support.
+
+``file_response()`` serves an open file as a whole (200) or as the one
+byte range a ``Range: bytes=...`` header asks for (206), and answers 416
+to a range past the end of the file. A range is only honoured while an
+``If-Range`` validator, if sent, still matches. Multi-range requests and
+headers that don't parse get the whole file, which RFC 9110 allows.
+``async_file_response()`` does the same for async views. It streams from
+an async iterator, because Django would read a sync one whole into
+memory under ASGI.
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+BLOCK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Inclusive ``(start, end)`` of a single-range header, or None to send everything."""
+    match = _RANGE.match(header.replace(" ", ""))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)  # "-500" is the last 500 bytes
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def requested_range(request, size, etag=None, last_modified=None):
+    header = request.headers.get("Range")
+    if not header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range is not None and if_range not in (etag, last_modified):
+        # the client's partial copy is of another version
+        return None
+    return parse_range(header, size)
+
+
+def _size(file):
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    return size
+
+
+class _FileRange:
+    """Read-only view of ``length`` bytes of ``file`` from ``start``."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _not_satisfiable(file, size):
+    file.close()
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def _range_headers(response, byte_range, size):
+    if byte_range is None:
+        response["Content-Length"] = str(size)
+    else:
+        start, end = byte_range
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def file_response(request, file, content_type, etag=None, last_modified=None):
+    """Serve the open ``file``, or the part of it the request's ``Range`` asks for."""
+    size = _size(file)
+    try:
+        byte_range = requested_range(request, size, etag, last_modified)
+    except RangeNotSatisfiable:
+        return _not_satisfiable(file, size)
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(_FileRange(file, start, end - start + 1), content_type=content_type, status=206)
+    response.block_size = BLOCK_SIZE
+    return _range_headers(response, byte_range, size)
+
+
+async def _aiter_file(file, start, length):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        await sync_to_async(file.seek, thread_sensitive=False)(start)
+        while length > 0:
+            data = await read(min(BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def async_file_response(request, file, content_type, etag=None, last_modified=None):
+    """``file_response()`` for async views; the file is read off the event loop."""
+    size = _size(file)
+    try:
+        byte_range = requested_range(request, size, etag, last_modified)
+    except RangeNotSatisfiable:
+        return _not_satisfiable(file, size)
+
+    start, end = byte_range or (0, size - 1)
+    response = StreamingHttpResponse(
+        _aiter_file(file, start, end - start + 1),
+        content_type=content_type,
+        status=200 if byte_range is None else 206,
+    )
+    return _range_headers(response, byte_range, size)
@@ -0,0 +1,115 @@
+"""
+On-disk cache of rendered PDF reports.
+
+Files are named ``<dataset id>-<report version>.pdf`` so a changed summary
+or template simply misses, and a dataset's entries can be dropped by
+prefix when it is deleted. The directory is capped at
+``EQUIPMENT_REPORT_CACHE_MAX_BYTES``; hits refresh a file's mtime and the
+least recently used files are evicted first.
+"""
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+from .reports import build_report
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+_evict_lock = threading.Lock()
+
+
+def get_cache_dir():
+    path = Path(getattr(settings, "EQUIPMENT_REPORT_CACHE_DIR", settings.BASE_DIR / "report_cache"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_max_bytes():
+    return getattr(settings, "EQUIPMENT_REPORT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+
+
+def entry_path(dataset_id, version):
+    return get_cache_dir() / f"{dataset_id}-{version}.pdf"
+
+
+def get(dataset_id, version):
+    path = entry_path(dataset_id, version)
+    try:
+        os.utime(path)  # LRU touch
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def _put(dataset_id, version, write):
+    path = entry_path(dataset_id, version)
+
+    # build next to the target and rename, so readers never see half a PDF
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # opened under the eviction lock, so another request's evict() can't
+        # remove the entry before we hold it
+        with _evict_lock:
+            os.replace(tmp, path)
+            file = open(path, "rb")
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+    evict(keep=path)
+    return path, file
+
+
+def put(dataset_id, version, write):
+    """Store the bytes produced by ``write(fileobj)`` and return the entry path."""
+    path, file = _put(dataset_id, version, write)
+    file.close()
+    return path
+
+
+def open_or_build(dataset, version):
+    """Open the cached PDF for ``dataset``, rendering it first on a miss."""
+    path = get(dataset.id, version)
+    if path is not None:
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            pass  # evicted by another request since the lookup
+    return _put(dataset.id, version, lambda f: build_report(dataset, f))[1]
+
+
+def invalidate(dataset_id):
+    for path in get_cache_dir().glob(f"{dataset_id}-*.pdf"):
+        path.unlink(missing_ok=True)
+
+
+def evict(max_bytes=None, keep=None):
+    max_bytes = get_max_bytes() if max_bytes is None else max_bytes
+
+    with _evict_lock:
+        entries = []
+        for path in get_cache_dir().glob("*.pdf"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                # still open for reading on platforms that lock it
+                continue
+            total -= size
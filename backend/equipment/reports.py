@@ -0,0 +1,208 @@
+import hashlib
+import json
+from xml.sax.saxutils import escape
+
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Table, Image
+)
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.platypus import TableStyle
+from reportlab.lib import colors
+
+from django.conf import settings
+
+from . import vector_charts
+from .instrumentation import phase
+
+# Bump whenever the report layout changes so cached PDFs are rebuilt.
+REPORT_TEMPLATE_VERSION = 3
+COMPARISON_TEMPLATE_VERSION = 2
+
+CHART_SIZE = 3.2 * inch
+
+
+def get_chart_backend():
+    """"vector" (reportlab.graphics) or "raster" (matplotlib PNGs)."""
+    return getattr(settings, "EQUIPMENT_REPORT_CHARTS", "vector")
+
+
+def report_version(dataset):
+    """Hash of everything that ends up in a dataset's PDF."""
+    payload = json.dumps(
+        {
+            "template": REPORT_TEMPLATE_VERSION,
+            "charts": get_chart_backend(),
+            "name": dataset.name,
+            "uploaded_at": dataset.uploaded_at.isoformat(),
+            "summary": dataset.summary,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def comparison_version(datasets):
+    """Hash of everything that ends up in the comparison PDF of ``datasets``."""
+    payload = json.dumps(
+        [COMPARISON_TEMPLATE_VERSION, get_chart_backend()] + [report_version(d) for d in datasets]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _document(out):
+    return SimpleDocTemplate(
+        out,
+        pagesize=A4,
+        rightMargin=36,
+        leftMargin=36,
+        topMargin=36,
+        bottomMargin=36
+    )
+
+
+def _charts_table(summary):
+    with phase("charts"):
+        if get_chart_backend() == "raster":
+            # matplotlib is only imported on this path
+            from .charts import render_summary_charts
+
+            pie_buffer, bar_buffer = render_summary_charts(summary)
+            charts = [
+                Image(pie_buffer, width=CHART_SIZE, height=CHART_SIZE),
+                Image(bar_buffer, width=CHART_SIZE, height=CHART_SIZE),
+            ]
+        else:
+            charts = list(vector_charts.summary_charts(summary, CHART_SIZE))
+
+    charts_table = Table([charts], colWidths=[3.5 * inch, 3.5 * inch])
+
+    charts_table.setStyle(TableStyle([
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 10),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+        ("TOPPADDING", (0, 0), (-1, -1), 10),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 10),
+    ]))
+    return charts_table
+
+
+def build_report(dataset, out):
+    """Lay out the analysis report for ``dataset`` and write the PDF to ``out``."""
+    s = dataset.summary
+
+    doc = _document(out)
+
+    styles = getSampleStyleSheet()
+    elements = []
+
+    # ---------- TITLE ----------
+    elements.append(Paragraph("ChemViz – Analysis Report", styles["Title"]))
+    elements.append(Spacer(1, 12))
+
+    elements.append(Paragraph(f"<b>Dataset:</b> {dataset.name}", styles["Normal"]))
+    elements.append(Paragraph(f"<b>Uploaded:</b> {dataset.uploaded_at}", styles["Normal"]))
+    elements.append(Spacer(1, 16))
+
+    # ---------- SUMMARY TABLE ----------
+    table_data = [
+        ["Metric", "Value"],
+        ["Samples", s["count"]],
+        ["Avg Flowrate", round(s["avg_flowrate"], 2)],
+        ["Avg Pressure", round(s["avg_pressure"], 2)],
+        ["Avg Temperature", round(s["avg_temperature"], 2)],
+    ]
+
+    summary_table = Table(table_data, colWidths=[3 * inch, 2 * inch])
+    summary_table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+        ("TOPPADDING", (0, 0), (-1, 0), 8),
+    ]))
+
+    elements.append(summary_table)
+    elements.append(Spacer(1, 24))
+
+    # ---------- CHARTS SIDE-BY-SIDE (SINGLE PAGE) ----------
+    elements.append(Paragraph("Visual Analysis", styles["Heading2"]))
+    elements.append(Spacer(1, 12))
+    elements.append(_charts_table(s))
+
+    # ---------- BUILD PDF ----------
+    with phase("layout"):
+        doc.build(elements)
+
+
+def _fmt(value, digits=2, signed=False):
+    if value is None:
+        return "–"
+    return f"{value:+.{digits}f}" if signed else f"{value:.{digits}f}"
+
+
+def build_comparison_report(comparison, out):
+    """Lay out a comparison from ``compare.compare()`` and write the PDF to ``out``."""
+    merged = comparison["merged"]
+    doc = _document(out)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    # ---------- TITLE ----------
+    elements.append(Paragraph("ChemViz – Comparison Report", styles["Title"]))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(
+        f"<b>Datasets:</b> {len(comparison['datasets'])} &nbsp; "
+        f"<b>Samples:</b> {merged['count']}",
+        styles["Normal"],
+    ))
+    elements.append(Spacer(1, 16))
+
+    # ---------- PER-DATASET TABLE (deltas against the combined averages) ----------
+    table_data = [["Dataset", "Samples", "Share", "Flowrate (Δ)", "Pressure (Δ)", "Temperature (Δ)"]]
+    for row in comparison["datasets"]:
+        table_data.append([
+            Paragraph(escape(row["name"]), styles["Normal"]),
+            row["count"],
+            f"{row['share']:.0%}" if row["share"] is not None else "–",
+        ] + [
+            f"{_fmt(row[key])} ({_fmt(row[key + '_delta'], signed=True)})"
+            for key in ("avg_flowrate", "avg_pressure", "avg_temperature")
+        ])
+    table_data.append(
+        ["Combined", merged["count"], "100%"]
+        + [_fmt(merged[key]) for key in ("avg_flowrate", "avg_pressure", "avg_temperature")]
+    )
+
+    comparison_table = Table(
+        table_data,
+        colWidths=[1.9 * inch, 0.8 * inch, 0.6 * inch, 1.3 * inch, 1.3 * inch, 1.4 * inch],
+        repeatRows=1,
+    )
+    comparison_table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+        ("BACKGROUND", (0, -1), (-1, -1), colors.whitesmoke),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]))
+    elements.append(comparison_table)
+    elements.append(Spacer(1, 24))
+
+    # ---------- COMBINED CHARTS ----------
+    elements.append(Paragraph("Combined Analysis", styles["Heading2"]))
+    elements.append(Spacer(1, 12))
+    chart_summary = {
+        **merged,
+        **{key: merged[key] or 0 for key in ("avg_flowrate", "avg_pressure", "avg_temperature")},
+    }
+    elements.append(_charts_table(chart_summary))
+
+    with phase("layout"):
+        doc.build(elements)
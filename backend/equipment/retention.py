@@ -0,0 +1,101 @@
+"""
+Dataset retention.
+
+The policy comes from ``settings.EQUIPMENT_RETENTION``:
+
+    EQUIPMENT_RETENTION = {
+        "MAX_COUNT": 5,            # newest N datasets overall
+        "MAX_AGE": None,           # timedelta; older uploads are dropped
+        "PER_USER_QUOTA": None,    # newest N datasets per owner
+    }
+
+A dataset is pruned if any configured rule rejects it. All rules are
+folded into one queryset, so a prune is a single DELETE inside a
+transaction. Django still selects the matching rows first, so post_delete
+receivers such as the report cache see every deleted dataset.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import Dataset
+
+DEFAULT_POLICY = {
+    "MAX_COUNT": 5,
+    "MAX_AGE": None,
+    "PER_USER_QUOTA": None,
+}
+
+NEWEST_FIRST = [F("uploaded_at").desc(), F("id").desc()]
+
+
+def get_policy(**overrides):
+    policy = {**DEFAULT_POLICY, **getattr(settings, "EQUIPMENT_RETENTION", {})}
+    policy.update({key: value for key, value in overrides.items() if value is not None})
+    if isinstance(policy["MAX_AGE"], (int, float)):
+        policy["MAX_AGE"] = timedelta(days=policy["MAX_AGE"])
+    return policy
+
+
+def expired_filter(policy):
+    """Q matching every dataset the policy no longer keeps, or None."""
+    rules = []
+
+    if policy["MAX_COUNT"] is not None:
+        surplus = Dataset.objects.order_by(*NEWEST_FIRST).values("pk")[policy["MAX_COUNT"]:]
+        rules.append(Q(pk__in=surplus))
+
+    if policy["MAX_AGE"] is not None:
+        rules.append(Q(uploaded_at__lt=timezone.now() - policy["MAX_AGE"]))
+
+    if policy["PER_USER_QUOTA"] is not None:
+        over_quota = (
+            Dataset.objects.filter(owner__isnull=False)
+            .annotate(rank=Window(RowNumber(), partition_by=F("owner_id"), order_by=NEWEST_FIRST))
+            .filter(rank__gt=policy["PER_USER_QUOTA"])
+            .values("pk")
+        )
+        rules.append(Q(pk__in=over_quota))
+
+    if not rules:
+        return None
+
+    condition = rules[0]
+    for rule in rules[1:]:
+        condition |= rule
+    return condition
+
+
+def expired(policy=None):
+    condition = expired_filter(policy or get_policy())
+    if condition is None:
+        return Dataset.objects.none()
+    return Dataset.objects.filter(condition)
+
+
+def prune(policy=None, batch_size=None):
+    """
+    Delete the datasets the retention policy rejects and return how many
+    went. ``batch_size`` splits a large backlog into several short
+    transactions instead of one long one.
+    """
+    policy = policy or get_policy()
+    total = 0
+
+    while True:
+        with transaction.atomic():
+            doomed = expired(policy)
+            if batch_size:
+                doomed = Dataset.objects.filter(
+                    pk__in=list(doomed.order_by("uploaded_at", "id").values_list("pk", flat=True)[:batch_size])
+                )
+            # receivers only need the pk, so skip loading the summaries
+            deleted = doomed.only("pk").delete()[1].get(Dataset._meta.label, 0)
+
+        total += deleted
+        if not batch_size or deleted < batch_size:
+            return total
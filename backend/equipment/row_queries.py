@@ -0,0 +1,264 @@
+"""
+Filtering, sorting and paging the stored rows of one dataset.
+
+``/api/datasets/<id>/rows/`` takes a projection, lookups on the numeric
+columns, ``type=`` (repeatable) and a single ``ordering=`` key:
+
+    ?fields=type,pressure&type=Pump&pressure__gte=5&ordering=-pressure&limit=50
+
+Rows are numbered from 0 in upload order. Every row carries its ``row``
+number, which also breaks ties, so pages are stable.
+
+The query runs on ``row_store`` without loading the dataset:
+
+* Filters are pushed down. A batch whose zone map (min/max, types) rules
+  out every row is skipped unread. So is a batch that cannot beat the
+  candidates kept so far, or that lies wholly before the cursor.
+* The remaining batches are filtered on the filter and sort columns
+  only. Each keeps at most ``limit + 1`` candidates, so memory depends
+  on the batch and page sizes, not on the dataset.
+* The projected columns are read only for the rows of the page.
+
+Pages use keysets, not offsets: the cursor is the last row's sort key and
+row number. NaN sorts last in both directions, like NULLs in ``queries``.
+"""
+import base64
+import json
+import math
+import operator
+from dataclasses import dataclass, field
+
+import numpy as np
+from rest_framework.exceptions import ValidationError
+
+from . import row_store
+from .parsing import TYPE_COLUMN
+from .queries import LOOKUPS
+
+# API field -> stored column
+COLUMNS = {
+    "type": TYPE_COLUMN,
+    "flowrate": "Flowrate",
+    "pressure": "Pressure",
+    "temperature": "Temperature",
+}
+NUMERIC_FIELDS = ("flowrate", "pressure", "temperature")
+FIELDS = ("row",) + tuple(COLUMNS)
+ORDERING_FIELDS = ("row",) + NUMERIC_FIELDS
+DEFAULT_ORDERING = "row"
+
+# query parameters that are not filters
+RESERVED_PARAMS = {"type", "ordering", "fields", "limit", "cursor", "format"}
+
+COMPARE = {
+    "exact": operator.eq,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+
+def _can_match(lookup, value, low, high):
+    """Whether any number in ``[low, high]`` satisfies ``lookup value``."""
+    if lookup == "exact":
+        return low <= value <= high
+    if lookup in ("gt", "gte"):
+        return COMPARE[lookup](high, value)
+    return COMPARE[lookup](low, value)
+
+
+@dataclass
+class RowQuery:
+    fields: list = field(default_factory=lambda: list(FIELDS))
+    filters: list = field(default_factory=list)  # (column, lookup, value)
+    types: list = field(default_factory=list)
+    ordering: str = DEFAULT_ORDERING
+    descending: bool = False
+
+    @property
+    def sort_column(self):
+        return None if self.ordering == "row" else COLUMNS[self.ordering]
+
+    def scan_columns(self):
+        """Stored columns the filters and the sort read."""
+        columns = {column for column, _, _ in self.filters}
+        if self.types:
+            columns.add(TYPE_COLUMN)
+        if self.sort_column:
+            columns.add(self.sort_column)
+        return sorted(columns)
+
+    def may_match(self, zone):
+        """False when no row of a batch with this zone map can pass the filters."""
+        bounds = zone.get("bounds")
+        if bounds is not None:
+            for column, lookup, value in self.filters:
+                if bounds[column] is None or not _can_match(lookup, value, *bounds[column]):
+                    return False
+        if self.types and "types" in zone:
+            return not set(self.types).isdisjoint(zone["types"])
+        return True
+
+    def mask(self, frame):
+        keep = np.ones(len(frame), dtype=bool)
+        for column, lookup, value in self.filters:
+            keep &= COMPARE[lookup](frame[column].to_numpy(), value)
+        if self.types:
+            keep &= frame[TYPE_COLUMN].isin(self.types).to_numpy()
+        return keep
+
+    def sort_keys(self, frame, rows):
+        """``(nan, key)`` arrays; rows order by ``(nan, key, row)`` ascending."""
+        values = rows.astype(float) if self.sort_column is None else frame[self.sort_column].to_numpy()
+        nan = np.isnan(values)
+        key = np.where(nan, 0.0, -values if self.descending else values)
+        return nan, key
+
+    def key_range(self, start, zone):
+        """Best and worst possible ``(nan, key)`` of a batch, or None if unknown."""
+        if self.sort_column is None:
+            low, high = float(start), float(start + zone["rows"] - 1)
+        else:
+            bounds = zone.get("bounds")
+            if bounds is None:
+                return None
+            if bounds[self.sort_column] is None:
+                return (True, 0.0), (True, 0.0)  # every value is NaN
+            low, high = bounds[self.sort_column]
+        if self.descending:
+            low, high = -high, -low
+        if zone.get("missing", {}).get(self.sort_column):
+            return (False, low), (True, 0.0)  # NaN sorts last
+        return (False, low), (False, high)
+
+
+def parse_query(params):
+    query = RowQuery()
+
+    raw = params.get("fields")
+    if raw:
+        fields = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        # the row number always comes along; it identifies the row
+        query.fields = ["row"] + [name for name in FIELDS if name in fields and name != "row"]
+
+    for key in params:
+        if key in RESERVED_PARAMS:
+            continue
+        name, _, lookup = key.partition("__")
+        lookup = lookup or "exact"
+        if name not in NUMERIC_FIELDS or lookup not in LOOKUPS:
+            raise ValidationError({key: "Unknown filter."})
+        try:
+            value = float(params[key])
+        except ValueError:
+            raise ValidationError({key: "Invalid value."})
+        if math.isnan(value):
+            raise ValidationError({key: "Invalid value."})
+        query.filters.append((COLUMNS[name], lookup, value))
+
+    query.types = params.getlist("type")
+
+    ordering = (params.get("ordering") or DEFAULT_ORDERING).strip()
+    name = ordering.lstrip("-")
+    if name not in ORDERING_FIELDS:
+        raise ValidationError({"ordering": f"Cannot order by {name}."})
+    query.ordering = name
+    query.descending = ordering.startswith("-")
+    return query
+
+
+def encode_cursor(query, nan, key, row):
+    raw = json.dumps([query.ordering, query.descending, bool(nan), float(key), int(row)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(query, cursor):
+    """``(nan, key, row)`` of the last row of the previous page."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ordering, descending, nan, key, row = json.loads(raw)
+        nan, key, row = bool(nan), float(key), int(row)
+    except (ValueError, TypeError):
+        raise ValidationError({"cursor": "Invalid cursor."})
+    if (ordering, descending) != (query.ordering, query.descending):
+        raise ValidationError({"cursor": "The cursor belongs to another ordering."})
+    return nan, key, row
+
+
+def _after(nan, key, rows, cursor):
+    """Rows strictly after ``cursor`` in ``(nan, key, row)`` order."""
+    c_nan, c_key, c_row = cursor
+    return (nan > c_nan) | (
+        (nan == c_nan) & ((key > c_key) | ((key == c_key) & (rows > c_row)))
+    )
+
+
+def _first(nan, key, rows, n):
+    """Indices of the ``n`` rows first in ``(nan, key, row)`` order, in that order."""
+    if len(rows) > n:
+        # partition first, so only the rows that can make it get sorted
+        flat = np.where(nan, np.inf, key)
+        cut = np.partition(flat, n - 1)[n - 1]
+        near = np.flatnonzero(flat <= cut)
+        return near[np.lexsort((rows[near], key[near], nan[near]))[:n]]
+    return np.lexsort((rows, key, nan))
+
+
+def find_rows(dataset_id, query, limit, cursor=None):
+    """
+    Row numbers of one page, in order, and the cursor of the next page (or
+    None). Raises ``row_store.MissingRows`` when the dataset has no rows.
+    """
+    after = decode_cursor(query, cursor) if cursor else None
+    best = (np.empty(0, bool), np.empty(0), np.empty(0, np.int64))
+
+    def keep(start, zone):
+        if not query.may_match(zone):
+            return False
+        key_range = query.key_range(start, zone)
+        if key_range is None:
+            return True
+        low, high = key_range
+        if after is not None and high < after[:2]:
+            return False  # every row sorts before the cursor
+        if len(best[2]) > limit and low > (best[0][-1], best[1][-1]):
+            return False  # cannot beat the page already found
+        return True
+
+    for start, frame in row_store.scan(dataset_id, query.scan_columns(), keep=keep):
+        rows = np.arange(start, start + len(frame), dtype=np.int64)
+        nan, key = query.sort_keys(frame, rows)
+        selected = query.mask(frame)
+        if after is not None:
+            selected &= _after(nan, key, rows, after)
+
+        # this batch's candidates merged into the best so far
+        nan = np.concatenate([best[0], nan[selected]])
+        key = np.concatenate([best[1], key[selected]])
+        rows = np.concatenate([best[2], rows[selected]])
+        order = _first(nan, key, rows, limit + 1)
+        best = (nan[order], key[order], rows[order])
+
+    nan, key, rows = best
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(query, nan[limit - 1], key[limit - 1], rows[limit - 1])
+    return rows, None
+
+
+def _json_value(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def fetch_rows(dataset_id, query, rows):
+    """The ``query.fields`` of ``rows`` as JSON-ready dicts; NaN becomes None."""
+    values = {"row": rows.tolist()}
+    names = [name for name in query.fields if name != "row"]
+    if names:
+        frame = row_store.take(dataset_id, rows, [COLUMNS[name] for name in names])
+        for name in names:
+            values[name] = [_json_value(value) for value in frame[COLUMNS[name]].tolist()]
+    return [dict(zip(query.fields, record)) for record in zip(*(values[name] for name in query.fields))]
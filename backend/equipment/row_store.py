@@ -0,0 +1,327 @@
+"""
+Parsed upload rows, kept per dataset in memory-mapped columnar files.
+
+Uploads keep the columns the summary is built from (``parsing.USED_COLUMNS``).
+``RowWriter`` is fed the parser's chunks while the summary is computed, so
+the text is parsed only once. Later recomputation and row-level reads go
+through ``iter_batches()``. It maps the file and yields DataFrames in the
+CSV readers' dtypes. Their numeric columns are views of the mapping, not
+copies, so a read only touches the pages of the columns it asks for.
+
+With pyarrow installed, rows go to ``<id>.arrow``: an uncompressed Arrow
+IPC file with one record batch per parsed chunk. Without pyarrow, each
+column is a raw little-endian array in ``<id>.cols/``, read with
+``numpy.memmap``. There, ``Type`` is stored as int32 codes into
+``Type.json``. Missing numbers are stored as NaN rather than as nulls, so
+neither format needs a validity bitmap.
+
+Each stored batch also gets a zone map in ``<id>.zones.json``: its row
+count, the min, max and number of missing values of every numeric
+column, and the types it holds.
+``scan()`` hands every zone to a ``keep(start, zone)`` callback first and
+skips the batches it rejects without reading them. ``row_queries`` uses
+this to push its filters down to the store.
+
+Rows are written under a temporary name, and ``commit()`` renames them
+once the dataset exists. ``signals`` deletes a dataset's rows once its
+deletion commits, so retention pruning removes them too. Datasets uploaded
+before the store was added have no rows; ``scan()`` raises
+``MissingRows`` for them.
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .parsing import DEFAULT_CHUNK_SIZE, NUMERIC_COLUMNS, TYPE_COLUMN, USED_COLUMNS
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - depends on the install
+    pa = None
+
+ARROW = "arrow"
+NPY = "npy"
+
+# dtypes of the raw column files of the numpy format
+NUMERIC_DTYPE = np.dtype("<f8")
+CODE_DTYPE = np.dtype("<i4")
+
+
+class MissingRows(LookupError):
+    """The dataset has no stored rows (uploaded before the store, or deleted)."""
+
+
+def get_store_dir():
+    path = Path(getattr(settings, "EQUIPMENT_ROW_STORE_DIR", settings.BASE_DIR / "row_store"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_format():
+    """``"arrow"`` or ``"npy"``; ``EQUIPMENT_ROW_STORE_FORMAT`` ``"auto"`` picks arrow when it can."""
+    fmt = getattr(settings, "EQUIPMENT_ROW_STORE_FORMAT", "auto")
+    if fmt == "auto" or (fmt == ARROW and pa is None):
+        return ARROW if pa is not None else NPY
+    return fmt
+
+
+def arrow_path(dataset_id):
+    return get_store_dir() / f"{dataset_id}.arrow"
+
+
+def npy_path(dataset_id):
+    return get_store_dir() / f"{dataset_id}.cols"
+
+
+def zones_path(dataset_id):
+    return get_store_dir() / f"{dataset_id}.zones.json"
+
+
+def _zone(chunk):
+    bounds, missing = {}, {}
+    for col in NUMERIC_COLUMNS:
+        values = chunk[col].to_numpy(NUMERIC_DTYPE)
+        present = values[~np.isnan(values)]
+        # None: every value is missing, so no comparison can hold
+        bounds[col] = [float(present.min()), float(present.max())] if len(present) else None
+        missing[col] = len(values) - len(present)
+    types = sorted(str(name) for name in chunk[TYPE_COLUMN].dropna().unique())
+    return {"rows": len(chunk), "bounds": bounds, "missing": missing, "types": types}
+
+
+class _ArrowWriter:
+    def __init__(self, directory):
+        fd, self.tmp = tempfile.mkstemp(dir=directory, suffix=".arrow.tmp")
+        os.close(fd)
+        schema = pa.schema(
+            [(TYPE_COLUMN, pa.string())] + [(col, pa.float64()) for col in NUMERIC_COLUMNS]
+        )
+        self.sink = pa.OSFile(self.tmp, "wb")
+        self.writer = pa.ipc.new_file(self.sink, schema)
+
+    def append(self, chunk):
+        arrays = [pa.array(chunk[TYPE_COLUMN]).cast(pa.string())]
+        # from numpy, so NaN stays a float instead of becoming a null
+        arrays += [pa.array(chunk[col].to_numpy(NUMERIC_DTYPE)) for col in NUMERIC_COLUMNS]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, names=list(USED_COLUMNS)))
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+    def commit(self, dataset_id):
+        self.close()
+        os.replace(self.tmp, arrow_path(dataset_id))
+
+    def discard(self):
+        if not self.sink.closed:
+            self.sink.close()
+        Path(self.tmp).unlink(missing_ok=True)
+
+
+class _NpyWriter:
+    def __init__(self, directory):
+        self.tmp = Path(tempfile.mkdtemp(dir=directory, suffix=".cols.tmp"))
+        self.files = {
+            col: open(self.tmp / f"{col}.{'i4' if col == TYPE_COLUMN else 'f8'}", "wb")
+            for col in USED_COLUMNS
+        }
+        self.codes = {}  # category -> code, in order of first appearance
+
+    def append(self, chunk):
+        types = chunk[TYPE_COLUMN].cat
+        # the last entry maps pandas' -1 (missing) to itself
+        lookup = np.array(
+            [self.codes.setdefault(name, len(self.codes)) for name in types.categories] + [-1],
+            dtype=CODE_DTYPE,
+        )
+        self.files[TYPE_COLUMN].write(lookup[types.codes.to_numpy()].tobytes())
+        for col in NUMERIC_COLUMNS:
+            self.files[col].write(chunk[col].to_numpy(NUMERIC_DTYPE).tobytes())
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+    def commit(self, dataset_id):
+        self.close()
+        (self.tmp / f"{TYPE_COLUMN}.json").write_text(json.dumps(list(self.codes)))
+        target = npy_path(dataset_id)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(self.tmp, target)
+
+    def discard(self):
+        self.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class RowWriter:
+    """
+    Collect an upload's chunks with ``append(chunk)`` and store them as the
+    rows of ``dataset_id`` with ``commit(dataset_id)``. Leaving the ``with``
+    block without a commit throws the rows away.
+    """
+
+    def __init__(self):
+        directory = get_store_dir()
+        self._writer = _ArrowWriter(directory) if get_format() == ARROW else _NpyWriter(directory)
+        self.zones = []
+        self.committed = False
+
+    def append(self, chunk):
+        self._writer.append(chunk)
+        self.zones.append(_zone(chunk))
+
+    def commit(self, dataset_id):
+        # the zone map first: rows without one are still readable, not the reverse
+        path = zones_path(dataset_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.zones))
+        os.replace(tmp, path)
+        self._writer.commit(dataset_id)
+        self.committed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self.committed:
+            self._writer.discard()
+
+
+def exists(dataset_id):
+    return arrow_path(dataset_id).exists() or npy_path(dataset_id).exists()
+
+
+def _columns(columns):
+    if columns is None:
+        return list(USED_COLUMNS)
+    unknown = set(columns) - set(USED_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(sorted(unknown))}")
+    return [col for col in USED_COLUMNS if col in columns]
+
+
+def _scan_arrow(path, columns, zones, keep):
+    reader = pa.ipc.open_file(pa.memory_map(str(path)))
+    start = 0
+    for i in range(reader.num_record_batches):
+        # batches are views of the mapping; nothing is read until a column is used
+        batch = reader.get_batch(i)
+        zone = zones[i] if zones else {"rows": batch.num_rows}
+        if keep is None or keep(start, zone):
+            frame = {}
+            for col in columns:
+                column = batch.column(col)
+                if col == TYPE_COLUMN:
+                    frame[col] = column.dictionary_encode().to_pandas()
+                else:
+                    frame[col] = column.to_numpy(zero_copy_only=True)
+            yield start, pd.DataFrame(frame, index=pd.RangeIndex(batch.num_rows), copy=False)
+        start += batch.num_rows
+
+
+def _memmap(path, dtype):
+    if path.stat().st_size == 0:
+        return np.empty(0, dtype=dtype)  # mmap can't map an empty file
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def _scan_npy(path, columns, zones, keep, batch_size):
+    arrays = {
+        col: _memmap(path / f"{col}.f8", NUMERIC_DTYPE)
+        for col in NUMERIC_COLUMNS if col in columns
+    }
+    codes = _memmap(path / f"{TYPE_COLUMN}.i4", CODE_DTYPE)
+    if TYPE_COLUMN in columns:
+        categories = json.loads((path / f"{TYPE_COLUMN}.json").read_text())
+
+    if zones is None:
+        zones = [
+            {"rows": min(batch_size, len(codes) - start)}
+            for start in range(0, len(codes), batch_size)
+        ]
+    start = 0
+    for zone in zones:
+        end = start + zone["rows"]
+        if keep is None or keep(start, zone):
+            frame = {}
+            for col in columns:
+                if col == TYPE_COLUMN:
+                    frame[col] = pd.Categorical.from_codes(codes[start:end], categories=categories)
+                else:
+                    frame[col] = arrays[col][start:end]
+            yield start, pd.DataFrame(frame, index=pd.RangeIndex(zone["rows"]), copy=False)
+        start = end
+
+
+def _zones(dataset_id):
+    try:
+        return json.loads(zones_path(dataset_id).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def scan(dataset_id, columns=None, keep=None, batch_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield ``(first row, DataFrame)`` for each stored batch of ``dataset_id``,
+    with only ``columns`` (all of ``USED_COLUMNS`` by default). A batch is
+    skipped unread when ``keep(first row, zone)`` returns False. Zones are
+    only ``{"rows": n}`` for stores without a zone map, and numpy stores
+    without one are cut into ``batch_size`` rows. Raises ``MissingRows``
+    when the dataset has no rows.
+    """
+    columns = _columns(columns)
+    path = arrow_path(dataset_id)
+    if path.exists():
+        if pa is None:
+            raise MissingRows(f"Rows of dataset {dataset_id} are stored as Arrow, which needs pyarrow")
+        return _scan_arrow(path, columns, _zones(dataset_id), keep)
+    path = npy_path(dataset_id)
+    if path.exists():
+        return _scan_npy(path, columns, _zones(dataset_id), keep, batch_size)
+    raise MissingRows(f"Dataset {dataset_id} has no stored rows")
+
+
+def iter_batches(dataset_id, columns=None):
+    """The stored rows of ``dataset_id`` as DataFrames, a batch at a time (see ``scan()``)."""
+    return (frame for _, frame in scan(dataset_id, columns))
+
+
+def take(dataset_id, rows, columns=None):
+    """The rows numbered ``rows``, in that order, reading only the batches that hold them."""
+    rows = np.asarray(rows, dtype=np.int64)
+    order = np.argsort(rows, kind="stable")
+    wanted = rows[order]
+
+    def holds(start, zone):
+        lo, hi = np.searchsorted(wanted, [start, start + zone["rows"]])
+        return hi > lo
+
+    parts = []
+    for start, frame in scan(dataset_id, columns, keep=holds):
+        lo, hi = np.searchsorted(wanted, [start, start + len(frame)])
+        part = frame.iloc[wanted[lo:hi] - start]
+        if TYPE_COLUMN in part:
+            # batches have their own categories
+            part = part.astype({TYPE_COLUMN: object})
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=_columns(columns))
+    taken = pd.concat(parts, ignore_index=True)
+    return taken.iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+
+
+def delete(dataset_id):
+    try:
+        arrow_path(dataset_id).unlink(missing_ok=True)
+    except OSError:
+        pass  # still mapped on platforms that lock it
+    shutil.rmtree(npy_path(dataset_id), ignore_errors=True)
+    zones_path(dataset_id).unlink(missing_ok=True)
@@ -1,7 +1,19 @@
 from rest_framework import serializers
 from .models import Dataset
 
+
 class DatasetSerializer(serializers.ModelSerializer):
+    """
+    Takes an optional ``fields`` argument listing the fields to keep, for
+    sparse responses such as ``?fields=id,name,uploaded_at``.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Dataset
         fields = '__all__'
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import dataset_cache, report_cache, row_store
+from .models import Dataset
+
+
+@receiver(post_delete, sender=Dataset)
+def drop_cached_reports(sender, instance, **kwargs):
+    report_cache.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=Dataset)
+def drop_stored_rows(sender, instance, **kwargs):
+    # unlike the caches, rows can't be rebuilt, so wait until the delete commits
+    pk = instance.pk
+    transaction.on_commit(lambda: row_store.delete(pk))
+
+
+@receiver(post_save, sender=Dataset)
+@receiver(post_delete, sender=Dataset)
+def drop_cached_history(sender, instance, **kwargs):
+    dataset_cache.invalidate(instance.pk)
+    # again once committed: a page built in between, from a snapshot
+    # without this write, was cached under the new generation
+    transaction.on_commit(lambda: dataset_cache.invalidate(instance.pk))
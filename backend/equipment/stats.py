@@ -0,0 +1,253 @@
+"""
+Descriptive statistics for the numeric equipment columns, overall and
+per equipment type.
+
+``describe(df)`` computes exact statistics for a frame that is already in
+memory. ``StatsAccumulator`` produces the same shape of result from a
+stream of chunks: counts, means, variances, minima and maxima are kept as
+mergeable moments and the percentiles come from a small mergeable
+quantile sketch, so memory stays bounded however many rows go through.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from .parsing import NUMERIC_COLUMNS, TYPE_COLUMN
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+DEFAULT_COMPRESSION = 200
+
+
+def stat_key(column):
+    return column.lower()
+
+
+def quantile_key(q):
+    return f"p{round(q * 100):02d}"
+
+
+def _number(value):
+    # JSON has no NaN; empty groups report null instead
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+class Moments:
+    """Count, mean, sum of squared deviations, min and max of a column."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=math.inf, max=-math.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    @classmethod
+    def from_values(cls, values):
+        if not len(values):
+            return cls()
+        mean = float(values.mean())
+        return cls(
+            count=len(values),
+            mean=mean,
+            m2=float(((values - mean) ** 2).sum()),
+            min=float(values.min()),
+            max=float(values.max()),
+        )
+
+    def merge(self, other):
+        """Fold ``other`` in (Chan et al.'s parallel variance update)."""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantiles (a merging t-digest).
+
+    Values are kept as weighted centroids. Every update sorts the existing
+    centroids together with the new values and merges neighbours that fall
+    in the same unit of the arcsine scale function. This keeps about
+    ``compression / 2`` centroids, with the finest resolution in the tails.
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        if not len(values):
+            return self
+        values = np.sort(values)
+        self.min = min(self.min, float(values[0]))
+        self.max = max(self.max, float(values[-1]))
+        # slot the (few, already sorted) centroids into the sorted batch
+        # instead of argsorting the concatenation
+        at = np.searchsorted(values, self.means)
+        self._compress(
+            np.insert(values, at, self.means),
+            np.insert(np.ones(len(values)), at, self.weights),
+        )
+        return self
+
+    def merge(self, other):
+        if not len(other.means):
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        means = np.concatenate([self.means, other.means])
+        weights = np.concatenate([self.weights, other.weights])
+        order = np.argsort(means, kind="stable")
+        self._compress(means[order], weights[order])
+        return self
+
+    def _compress(self, means, weights):
+        """Merge sorted ``(means, weights)`` into at most one centroid per k unit."""
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * q - 1))
+
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, qs):
+        if not len(self.means):
+            return [math.nan] * len(qs)
+        cumulative = np.cumsum(self.weights)
+        total = cumulative[-1]
+        centers = (cumulative - self.weights / 2) / total
+        # anchor the ends on the exact extremes
+        xs = np.r_[0.0, centers, 1.0]
+        ys = np.r_[self.min, self.means, self.max]
+        return [float(v) for v in np.interp(qs, xs, ys)]
+
+
+class ColumnAccumulator:
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.moments = Moments()
+        self.sketch = QuantileSketch(compression)
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        self.moments.merge(Moments.from_values(values))
+        self.sketch.update(values)
+
+    def result(self):
+        m = self.moments
+        out = {
+            "count": m.count,
+            "mean": _number(m.mean) if m.count else None,
+            "std": _number(m.std),
+            "min": _number(m.min) if m.count else None,
+            "max": _number(m.max) if m.count else None,
+        }
+        for q, value in zip(QUANTILES, self.sketch.quantile(QUANTILES)):
+            out[quantile_key(q)] = _number(value)
+        return out
+
+
+def _type_groups(types):
+    """Yield ``(type, row positions)`` for each equipment type in ``types``."""
+    if isinstance(types.dtype, pd.CategoricalDtype):
+        codes = types.cat.codes.to_numpy()
+        labels = types.cat.categories
+    else:
+        codes, labels = pd.factorize(types)
+    if len(codes) == 0:
+        return
+
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    for start, end in zip(starts, ends):
+        code = sorted_codes[start]
+        if code >= 0:
+            yield labels[code], order[start:end]
+
+
+class StatsAccumulator:
+    """Streaming, mergeable version of :func:`describe`."""
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.columns = {col: ColumnAccumulator(compression) for col in NUMERIC_COLUMNS}
+        self.types = {}
+
+    def update(self, chunk):
+        if len(chunk) == 0:
+            return
+        arrays = {col: chunk[col].to_numpy(dtype="float64") for col in NUMERIC_COLUMNS}
+        for col, values in arrays.items():
+            self.columns[col].update(values)
+
+        for label, rows in _type_groups(chunk[TYPE_COLUMN]):
+            per_type = self.types.get(label)
+            if per_type is None:
+                per_type = self.types[label] = {
+                    col: ColumnAccumulator(self.compression) for col in NUMERIC_COLUMNS
+                }
+            for col, values in arrays.items():
+                per_type[col].update(values[rows])
+
+    def result(self):
+        return {
+            "stats": {stat_key(col): acc.result() for col, acc in self.columns.items()},
+            "type_stats": {
+                label: {stat_key(col): acc.result() for col, acc in columns.items()}
+                for label, columns in self.types.items()
+            },
+        }
+
+
+def _describe_values(values):
+    values = values[~np.isnan(values)]
+    m = Moments.from_values(values)
+    out = {
+        "count": m.count,
+        "mean": _number(m.mean) if m.count else None,
+        "std": _number(m.std),
+        "min": _number(m.min) if m.count else None,
+        "max": _number(m.max) if m.count else None,
+    }
+    quantiles = np.quantile(values, QUANTILES) if m.count else [math.nan] * len(QUANTILES)
+    for q, value in zip(QUANTILES, quantiles):
+        out[quantile_key(q)] = _number(value)
+    return out
+
+
+def describe(df):
+    """Exact statistics for an in-memory frame, shaped like ``StatsAccumulator.result()``."""
+    arrays = {col: df[col].to_numpy(dtype="float64") for col in NUMERIC_COLUMNS}
+    return {
+        "stats": {stat_key(col): _describe_values(values) for col, values in arrays.items()},
+        "type_stats": {
+            label: {stat_key(col): _describe_values(values[rows]) for col, values in arrays.items()}
+            for label, rows in _type_groups(df[TYPE_COLUMN])
+        },
+    }
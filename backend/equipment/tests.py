@@ -1,3 +1,1544 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO, StringIO
+from unittest import skipIf, skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import clear_url_caches
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import (
+    bulk_export, charts, compare, dataset_cache, instrumentation, jobs, offload, parsing, ranges, report_cache,
+    reports, retention, row_store, stats,
+)
+from .ingest import summarize_chunks, summarize_csv, summarize_stored
+from .models import Dataset, EquipmentTypeCount
+
+SAMPLE_CSV = (
+    "Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+    "Pump-1,Pump,120,5.2,110\n"
+    "Compressor-1,Compressor,95,8.4,95\n"
+    "Valve-1,Valve,60,4.1,105\n"
+    "HeatExchanger-1,HeatExchanger,150,6.2,130\n"
+    "Pump-2,Pump,132,5.6,118\n"
+    "Reactor-1,Reactor,140,7.5,140\n"
+    "Compressor-2,Compressor,88,8.1,98\n"
+    "Valve-2,Valve,,4.3,\n"
+    "Pump-3,Pump,125.5,5.9,112\n"
+)
+
+
+LEGACY_KEYS = ("count", "avg_flowrate", "avg_pressure", "avg_temperature", "type_distribution")
+
+
+def legacy_summary(text):
+    df = pd.read_csv(StringIO(text))
+    return {
+        "count": len(df),
+        "avg_flowrate": float(df["Flowrate"].mean()),
+        "avg_pressure": float(df["Pressure"].mean()),
+        "avg_temperature": float(df["Temperature"].mean()),
+        "type_distribution": df["Type"].value_counts().to_dict(),
+    }
+
+
+def legacy_part(summary):
+    return {key: summary[key] for key in LEGACY_KEYS}
+
+
+def setUpModule():
+    # every upload stores its rows; keep them out of the source tree
+    row_store_dir = tempfile.mkdtemp()
+    overrides = override_settings(EQUIPMENT_ROW_STORE_DIR=row_store_dir)
+    overrides.enable()
+    unittest.addModuleCleanup(shutil.rmtree, row_store_dir, ignore_errors=True)
+    unittest.addModuleCleanup(overrides.disable)
+
+
+class IngestTests(TestCase):
+    def assertSummaryMatches(self, summary, expected):
+        self.assertEqual(summary["count"], expected["count"])
+        self.assertEqual(
+            list(summary["type_distribution"].items()),
+            list(expected["type_distribution"].items()),
+        )
+        for key in ("avg_flowrate", "avg_pressure", "avg_temperature"):
+            self.assertAlmostEqual(summary[key], expected[key], places=9)
+
+    def test_single_chunk_matches_legacy_summary(self):
+        self.assertEqual(
+            legacy_part(summarize_csv(StringIO(SAMPLE_CSV), engine="c")),
+            legacy_summary(SAMPLE_CSV),
+        )
+
+    def test_chunked_matches_legacy_summary(self):
+        summary = summarize_csv(StringIO(SAMPLE_CSV), chunk_size=2, engine="c")
+        self.assertSummaryMatches(summary, legacy_summary(SAMPLE_CSV))
+
+    @skipIf(parsing.pa_csv is None, "pyarrow is not installed")
+    def test_pyarrow_engine_matches_legacy_summary(self):
+        summary = summarize_csv(BytesIO(SAMPLE_CSV.encode()), engine="pyarrow")
+        self.assertSummaryMatches(summary, legacy_summary(SAMPLE_CSV))
+
+
+class StatsTests(TestCase):
+    def frame(self, rows=20_000, seed=1):
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame({
+            "Type": pd.Categorical(rng.choice(["Pump", "Valve", "Reactor"], rows)),
+            "Flowrate": rng.normal(100, 20, rows),
+            "Pressure": rng.gamma(2.0, 3.0, rows),
+            "Temperature": rng.uniform(80, 160, rows),
+        })
+        df.loc[::97, "Pressure"] = np.nan
+        return df
+
+    def test_describe_matches_pandas(self):
+        df = self.frame()
+        result = stats.describe(df)
+
+        pressure = result["stats"]["pressure"]
+        self.assertEqual(pressure["count"], df["Pressure"].count())
+        self.assertAlmostEqual(pressure["mean"], df["Pressure"].mean())
+        self.assertAlmostEqual(pressure["std"], df["Pressure"].std())
+        self.assertAlmostEqual(pressure["p50"], df["Pressure"].median())
+
+        pumps = df[df["Type"] == "Pump"]
+        self.assertAlmostEqual(
+            result["type_stats"]["Pump"]["flowrate"]["max"], pumps["Flowrate"].max()
+        )
+
+    def test_streaming_matches_exact(self):
+        df = self.frame()
+        exact = stats.describe(df)
+
+        acc = stats.StatsAccumulator()
+        for start in range(0, len(df), 3_000):
+            acc.update(df.iloc[start:start + 3_000])
+        streamed = acc.result()
+
+        for col, expected in exact["stats"].items():
+            got = streamed["stats"][col]
+            for key in ("count", "min", "max"):
+                self.assertEqual(got[key], expected[key])
+            self.assertAlmostEqual(got["mean"], expected["mean"], places=9)
+            self.assertAlmostEqual(got["std"], expected["std"], places=9)
+            spread = expected["max"] - expected["min"]
+            for key in ("p05", "p25", "p50", "p75", "p95"):
+                self.assertAlmostEqual(got[key], expected[key], delta=spread * 0.01)
+        self.assertEqual(set(streamed["type_stats"]), {"Pump", "Valve", "Reactor"})
+
+    def test_merged_sketches_match_single_sketch(self):
+        values = np.random.default_rng(2).exponential(5.0, 50_000)
+        whole = stats.QuantileSketch().update(values)
+        merged = stats.QuantileSketch().update(values[:20_000]).merge(
+            stats.QuantileSketch().update(values[20_000:])
+        )
+
+        for a, b in zip(whole.quantile(stats.QUANTILES), merged.quantile(stats.QUANTILES)):
+            self.assertAlmostEqual(a, b, delta=0.05)
+        self.assertLess(len(merged.means), stats.DEFAULT_COMPRESSION)
+
+    def test_empty_chunks_are_skipped(self):
+        df = self.frame(rows=100)
+        empty = df.iloc[:0]
+
+        acc = stats.StatsAccumulator()
+        acc.update(empty)
+        acc.update(df)
+        self.assertEqual(acc.result()["stats"]["pressure"]["count"], df["Pressure"].count())
+        self.assertEqual(stats.describe(empty)["type_stats"], {})
+
+        # the data chunk still counts as the first one, so its stats are exact
+        summary = summarize_chunks(iter([empty, df]))
+        self.assertEqual(summary["stats"], stats.describe(df)["stats"])
+
+    def test_header_only_csv(self):
+        summary = summarize_csv(StringIO(SAMPLE_CSV.splitlines()[0] + "\n"), engine="c")
+
+        self.assertEqual(summary["count"], 0)
+        self.assertEqual(summary["type_stats"], {})
+
+    def test_upload_summary_has_extended_stats(self):
+        summary = summarize_csv(StringIO(SAMPLE_CSV), engine="c")
+
+        self.assertEqual(summary["stats"]["flowrate"]["count"], 8)
+        self.assertEqual(list(summary["type_stats"]), list(summary["type_distribution"]))
+        self.assertIsNone(summary["type_stats"]["HeatExchanger"]["flowrate"]["std"])
+
+
+class ParsingTests(TestCase):
+    def test_projects_and_types_columns(self):
+        df = parsing.read_equipment_csv(StringIO(SAMPLE_CSV), engine="c")
+
+        self.assertEqual(list(df.columns), list(parsing.USED_COLUMNS))
+        self.assertIsInstance(df["Type"].dtype, pd.CategoricalDtype)
+        for col in parsing.NUMERIC_COLUMNS:
+            self.assertEqual(df[col].dtype, "float64")
+
+    def test_falls_back_without_pyarrow(self):
+        with patch.object(parsing, "pa_csv", None):
+            self.assertEqual(parsing.get_engine("auto"), "c")
+            self.assertEqual(parsing.get_engine("pyarrow"), "c")
+
+    def test_missing_column_is_parse_error(self):
+        with self.assertRaises(parsing.ParseError):
+            summarize_csv(StringIO("Type,Flowrate\nPump,1\n"), engine="c")
+
+    def test_detect_format(self):
+        cases = {
+            ("plant.csv", "text/csv", None): (parsing.CSV, None),
+            ("plant.CSV.GZ", "application/octet-stream", None): (parsing.CSV, parsing.GZIP),
+            ("plant.csv.zst", None, None): (parsing.CSV, parsing.ZSTD),
+            ("export", "application/gzip", None): (parsing.CSV, parsing.GZIP),
+            ("plant.csv", "text/csv", "gzip"): (parsing.CSV, parsing.GZIP),
+            ("plant.parquet", None, None): (parsing.PARQUET, None),
+            ("plant.arrow", None, "identity"): (parsing.ARROW, None),
+            ("plant.bin", "application/vnd.apache.arrow.stream", None): (parsing.ARROW, None),
+        }
+        for args, expected in cases.items():
+            self.assertEqual(parsing.detect_format(*args), expected, args)
+
+        with self.assertRaises(parsing.UnsupportedFormat):
+            parsing.detect_format("plant.csv", None, "br")
+        with self.assertRaises(parsing.UnsupportedFormat):
+            parsing.detect_format("plant.parquet.gz")
+
+    def test_gzip_csv_matches_plain(self):
+        data = gzip.compress(SAMPLE_CSV.encode())
+        for engine in ("c", "auto"):
+            summary = summarize_csv(BytesIO(data), engine=engine, compression=parsing.GZIP)
+            self.assertEqual(legacy_part(summary), legacy_summary(SAMPLE_CSV))
+
+    def test_corrupt_gzip_is_parse_error(self):
+        data = gzip.compress(SAMPLE_CSV.encode())[:-12]
+        for engine in ("c", "auto"):
+            with self.assertRaises(parsing.ParseError):
+                summarize_csv(BytesIO(data), engine=engine, compression=parsing.GZIP)
+
+    @skipUnless(parsing.pa is not None, "pyarrow is not installed")
+    def test_columnar_formats_match_csv(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(pd.read_csv(StringIO(SAMPLE_CSV)), preserve_index=False)
+        expected = summarize_csv(StringIO(SAMPLE_CSV), engine="c")
+
+        out = BytesIO()
+        pq.write_table(table, out)
+        out.seek(0)
+        self.assertEqual(summarize_csv(out, file_format=parsing.PARQUET), expected)
+
+        for new_writer in (pa.ipc.new_file, pa.ipc.new_stream):
+            out = BytesIO()
+            with new_writer(out, table.schema) as writer:
+                writer.write_table(table, max_chunksize=4)
+            out.seek(0)
+            # several record batches, so percentiles come from the sketch
+            summary = summarize_csv(out, file_format=parsing.ARROW)
+            self.assertEqual(legacy_part(summary), legacy_part(expected))
+
+    @skipUnless(parsing.pa is not None, "pyarrow is not installed")
+    def test_columnar_missing_column_is_parse_error(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        out = BytesIO()
+        pq.write_table(pa.table({"Type": ["Pump"], "Flowrate": [1.0]}), out)
+        out.seek(0)
+        with self.assertRaises(parsing.ParseError):
+            summarize_csv(out, file_format=parsing.PARQUET)
+
+    def test_columnar_needs_pyarrow(self):
+        with patch.object(parsing, "pa", None):
+            with self.assertRaises(parsing.UnsupportedFormat):
+                summarize_csv(BytesIO(b"PAR1"), file_format=parsing.PARQUET)
+
+
+class RowStoreTests(TestCase):
+    FORMATS = [row_store.NPY] + ([row_store.ARROW] if row_store.pa is not None else [])
+
+    def setUp(self):
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir, ignore_errors=True)
+        overrides = override_settings(EQUIPMENT_ROW_STORE_DIR=store_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def store(self, text, dataset_id=1, chunk_size=4):
+        with row_store.RowWriter() as rows:
+            summary = summarize_csv(StringIO(text), chunk_size=chunk_size, engine="c", rows=rows)
+            rows.commit(dataset_id)
+        return summary
+
+    def test_round_trip(self):
+        expected = parsing.read_equipment_csv(StringIO(SAMPLE_CSV), engine="c")
+        for fmt in self.FORMATS:
+            with self.subTest(fmt), override_settings(EQUIPMENT_ROW_STORE_FORMAT=fmt):
+                self.store(SAMPLE_CSV)
+                batches = list(row_store.iter_batches(1))
+                stored = pd.concat([b.astype({"Type": object}) for b in batches], ignore_index=True)
+
+                pd.testing.assert_frame_equal(stored, expected.astype({"Type": object}))
+                self.assertEqual(str(batches[0]["Type"].dtype), "category")
+                # the numbers are read-only views of the mapped file
+                self.assertFalse(batches[0]["Pressure"].to_numpy().flags.writeable)
+                row_store.delete(1)
+
+    def test_projection(self):
+        for fmt in self.FORMATS:
+            with self.subTest(fmt), override_settings(EQUIPMENT_ROW_STORE_FORMAT=fmt):
+                self.store(SAMPLE_CSV)
+                batches = list(row_store.iter_batches(1, columns=["Pressure"]))
+
+                self.assertEqual(list(batches[0].columns), ["Pressure"])
+                self.assertEqual(sum(len(b) for b in batches), 9)
+                with self.assertRaises(ValueError):
+                    row_store.iter_batches(1, columns=["Equipment Name"])
+                row_store.delete(1)
+
+    def test_recompute_summary_from_rows(self):
+        for fmt in self.FORMATS:
+            with self.subTest(fmt), override_settings(EQUIPMENT_ROW_STORE_FORMAT=fmt):
+                summary = self.store(SAMPLE_CSV, chunk_size=100)
+
+                self.assertEqual(summarize_stored(1), summary)
+                row_store.delete(1)
+
+    def test_zone_maps_and_take(self):
+        for fmt in self.FORMATS:
+            with self.subTest(fmt), override_settings(EQUIPMENT_ROW_STORE_FORMAT=fmt):
+                self.store(SAMPLE_CSV)
+                zones = json.loads(row_store.zones_path(1).read_text())
+
+                self.assertEqual([zone["rows"] for zone in zones], [4, 4, 1])
+                self.assertEqual(zones[1]["bounds"]["Pressure"], [4.3, 8.1])
+                self.assertEqual(zones[1]["missing"]["Flowrate"], 1)
+                self.assertEqual(zones[1]["types"], ["Compressor", "Pump", "Reactor", "Valve"])
+
+                taken = row_store.take(1, [8, 0, 5], columns=["Type", "Pressure"])
+                self.assertEqual(taken["Type"].tolist(), ["Pump", "Pump", "Reactor"])
+                self.assertEqual(taken["Pressure"].tolist(), [5.9, 5.2, 7.5])
+                row_store.delete(1)
+                self.assertFalse(row_store.zones_path(1).exists())
+
+    def test_missing_and_discarded_rows(self):
+        with self.assertRaises(row_store.MissingRows):
+            row_store.iter_batches(1)
+
+        with row_store.RowWriter() as rows:
+            summarize_csv(StringIO(SAMPLE_CSV), engine="c", rows=rows)
+        self.assertFalse(row_store.exists(1))
+        self.assertEqual(list(row_store.get_store_dir().iterdir()), [])
+
+
+class UploadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, text=SAMPLE_CSV, name="plant.csv", content_type="text/csv"):
+        data = text.encode() if isinstance(text, str) else text
+        file = SimpleUploadedFile(name, data, content_type=content_type)
+        return self.client.post("/api/upload/", {"file": file}, format="multipart")
+
+    def test_upload_stores_summary(self):
+        res = self.upload()
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(legacy_part(res.json()), legacy_summary(SAMPLE_CSV))
+        self.assertEqual(Dataset.objects.get().summary, res.json())
+
+    def test_upload_keeps_rows(self):
+        res = self.upload()
+
+        dataset = Dataset.objects.get()
+        self.assertEqual(summarize_stored(dataset.id), res.json())
+
+    def test_rejected_upload_keeps_no_rows(self):
+        self.upload("Name,Value\nPump-1,3\n")
+
+        self.assertEqual(list(row_store.get_store_dir().glob("*.tmp")), [])
+
+    def test_upload_without_file(self):
+        res = self.client.post("/api/upload/", {}, format="multipart")
+        self.assertEqual(res.status_code, 400)
+
+    def test_upload_records_content_hash(self):
+        # the digest comes from the upload handler, not a second pass
+        with patch("equipment.views.hash_file", side_effect=AssertionError):
+            self.upload()
+        self.assertEqual(
+            Dataset.objects.get().content_hash,
+            hashlib.sha256(SAMPLE_CSV.encode()).hexdigest(),
+        )
+
+    def test_raw_body_upload_records_content_hash(self):
+        with patch("equipment.views.hash_file", side_effect=AssertionError):
+            res = self.client.post(
+                "/api/upload/",
+                data=SAMPLE_CSV.encode(),
+                content_type="text/csv",
+                HTTP_CONTENT_DISPOSITION='attachment; filename="plant.csv"',
+            )
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(
+            Dataset.objects.get().content_hash,
+            hashlib.sha256(SAMPLE_CSV.encode()).hexdigest(),
+        )
+
+    def test_repeat_upload_reuses_summary(self):
+        self.upload()
+
+        with patch("equipment.views.summarize_csv") as summarize:
+            res = self.upload(name="same-bytes-again.csv")
+
+        summarize.assert_not_called()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), Dataset.objects.get().summary)
+        self.assertEqual(Dataset.objects.count(), 1)
+
+    def test_upload_rejects_wrong_schema(self):
+        res = self.upload("Name,Value\nPump-1,3\n")
+        self.assertEqual(res.status_code, 400)
+
+    def test_upload_rejects_overlong_type(self):
+        long_type = "P" * (parsing.MAX_TYPE_LENGTH + 1)
+        for engine in ("c", "pyarrow") if parsing.pa is not None else ("c",):
+            with self.subTest(engine), override_settings(EQUIPMENT_CSV_ENGINE=engine):
+                res = self.upload(SAMPLE_CSV + f"Odd-1,{long_type},1,2,3\n")
+
+                self.assertEqual(res.status_code, 400)
+                self.assertIn("at most 100 characters", res.json()["error"])
+                self.assertFalse(Dataset.objects.exists())
+
+    def test_upload_gzip_by_extension(self):
+        res = self.upload(gzip.compress(SAMPLE_CSV.encode()), name="plant.csv.gz",
+                          content_type="application/gzip")
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(legacy_part(res.json()), legacy_summary(SAMPLE_CSV))
+        # named for what it holds, not how it travelled
+        self.assertEqual(Dataset.objects.get().name, "plant.csv")
+
+    def test_gzip_upload_is_a_repeat_of_the_plain_one(self):
+        self.upload()
+        res = self.upload(gzip.compress(SAMPLE_CSV.encode()), name="plant.csv.gz",
+                          content_type="application/gzip")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(Dataset.objects.count(), 1)
+        self.assertEqual(
+            Dataset.objects.get().content_hash, hashlib.sha256(SAMPLE_CSV.encode()).hexdigest()
+        )
+
+    def test_corrupt_gzip_upload(self):
+        res = self.upload(gzip.compress(SAMPLE_CSV.encode())[:-12], name="plant.csv.gz")
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_upload_raw_body_with_content_encoding(self):
+        res = self.client.post(
+            "/api/upload/",
+            data=gzip.compress(SAMPLE_CSV.encode()),
+            content_type="text/csv",
+            HTTP_CONTENT_DISPOSITION='attachment; filename="plant.csv"',
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(legacy_part(res.json()), legacy_summary(SAMPLE_CSV))
+
+    def test_upload_unsupported_encoding(self):
+        res = self.client.post(
+            "/api/upload/",
+            data=SAMPLE_CSV.encode(),
+            content_type="text/csv",
+            HTTP_CONTENT_DISPOSITION='attachment; filename="plant.csv"',
+            HTTP_CONTENT_ENCODING="br",
+        )
+        self.assertEqual(res.status_code, 415)
+        self.assertFalse(Dataset.objects.exists())
+
+    @skipUnless(parsing.pa is not None, "pyarrow is not installed")
+    def test_upload_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        out = BytesIO()
+        pq.write_table(pa.Table.from_pandas(pd.read_csv(StringIO(SAMPLE_CSV))), out)
+        res = self.upload(out.getvalue(), name="plant.parquet",
+                          content_type="application/octet-stream")
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(legacy_part(res.json()), legacy_summary(SAMPLE_CSV))
+
+    @skipUnless(parsing.pa is not None, "pyarrow is not installed")
+    def test_upload_arrow_with_empty_batch(self):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(pd.read_csv(StringIO(SAMPLE_CSV)), preserve_index=False)
+        out = BytesIO()
+        with pa.ipc.new_file(out, table.schema) as writer:
+            writer.write_batch(table.to_batches()[0].slice(0, 0))
+            writer.write_table(table)
+        res = self.upload(out.getvalue(), name="plant.arrow",
+                          content_type="application/octet-stream")
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(legacy_part(res.json()), legacy_summary(SAMPLE_CSV))
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        overrides = override_settings(EQUIPMENT_REPORT_CACHE_DIR=cache_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dataset = Dataset.objects.create(
+            name="plant.csv", summary=legacy_summary(SAMPLE_CSV)
+        )
+        self.url = f"/api/report/{self.dataset.id}/"
+
+    def test_report_is_pdf(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(res.streaming_content).startswith(b"%PDF"))
+
+    def test_repeat_download_is_served_from_cache(self):
+        first = b"".join(self.client.get(self.url).streaming_content)
+
+        with patch("equipment.report_cache.build_report") as build:
+            res = self.client.get(self.url)
+            second = b"".join(res.streaming_content)
+
+        build.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_conditional_get_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+    def test_deleting_dataset_drops_cached_report(self):
+        self.client.get(self.url)
+        self.assertTrue(list(report_cache.get_cache_dir().glob(f"{self.dataset.id}-*")))
+
+        self.dataset.delete()
+        self.assertFalse(list(report_cache.get_cache_dir().glob(f"{self.dataset.id}-*")))
+
+    def test_content_length_and_ranges(self):
+        full = self.client.get(self.url)
+        pdf = b"".join(full.streaming_content)
+        self.assertEqual(int(full["Content-Length"]), len(pdf))
+        self.assertEqual(full["Accept-Ranges"], "bytes")
+
+        part = self.client.get(self.url, HTTP_RANGE="bytes=100-199", HTTP_IF_RANGE=full["ETag"])
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(b"".join(part.streaming_content), pdf[100:200])
+        self.assertEqual(part["Content-Range"], f"bytes 100-199/{len(pdf)}")
+        self.assertEqual(part["Content-Length"], "100")
+
+        tail = self.client.get(self.url, HTTP_RANGE="bytes=-50")
+        self.assertEqual(b"".join(tail.streaming_content), pdf[-50:])
+
+        # the client's partial copy is of an older version
+        stale = self.client.get(self.url, HTTP_RANGE="bytes=100-", HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+        past_end = self.client.get(self.url, HTTP_RANGE=f"bytes={len(pdf)}-")
+        self.assertEqual(past_end.status_code, 416)
+        self.assertEqual(past_end["Content-Range"], f"bytes */{len(pdf)}")
+
+    def test_parse_range(self):
+        self.assertEqual(ranges.parse_range("bytes=0-", 10), (0, 9))
+        self.assertEqual(ranges.parse_range("bytes=5-100", 10), (5, 9))
+        self.assertEqual(ranges.parse_range("bytes=-3", 10), (7, 9))
+        self.assertEqual(ranges.parse_range("bytes=-30", 10), (0, 9))
+        for ignored in ("bytes=0-1,4-5", "bytes=5-2", "items=0-1", "bytes=-", "bytes=x-"):
+            self.assertIsNone(ranges.parse_range(ignored, 10))
+        with self.assertRaises(ranges.RangeNotSatisfiable):
+            ranges.parse_range("bytes=10-", 10)
+
+    def test_charts_are_vector_graphics(self):
+        with patch("equipment.charts.render_summary_charts", side_effect=AssertionError):
+            pdf = b"".join(self.client.get(self.url).streaming_content)
+
+        self.assertNotIn(b"/Subtype /Image", pdf)
+
+    def test_raster_charts_setting(self):
+        vector = reports.report_version(self.dataset)
+
+        with override_settings(EQUIPMENT_REPORT_CHARTS="raster"):
+            res = self.client.get(self.url)
+            pdf = b"".join(res.streaming_content)
+
+        self.assertIn(b"/Subtype /Image", pdf)
+        self.assertNotEqual(res["ETag"], f'"{vector}"')
+
+    def test_eviction_drops_least_recently_used(self):
+        for version, age in (("old", 300), ("new", 100), ("hot", 200)):
+            path = report_cache.put(1, version, lambda f: f.write(b"x" * 10))
+            os.utime(path, (path.stat().st_atime, path.stat().st_mtime - age))
+        report_cache.get(1, "hot")
+
+        report_cache.evict(max_bytes=20)
+
+        remaining = sorted(p.name for p in report_cache.get_cache_dir().glob("*.pdf"))
+        self.assertEqual(remaining, ["1-hot.pdf", "1-new.pdf"])
+
+
+class ChartTests(TestCase):
+    def summaries(self):
+        return [
+            {
+                "count": 10 + i,
+                "avg_flowrate": 100.0 + i,
+                "avg_pressure": 5.0 + i / 10,
+                "avg_temperature": 110.0 - i,
+                "type_distribution": {"Pump": 3 + i, "Valve": 2, "Reactor": 1 + i % 3},
+            }
+            for i in range(6)
+        ]
+
+    def render(self, summary):
+        pie, bar = charts.render_summary_charts(summary)
+        return pie.getvalue(), bar.getvalue()
+
+    def test_renders_png(self):
+        pie, bar = self.render(self.summaries()[0])
+        self.assertTrue(pie.startswith(b"\x89PNG"))
+        self.assertTrue(bar.startswith(b"\x89PNG"))
+
+    def test_concurrent_renders_match_sequential(self):
+        summaries = self.summaries()
+        expected = [self.render(s) for s in summaries]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(self.render, summaries * 4))
+
+        self.assertEqual(results, expected * 4)
+
+
+class ConcurrentReportTests(TransactionTestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        # a zero-byte cap forces a fresh render on every request
+        overrides = override_settings(
+            EQUIPMENT_REPORT_CACHE_DIR=cache_dir, EQUIPMENT_REPORT_CACHE_MAX_BYTES=0
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = User.objects.create_user("operator", password="secret")
+        self.datasets = [
+            Dataset.objects.create(name=f"unit-{i}.csv", summary=legacy_summary(SAMPLE_CSV))
+            for i in range(4)
+        ]
+
+    def fetch(self, dataset):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            res = client.get(f"/api/report/{dataset.id}/")
+            return res.status_code, b"".join(res.streaming_content)[:4]
+        finally:
+            connection.close()
+
+    def test_hammer_report_endpoint(self):
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            results = list(pool.map(self.fetch, self.datasets * 6))
+
+        self.assertEqual(results, [(200, b"%PDF")] * 24)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        overrides = override_settings(
+            EQUIPMENT_REPORT_CACHE_DIR=cache_dir, EQUIPMENT_REPORT_JOB_BACKEND="thread"
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(jobs.shutdown)
+
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dataset = Dataset.objects.create(
+            name="plant.csv", summary=legacy_summary(SAMPLE_CSV)
+        )
+
+    def wait_for(self, status_url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            body = self.client.get(status_url).json()
+            if body["status"] != jobs.PENDING:
+                return body
+            time.sleep(0.05)
+        self.fail("report job did not finish")
+
+    def test_async_report_job(self):
+        res = self.client.get(f"/api/report/{self.dataset.id}/?async=1")
+
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res["Location"], res.json()["status_url"])
+
+        body = self.wait_for(res["Location"])
+        self.assertEqual(body["status"], jobs.DONE)
+
+        pdf = self.client.get(body["result_url"])
+        self.assertEqual(pdf.status_code, 200)
+        self.assertTrue(b"".join(pdf.streaming_content).startswith(b"%PDF"))
+
+    def test_result_before_done_is_conflict(self):
+        with patch.object(jobs, "_render", side_effect=lambda *a: time.sleep(0.5)):
+            job_id = self.client.get(f"/api/report/{self.dataset.id}/?async=1").json()["job_id"]
+            res = self.client.get(f"/api/report/jobs/{job_id}/result/")
+
+        self.assertEqual(res.status_code, 409)
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get("/api/report/jobs/nope/").status_code, 404)
+
+    @override_settings(EQUIPMENT_REPORT_JOB_BACKEND="process", EQUIPMENT_REPORT_JOB_WORKERS=1)
+    def test_broken_pool_is_replaced(self):
+        jobs.shutdown()
+        # a worker that dies takes the whole pool with it
+        with self.assertRaises(BrokenProcessPool):
+            jobs._submit(os._exit, 1).result(timeout=60)
+        broken = jobs._get_executor()
+
+        self.assertEqual(jobs._submit(abs, -3).result(timeout=60), 3)
+        self.assertIsNot(jobs._get_executor(), broken)
+
+    def test_failed_submission_fails_the_job(self):
+        with patch.object(jobs, "_submit", side_effect=BrokenProcessPool("pool is gone")):
+            res = self.client.get(f"/api/report/{self.dataset.id}/?async=1")
+
+        body = self.client.get(res["Location"]).json()
+        self.assertEqual(body["status"], jobs.FAILED)
+        self.assertEqual(body["error"], "pool is gone")
+
+
+class BulkExportTests(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        overrides = override_settings(
+            EQUIPMENT_REPORT_CACHE_DIR=cache_dir, EQUIPMENT_REPORT_JOB_BACKEND="thread"
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(jobs.shutdown)
+
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.datasets = [
+            Dataset.objects.create(name="plant.csv", summary=legacy_summary(SAMPLE_CSV))
+            for _ in range(3)
+        ]
+
+    def export(self, datasets):
+        ids = ",".join(str(d.id) for d in datasets)
+        res = self.client.get(f"/api/report/export/?ids={ids}")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "application/zip")
+        return zipfile.ZipFile(BytesIO(b"".join(res.streaming_content)))
+
+    def test_export_zip_of_reports(self):
+        report_cache.open_or_build(self.datasets[0], reports.report_version(self.datasets[0])).close()
+
+        archive = self.export(self.datasets)
+
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(
+            sorted(archive.namelist()),
+            sorted(bulk_export.entry_name(d) for d in self.datasets),
+        )
+        for dataset in self.datasets:
+            pdf = archive.read(bulk_export.entry_name(dataset))
+            path = report_cache.get(dataset.id, reports.report_version(dataset))
+            self.assertEqual(pdf, path.read_bytes())
+
+    def test_failed_report_is_listed(self):
+        broken = self.datasets[1]
+        real = jobs._render
+
+        def render(dataset, version):
+            if dataset.id == broken.id:
+                raise RuntimeError("renderer crashed")
+            real(dataset, version)
+
+        with patch.object(jobs, "_render", side_effect=render):
+            archive = self.export(self.datasets)
+
+        names = archive.namelist()
+        self.assertNotIn(bulk_export.entry_name(broken), names)
+        self.assertEqual(len(names), 3)
+        self.assertIn("renderer crashed", archive.read(bulk_export.ERRORS_ENTRY).decode())
+
+    def test_bad_ids(self):
+        self.assertEqual(self.client.get("/api/report/export/").status_code, 400)
+        self.assertEqual(self.client.get("/api/report/export/?ids=1,x").status_code, 400)
+        self.assertEqual(self.client.get("/api/report/export/?ids=999999").status_code, 404)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice")
+        self.bob = User.objects.create_user("bob")
+
+    def make(self, name, owner=None, age_days=0):
+        dataset = Dataset.objects.create(name=name, summary={}, owner=owner)
+        Dataset.objects.filter(pk=dataset.pk).update(
+            uploaded_at=timezone.now() - timedelta(days=age_days)
+        )
+        return dataset
+
+    def names(self):
+        return set(Dataset.objects.values_list("name", flat=True))
+
+    def policy(self, **rules):
+        return {"MAX_COUNT": None, "MAX_AGE": None, "PER_USER_QUOTA": None, **rules}
+
+    def test_max_count_keeps_newest(self):
+        for i in range(7):
+            self.make(f"d{i}", age_days=7 - i)
+
+        self.assertEqual(retention.prune(self.policy(MAX_COUNT=5)), 2)
+        self.assertEqual(self.names(), {"d2", "d3", "d4", "d5", "d6"})
+
+    def test_max_age(self):
+        self.make("old", age_days=40)
+        self.make("new", age_days=1)
+
+        retention.prune(self.policy(MAX_AGE=timedelta(days=30)))
+        self.assertEqual(self.names(), {"new"})
+
+    def test_per_user_quota(self):
+        for i in range(3):
+            self.make(f"alice{i}", owner=self.alice, age_days=3 - i)
+        self.make("bob0", owner=self.bob)
+
+        retention.prune(self.policy(PER_USER_QUOTA=2))
+        self.assertEqual(self.names(), {"alice1", "alice2", "bob0"})
+
+    def test_batched_prune(self):
+        for i in range(12):
+            self.make(f"d{i}", age_days=12 - i)
+
+        self.assertEqual(retention.prune(self.policy(MAX_COUNT=2), batch_size=3), 10)
+        self.assertEqual(self.names(), {"d10", "d11"})
+
+    @override_settings(EQUIPMENT_RETENTION={"MAX_COUNT": 5})
+    def test_upload_applies_policy(self):
+        for i in range(5):
+            self.make(f"d{i}", age_days=5 - i)
+        client = APIClient()
+        client.force_authenticate(self.alice)
+
+        file = SimpleUploadedFile("new.csv", SAMPLE_CSV.encode())
+        client.post("/api/upload/", {"file": file}, format="multipart")
+
+        self.assertEqual(self.names(), {"d1", "d2", "d3", "d4", "new.csv"})
+        self.assertEqual(Dataset.objects.get(name="new.csv").owner, self.alice)
+
+    def test_prune_deletes_stored_rows(self):
+        datasets = [self.make(f"d{i}", age_days=3 - i) for i in range(3)]
+        for dataset in datasets:
+            with row_store.RowWriter() as rows:
+                summarize_csv(StringIO(SAMPLE_CSV), rows=rows)
+                rows.commit(dataset.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            retention.prune(self.policy(MAX_COUNT=1))
+
+        self.assertEqual([row_store.exists(d.id) for d in datasets], [False, False, True])
+
+    def test_prune_command(self):
+        for i in range(4):
+            self.make(f"d{i}", age_days=4 - i)
+        out = StringIO()
+
+        call_command("prune_datasets", "--max-count", "1", "--dry-run", stdout=out)
+        self.assertIn("3 dataset(s) would be deleted", out.getvalue())
+        self.assertEqual(Dataset.objects.count(), 4)
+
+        call_command("prune_datasets", "--max-count", "1", stdout=out)
+        self.assertEqual(self.names(), {"d3"})
+
+
+class HistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        for i in range(12):
+            dataset = Dataset.objects.create(name=f"d{i}", summary={"count": i})
+            Dataset.objects.filter(pk=dataset.pk).update(uploaded_at=now - timedelta(minutes=12 - i))
+
+    def test_default_is_newest_five(self):
+        res = self.client.get("/api/history/")
+
+        self.assertEqual([d["name"] for d in res.json()], ["d11", "d10", "d9", "d8", "d7"])
+        self.assertIn("summary", res.json()[0])
+
+    def test_cursor_walks_all_pages(self):
+        url, names = "/api/history/?limit=5", []
+        while url:
+            res = self.client.get(url)
+            names += [d["name"] for d in res.json()]
+            link = res.get("Link")
+            url = link[1:link.index(">")] if link else None
+
+        self.assertEqual(names, [f"d{i}" for i in range(11, -1, -1)])
+
+    def test_ties_on_uploaded_at_are_not_skipped(self):
+        Dataset.objects.update(uploaded_at=timezone.now())
+
+        first = self.client.get("/api/history/?limit=7")
+        link = first["Link"]
+        second = self.client.get(link[1:link.index(">")])
+
+        ids = [d["id"] for d in first.json() + second.json()]
+        self.assertEqual(sorted(ids), sorted(Dataset.objects.values_list("id", flat=True)))
+
+    def test_sparse_fields(self):
+        res = self.client.get("/api/history/?fields=id,name,uploaded_at")
+        self.assertEqual(set(res.json()[0]), {"id", "name", "uploaded_at"})
+
+    def test_unknown_field_is_rejected(self):
+        res = self.client.get("/api/history/?fields=id,secret")
+        self.assertEqual(res.status_code, 400)
+
+    def test_conditional_get(self):
+        etag = self.client.get("/api/history/")["ETag"]
+
+        self.assertEqual(self.client.get("/api/history/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Dataset.objects.create(name="new", summary={})
+        self.assertEqual(self.client.get("/api/history/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class HistoryCacheTests(TestCase):
+    def setUp(self):
+        dataset_cache.get_cache().clear()
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            Dataset.objects.create(name=f"d{i}", summary={"count": i})
+
+    def names(self):
+        return [d["name"] for d in self.client.get("/api/history/").json()]
+
+    def test_repeat_request_is_a_cache_hit(self):
+        first = self.client.get("/api/history/?limit=2")
+
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/history/?limit=2")
+            not_modified = self.client.get("/api/history/?limit=2", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(again["Link"], first["Link"])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_upload_invalidates(self):
+        self.names()
+        file = SimpleUploadedFile("plant.csv", SAMPLE_CSV.encode(), content_type="text/csv")
+        self.client.post("/api/upload/", {"file": file}, format="multipart")
+
+        self.assertEqual(self.names()[0], "plant.csv")
+
+    def test_retention_delete_invalidates(self):
+        self.names()
+        retention.prune(retention.get_policy(MAX_COUNT=1))
+
+        self.assertEqual(self.names(), ["d2"])
+
+    def test_invalidates_again_on_commit(self):
+        key = dataset_cache.history_key(None, 5, None)
+        with self.captureOnCommitCallbacks(execute=True):
+            Dataset.objects.create(name="new", summary={})
+            # a page built before the commit, stored under the new generation
+            dataset_cache.set_page(dataset_cache.history_key(None, 5, None), {"stale": True})
+
+        self.assertNotEqual(dataset_cache.history_key(None, 5, None), key)
+        self.assertEqual(self.names()[0], "new")
+
+    def test_reports_read_cached_datasets(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        dataset = Dataset.objects.create(name="plant.csv", summary=legacy_summary(SAMPLE_CSV))
+
+        with override_settings(EQUIPMENT_REPORT_CACHE_DIR=cache_dir):
+            self.client.get(f"/api/report/{dataset.id}/")
+            with self.assertNumQueries(0):
+                res = self.client.get(f"/api/report/{dataset.id}/")
+        self.assertEqual(res.status_code, 200)
+
+        dataset.delete()
+        self.assertEqual(self.client.get(f"/api/report/{dataset.id}/").status_code, 404)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.registry.reset()
+        self.addCleanup(instrumentation.registry.reset)
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self):
+        file = SimpleUploadedFile("plant.csv", SAMPLE_CSV.encode(), content_type="text/csv")
+        return self.client.post("/api/upload/", {"file": file}, format="multipart")
+
+    def timing_names(self, response):
+        return [entry.split(";")[0] for entry in response["Server-Timing"].split(", ")]
+
+    def test_upload_phases_in_server_timing(self):
+        res = self.upload()
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(
+            self.timing_names(res),
+            ["dedupe", "parse", "aggregate", "store", "db", "retention", "total"],
+        )
+
+    def test_report_phases_in_server_timing(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        dataset = Dataset.objects.create(name="plant.csv", summary=legacy_summary(SAMPLE_CSV))
+
+        with override_settings(EQUIPMENT_REPORT_CACHE_DIR=cache_dir):
+            res = self.client.get(f"/api/report/{dataset.id}/")
+
+        self.assertEqual(self.timing_names(res), ["charts", "layout", "total"])
+
+    def test_metrics_endpoint(self):
+        self.upload()
+        self.client.get("/api/history/")
+        self.client.get("/api/history/")
+
+        staff = APIClient()
+        staff.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        res = staff.get("/api/metrics/")
+        body = res.content.decode()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn("# TYPE equipment_request_duration_seconds histogram", body)
+        self.assertIn(
+            'equipment_request_duration_seconds_count{endpoint="history",method="GET",status="200"} 2',
+            body,
+        )
+        self.assertIn(
+            'equipment_phase_duration_seconds_bucket{endpoint="upload",phase="parse",le="+Inf"} 1',
+            body,
+        )
+        # the metrics endpoint itself is not instrumented
+        self.assertNotIn('endpoint="metrics"', body)
+        self.assertFalse(res.has_header("Server-Timing"))
+
+    @override_settings(EQUIPMENT_METRICS_TOKEN="scrape-me")
+    def test_metrics_access(self):
+        # latencies and request counts are not for every user
+        self.assertEqual(APIClient().get("/api/metrics/").status_code, 401)
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        wrong = APIClient().get("/api/metrics/", HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(wrong.status_code, 401)
+
+        scraper = APIClient().get("/api/metrics/", HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(scraper.status_code, 200)
+        with override_settings(EQUIPMENT_METRICS_TOKEN=None):
+            res = APIClient().get("/api/metrics/", HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(res.status_code, 401)
+
+    @override_settings(EQUIPMENT_INSTRUMENTATION=False)
+    def test_disabled(self):
+        res = self.upload()
+
+        self.assertFalse(res.has_header("Server-Timing"))
+        self.assertIs(instrumentation.phase("parse"), instrumentation.phase("db"))
+        self.user.is_staff = True
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 404)
+        self.assertEqual(instrumentation.registry.requests, {})
+
+
+class DatasetQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make(self, name, pressure, types, count=10):
+        summary = {
+            "count": count,
+            "avg_flowrate": 100.0,
+            "avg_pressure": pressure,
+            "avg_temperature": 120.0,
+            "type_distribution": types,
+        }
+        return Dataset.objects.create_from_summary(summary, name=name)
+
+    def names(self, query):
+        res = self.client.get(f"/api/datasets/{query}")
+        self.assertEqual(res.status_code, 200, res.content)
+        return [d["name"] for d in res.json()]
+
+    def test_upload_populates_columns_and_distribution(self):
+        file = SimpleUploadedFile("plant.csv", SAMPLE_CSV.encode(), content_type="text/csv")
+        self.client.post("/api/upload/", {"file": file}, format="multipart")
+
+        dataset = Dataset.objects.get()
+        expected = legacy_summary(SAMPLE_CSV)
+        self.assertEqual(dataset.row_count, expected["count"])
+        self.assertAlmostEqual(dataset.avg_pressure, expected["avg_pressure"])
+        self.assertEqual(
+            dict(dataset.type_counts.values_list("equipment_type", "count")),
+            expected["type_distribution"],
+        )
+
+    def test_filters_and_ordering(self):
+        self.make("low", 5.0, {"Pump": 10})
+        self.make("high", 9.0, {"Pump": 6, "Compressor": 4})
+        self.make("mid", 7.5, {"Compressor": 10})
+        self.make("empty", None, {})
+
+        self.assertEqual(self.names("?avg_pressure__gt=7&ordering=avg_pressure"), ["mid", "high"])
+        self.assertEqual(self.names("?type=Compressor&ordering=name"), ["high", "mid"])
+        self.assertEqual(self.names("?type=Compressor&type=Pump"), ["high"])
+        # NULL averages sort last in both directions
+        self.assertEqual(self.names("?ordering=-avg_pressure"), ["high", "mid", "low", "empty"])
+        self.assertEqual(self.names("?ordering=avg_pressure"), ["low", "mid", "high", "empty"])
+
+    def test_summary_is_opt_in(self):
+        self.make("a", 5.0, {"Pump": 10})
+
+        self.assertNotIn("summary", self.client.get("/api/datasets/").json()[0])
+        res = self.client.get("/api/datasets/?fields=id,summary")
+        self.assertEqual(set(res.json()[0]), {"id", "summary"})
+
+    def test_bad_parameters(self):
+        for query in ("?avg_presure__gt=7", "?avg_pressure__in=1", "?row_count=x",
+                      "?ordering=summary", "?offset=x"):
+            self.assertEqual(self.client.get(f"/api/datasets/{query}").status_code, 400, query)
+
+    def test_offset_pages(self):
+        for i in range(5):
+            self.make(f"d{i}", float(i), {"Pump": 1})
+
+        url, names = "/api/datasets/?ordering=avg_pressure&limit=2", []
+        while url:
+            res = self.client.get(url)
+            names += [d["name"] for d in res.json()]
+            link = res.get("Link")
+            url = link[1:link.index(">")] if link else None
+
+        self.assertEqual(names, ["d0", "d1", "d2", "d3", "d4"])
+
+    def test_backfill_migration(self):
+        summary = {**legacy_summary(SAMPLE_CSV), "avg_flowrate": None}
+        dataset = Dataset.objects.create(name="old.csv", summary=summary)
+        migration = importlib.import_module("equipment.migrations.0005_backfill_summary_columns")
+
+        migration.backfill(apps, connection.schema_editor())
+
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.row_count, summary["count"])
+        self.assertIsNone(dataset.avg_flowrate)
+        self.assertAlmostEqual(dataset.avg_pressure, summary["avg_pressure"])
+        self.assertEqual(
+            dict(dataset.type_counts.values_list("equipment_type", "count")),
+            summary["type_distribution"],
+        )
+
+    def test_distribution_rows_go_with_the_dataset(self):
+        dataset = self.make("a", 5.0, {"Pump": 10})
+        dataset.delete()
+        self.assertFalse(EquipmentTypeCount.objects.exists())
+
+
+class DatasetRowsTests(TestCase):
+    FORMATS = RowStoreTests.FORMATS
+
+    def setUp(self):
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # ids are reused between tests; so would be the rows of the module's store
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir, ignore_errors=True)
+        overrides = override_settings(EQUIPMENT_ROW_STORE_DIR=store_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, text=SAMPLE_CSV, chunk_size=3):
+        file = SimpleUploadedFile("plant.csv", text.encode(), content_type="text/csv")
+        # the C engine, as pyarrow's batches are sized in bytes
+        with override_settings(EQUIPMENT_CSV_ENGINE="c", EQUIPMENT_INGEST_CHUNK_SIZE=chunk_size):
+            res = self.client.post("/api/upload/", {"file": file}, format="multipart")
+        self.assertEqual(res.status_code, 201, res.content)
+        return Dataset.objects.latest("id").id
+
+    def walk(self, dataset_id, query):
+        """Every row of every page, following the Link headers."""
+        url, rows = f"/api/datasets/{dataset_id}/rows/{query}", []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200, res.content)
+            rows += res.json()
+            link = res.get("Link")
+            url = link[1:link.index(">")] if link else None
+        return rows
+
+    def test_projection(self):
+        dataset_id = self.upload()
+
+        rows = self.walk(dataset_id, "?fields=pressure,type")
+        self.assertEqual(len(rows), 9)
+        # the row number always comes along, and missing numbers are null
+        self.assertEqual(rows[0], {"row": 0, "type": "Pump", "pressure": 5.2})
+        self.assertIsNone(self.walk(dataset_id, "?fields=flowrate")[7]["flowrate"])
+
+    def test_filters_and_ordering(self):
+        dataset_id = self.upload()
+
+        def numbers(query):
+            return [row["row"] for row in self.walk(dataset_id, query)]
+
+        self.assertEqual(numbers("?type=Pump"), [0, 4, 8])
+        self.assertEqual(numbers("?type=Pump&type=Valve&pressure__lt=5"), [2, 7])
+        self.assertEqual(numbers("?pressure__gte=7.5&ordering=-pressure"), [1, 6, 5])
+        self.assertEqual(numbers("?ordering=-row&limit=4"), [8, 7, 6, 5, 4, 3, 2, 1, 0])
+        # missing values sort last in both directions
+        self.assertEqual(numbers("?ordering=temperature")[-1], 7)
+        self.assertEqual(numbers("?ordering=-temperature")[-1], 7)
+
+    def test_pages_match_pandas(self):
+        rng = np.random.default_rng(7)
+        frame = pd.DataFrame({
+            "Equipment Name": [f"E-{i}" for i in range(500)],
+            "Type": rng.choice(["Pump", "Valve", "Reactor"], 500),
+            # few distinct values, so the row number has to break ties
+            "Flowrate": rng.integers(0, 20, 500).astype(float),
+            "Pressure": rng.normal(6, 2, 500).round(2),
+            "Temperature": rng.normal(110, 10, 500).round(1),
+        })
+        frame.loc[::17, "Flowrate"] = np.nan
+        text = frame.to_csv(index=False)
+        frame["row"] = np.arange(len(frame))
+
+        for fmt in self.FORMATS:
+            with self.subTest(fmt), override_settings(EQUIPMENT_ROW_STORE_FORMAT=fmt):
+                dataset_id = self.upload(text, chunk_size=64)
+                got = self.walk(dataset_id, "?type=Valve&pressure__gt=5&ordering=-flowrate&limit=7")
+
+                valves = frame[(frame["Type"] == "Valve") & (frame["Pressure"] > 5)]
+                expected = valves.sort_values(
+                    ["Flowrate", "row"], ascending=[False, True], na_position="last", kind="stable"
+                )
+                self.assertEqual([row["row"] for row in got], expected["row"].tolist())
+                self.assertEqual(got[0]["pressure"], expected["Pressure"].iloc[0])
+                Dataset.objects.filter(id=dataset_id).delete()  # or the next upload is a duplicate
+
+    def test_zone_maps_skip_batches(self):
+        dataset_id = self.upload()
+        scan = row_store.scan
+        read = []
+
+        def counting_scan(*args, **kwargs):
+            for start, frame in scan(*args, **kwargs):
+                read.append(start)
+                yield start, frame
+
+        with patch.object(row_store, "scan", counting_scan):
+            rows = self.walk(dataset_id, "?type=Reactor")
+        # batches of three rows; only the second holds a reactor
+        self.assertEqual([row["row"] for row in rows], [5])
+        self.assertEqual(read, [3, 3])  # the search, then the page's rows
+
+    def test_bad_parameters(self):
+        dataset_id = self.upload()
+        for query in ("?fields=name", "?pressure__in=1", "?pressure__gt=x", "?row__gt=1",
+                      "?ordering=type", "?limit=x", "?cursor=x"):
+            res = self.client.get(f"/api/datasets/{dataset_id}/rows/{query}")
+            self.assertEqual(res.status_code, 400, query)
+
+        link = self.client.get(f"/api/datasets/{dataset_id}/rows/?limit=2").get("Link")
+        cursor = link[link.index("cursor=") + 7:link.index(">")]
+        res = self.client.get(f"/api/datasets/{dataset_id}/rows/?ordering=pressure&cursor={cursor}")
+        self.assertEqual(res.status_code, 400)
+
+    def test_missing_rows(self):
+        self.assertEqual(self.client.get("/api/datasets/999/rows/").status_code, 404)
+
+        dataset = Dataset.objects.create(name="old.csv", summary=legacy_summary(SAMPLE_CSV))
+        self.assertEqual(self.client.get(f"/api/datasets/{dataset.id}/rows/").status_code, 404)
+
+
+OTHER_CSV = (
+    "Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+    "Pump-9,Pump,80,4.0,100\n"
+    "Tank-1,Tank,20,3.2,295\n"
+    "Tank-2,Tank,22,,298\n"
+)
+
+
+class CompareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("operator", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.a = Dataset.objects.create_from_summary(summarize_csv(StringIO(SAMPLE_CSV)), name="a.csv")
+        self.b = Dataset.objects.create_from_summary(summarize_csv(StringIO(OTHER_CSV)), name="b.csv")
+
+    def test_merge_matches_concatenated_upload(self):
+        combined = SAMPLE_CSV + OTHER_CSV.split("\n", 1)[1]
+        expected = summarize_csv(StringIO(combined))
+
+        merged = compare.merge_summaries([self.a.summary, self.b.summary])
+
+        self.assertEqual(merged["count"], expected["count"])
+        self.assertEqual(merged["type_distribution"], expected["type_distribution"])
+        for key in ("avg_flowrate", "avg_pressure", "avg_temperature"):
+            self.assertAlmostEqual(merged[key], expected[key])
+        for col, col_stats in merged["stats"].items():
+            for stat in compare.MERGED_STATS:
+                self.assertAlmostEqual(col_stats[stat], expected["stats"][col][stat], msg=(col, stat))
+
+    def test_legacy_summaries_weight_by_count(self):
+        merged = compare.merge_summaries([
+            {"count": 1, "avg_flowrate": 10.0, "avg_pressure": 1.0, "avg_temperature": 5.0,
+             "type_distribution": {"Pump": 1}},
+            {"count": 3, "avg_flowrate": 20.0, "avg_pressure": 2.0, "avg_temperature": 5.0,
+             "type_distribution": {"Pump": 2, "Valve": 1}},
+        ])
+
+        self.assertEqual(merged["avg_flowrate"], 17.5)
+        self.assertEqual(merged["type_distribution"], {"Pump": 3, "Valve": 1})
+        self.assertNotIn("stats", merged)
+
+    def test_endpoint_returns_merged_and_deltas(self):
+        res = self.client.get(f"/api/compare/?ids={self.b.id},{self.a.id}")
+
+        self.assertEqual(res.status_code, 200)
+        body = res.json()
+        self.assertEqual([d["name"] for d in body["datasets"]], ["b.csv", "a.csv"])
+        merged = body["merged"]
+        for row in body["datasets"]:
+            self.assertAlmostEqual(row["avg_pressure_delta"], row["avg_pressure"] - merged["avg_pressure"])
+        self.assertAlmostEqual(sum(d["share"] for d in body["datasets"]), 1.0)
+
+    def test_bad_ids(self):
+        self.assertEqual(self.client.get(f"/api/compare/?ids={self.a.id}").status_code, 400)
+        self.assertEqual(self.client.get("/api/compare/?ids=1,x").status_code, 400)
+        self.assertEqual(self.client.get(f"/api/compare/?ids={self.a.id},999999").status_code, 404)
+
+    def test_comparison_pdf(self):
+        url = f"/api/compare/report/?ids={self.a.id},{self.b.id}"
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "application/pdf")
+        pdf = b"".join(res.streaming_content)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertEqual(int(res["Content-Length"]), len(pdf))
+
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        part = self.client.get(url, HTTP_RANGE="bytes=0-3")
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(b"".join(part.streaming_content), b"%PDF")
+
+
+class AsyncViewTests(TestCase):
+    """The ASGI views, through the URLs ``backend/asgi.py`` serves them on."""
+
+    def setUp(self):
+        self.use_urls(async_views=True)
+        self.addCleanup(self.use_urls, async_views=False)
+        self.user = User.objects.create_user("operator", password="secret")
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {"Authorization": f"Bearer {token}"}
+
+    def use_urls(self, async_views):
+        import backend.urls
+        import equipment.urls
+
+        with override_settings(EQUIPMENT_ASYNC_VIEWS=async_views):
+            importlib.reload(equipment.urls)
+            importlib.reload(backend.urls)
+        clear_url_caches()
+
+    async def upload(self, text=SAMPLE_CSV, name="plant.csv"):
+        file = SimpleUploadedFile(name, text.encode(), content_type="text/csv")
+        return await self.async_client.post("/api/upload/", {"file": file}, headers=self.auth)
+
+    async def test_upload_and_dedupe(self):
+        res = await self.upload()
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(legacy_part(res.json()), legacy_summary(SAMPLE_CSV))
+        dataset = await Dataset.objects.aget()
+        self.assertEqual(dataset.owner_id, self.user.id)
+        self.assertEqual(dataset.content_hash, hashlib.sha256(SAMPLE_CSV.encode()).hexdigest())
+        self.assertEqual(
+            [entry.split(";")[0] for entry in res["Server-Timing"].split(", ")],
+            ["receive", "dedupe", "parse", "aggregate", "store", "db", "retention", "total"],
+        )
+
+        again = await self.upload(name="same-bytes-again.csv")
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(await Dataset.objects.acount(), 1)
+
+    async def test_upload_errors(self):
+        self.assertEqual((await self.upload("Name,Value\nPump-1,3\n")).status_code, 400)
+        res = await self.async_client.post(
+            "/api/upload/",
+            data=SAMPLE_CSV.encode(),
+            content_type="text/csv",
+            headers={
+                **self.auth,
+                "Content-Disposition": 'attachment; filename="plant.csv"',
+                "Content-Encoding": "br",
+            },
+        )
+        self.assertEqual(res.status_code, 415)
+        res = await self.async_client.post("/api/upload/", {}, headers=self.auth)
+        self.assertEqual(res.status_code, 400)
+
+    async def test_requires_token(self):
+        res = await self.async_client.get("/api/history/")
+
+        self.assertEqual(res.status_code, 401)
+        self.assertEqual(res["WWW-Authenticate"], 'Bearer realm="api"')
+
+    async def test_history_matches_sync_view(self):
+        for i in range(7):
+            await Dataset.objects.acreate(name=f"d{i}", summary={"count": i})
+
+        res = await self.async_client.get("/api/history/?limit=5", headers=self.auth)
+        self.assertEqual(res.status_code, 200)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.use_urls(async_views=False)
+        expected = await sync_to_async(client.get)("/api/history/?limit=5")
+        self.assertEqual(res.content, expected.content)
+        self.assertEqual(res["ETag"], expected["ETag"])
+        self.assertEqual(res["Link"], expected["Link"])
+
+        self.use_urls(async_views=True)
+        not_modified = await self.async_client.get(
+            "/api/history/?limit=5", headers={**self.auth, "If-None-Match": res["ETag"]}
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        bad = await self.async_client.get("/api/history/?fields=secret", headers=self.auth)
+        self.assertEqual(bad.status_code, 400)
+
+    async def body(self, response):
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    async def test_report(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        dataset = await Dataset.objects.acreate(name="plant.csv", summary=legacy_summary(SAMPLE_CSV))
+        url = f"/api/report/{dataset.id}/"
+
+        with override_settings(EQUIPMENT_REPORT_CACHE_DIR=cache_dir):
+            res = await self.async_client.get(url)
+            pdf = await self.body(res)
+            cached = await self.body(await self.async_client.get(url))
+            part = await self.async_client.get(url, headers={"Range": "bytes=10-19"})
+            not_modified = await self.async_client.get(url, headers={"If-None-Match": res["ETag"]})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertEqual(int(res["Content-Length"]), len(pdf))
+        self.assertEqual(cached, pdf)
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(await self.body(part), pdf[10:20])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual((await self.async_client.get("/api/report/999999/")).status_code, 404)
+
+    async def test_export(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.addCleanup(jobs.shutdown)
+        a = await Dataset.objects.acreate(name="a.csv", summary=legacy_summary(SAMPLE_CSV))
+        b = await Dataset.objects.acreate(name="b.csv", summary=legacy_summary(SAMPLE_CSV))
+
+        with override_settings(EQUIPMENT_REPORT_CACHE_DIR=cache_dir, EQUIPMENT_REPORT_JOB_BACKEND="thread"):
+            res = await self.async_client.get(f"/api/report/export/?ids={a.id},{b.id}", headers=self.auth)
+            archive = zipfile.ZipFile(BytesIO(await self.body(res)))
+            bad = await self.async_client.get("/api/report/export/?ids=x", headers=self.auth)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            sorted(archive.namelist()), sorted(bulk_export.entry_name(d) for d in (a, b))
+        )
+        self.assertTrue(archive.read(bulk_export.entry_name(a)).startswith(b"%PDF"))
+        self.assertEqual(bad.status_code, 400)
+
+    async def test_export_unknown_dataset_is_json_404(self):
+        res = await self.async_client.get("/api/report/export/?ids=999", headers=self.auth)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(res.json(), {"detail": "Unknown dataset(s): 999"})
+
+    @override_settings(EQUIPMENT_ASYNC_WORKERS=1, EQUIPMENT_ASYNC_QUEUE=0)
+    async def test_saturated_pool_answers_503(self):
+        offload.shutdown()
+        self.addCleanup(offload.shutdown)
+        release = threading.Event()
+        busy = asyncio.ensure_future(offload.run(release.wait))
+        await asyncio.sleep(0)
+
+        res = await self.upload()
+
+        release.set()
+        await busy
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res["Retry-After"], "1")
+        self.assertEqual((await self.upload()).status_code, 201)
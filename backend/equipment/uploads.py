@@ -0,0 +1,49 @@
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .parsing import iter_decompressed
+
+
+class ContentHashUploadHandler(FileUploadHandler):
+    """
+    Pass-through upload handler that hashes each file's bytes as Django
+    streams them to the real storage handlers behind it.
+
+    Must be installed before ``request.FILES`` is first read.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.digests = {}
+        self.hasher = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        # DRF's FileUploadParser (raw request body) passes no field name;
+        # it files the upload under "file"
+        self.digests[self.field_name or "file"] = self.hasher.hexdigest()
+        # let the next handler build the UploadedFile
+        return None
+
+
+def hash_file(file, compression=None):
+    """
+    sha256 of an already-received upload, for when the handler did not run.
+    Compressed uploads are hashed decompressed, so the same CSV gets the
+    same hash however it was sent. Raises ``ParseError`` if it won't
+    decompress.
+    """
+    hasher = hashlib.sha256()
+    chunks = iter_decompressed(file, compression) if compression else file.chunks()
+    for chunk in chunks:
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
@@ -1,9 +1,32 @@
+from django.conf import settings
 from django.urls import path
-from .views import UploadCSVView, HistoryView
-from .views import generate_pdf_report
+from . import async_views
+from .views import CompareReportView, CompareView, DatasetQueryView, DatasetRowsView, ExportReportsView
+from .views import MetricsView, UploadCSVView, HistoryView
+from .views import generate_pdf_report, report_job_result, report_job_status
+
+# async upload, history, report and export views when served over ASGI (see backend/asgi.py)
+if getattr(settings, "EQUIPMENT_ASYNC_VIEWS", False):
+    upload_view = async_views.AsyncUploadView.as_view()
+    history_view = async_views.AsyncHistoryView.as_view()
+    report_view = async_views.generate_pdf_report
+    export_view = async_views.AsyncExportReportsView.as_view()
+else:
+    upload_view = UploadCSVView.as_view()
+    history_view = HistoryView.as_view()
+    report_view = generate_pdf_report
+    export_view = ExportReportsView.as_view()
 
 urlpatterns = [
-    path('upload/', UploadCSVView.as_view(), name='upload'),
-    path('history/', HistoryView.as_view(), name='history'),
-    path("report/<int:dataset_id>/", generate_pdf_report),
+    path('upload/', upload_view, name='upload'),
+    path('history/', history_view, name='history'),
+    path('datasets/', DatasetQueryView.as_view(), name='datasets'),
+    path('datasets/<int:dataset_id>/rows/', DatasetRowsView.as_view(), name='dataset-rows'),
+    path('compare/', CompareView.as_view(), name='compare'),
+    path('compare/report/', CompareReportView.as_view(), name='compare-report'),
+    path("report/<int:dataset_id>/", report_view, name="report"),
+    path("report/export/", export_view, name="report-export"),
+    path("report/jobs/<str:job_id>/", report_job_status, name="report-job"),
+    path("report/jobs/<str:job_id>/result/", report_job_result, name="report-job-result"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,120 @@
+"""
+Report charts drawn with ``reportlab.graphics``.
+
+The pie and bar charts are built as ``Drawing`` flowables that go into the
+PDF as vector paths. Nothing is rasterized, and matplotlib is not imported.
+They follow the matplotlib charts in ``charts``: the same titles, the
+default matplotlib colour cycle for pie slices, ``BAR_COLOR`` for bars,
+and percentages with one decimal. Each call builds fresh objects, so
+the charts can be drawn from any thread.
+"""
+import math
+
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing, Group, String
+from reportlab.lib import colors
+
+BAR_COLOR = colors.HexColor("#6366f1")
+
+# matplotlib's default ("tab10") colour cycle
+SLICE_COLORS = [
+    colors.HexColor(c) for c in (
+        "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+        "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+    )
+]
+
+TITLE_FONT = ("Helvetica", 10)
+LABEL_FONT = ("Helvetica", 7)
+
+
+def _title(drawing, text):
+    drawing.add(String(
+        drawing.width / 2, drawing.height - TITLE_FONT[1] - 2, text,
+        fontName=TITLE_FONT[0], fontSize=TITLE_FONT[1], textAnchor="middle",
+    ))
+
+
+def _number(value):
+    return 0 if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+
+def pie_chart(distribution, size, title="Equipment Type Distribution"):
+    drawing = Drawing(size, size)
+    _title(drawing, title)
+
+    values = [n for n in distribution.values() if n > 0]
+    names = [name for name, n in distribution.items() if n > 0]
+    if not values:
+        return drawing
+    total = sum(values)
+
+    pie = Pie()
+    # leave room for the title on top and side labels around the pie
+    diameter = size * 0.56
+    pie.x = (size - diameter) / 2
+    pie.y = (size - TITLE_FONT[1] - 4 - diameter) / 2
+    pie.width = pie.height = diameter
+    pie.data = values
+    pie.labels = [f"{name} {n / total:.1%}" for name, n in zip(names, values)]
+    pie.startAngle = 140
+    pie.direction = "anticlockwise"
+    pie.simpleLabels = False
+    pie.slices.strokeColor = colors.white
+    pie.slices.strokeWidth = 0.5
+    pie.slices.fontName = LABEL_FONT[0]
+    pie.slices.fontSize = LABEL_FONT[1]
+    pie.slices.labelRadius = 1.15
+    for i in range(len(values)):
+        pie.slices[i].fillColor = SLICE_COLORS[i % len(SLICE_COLORS)]
+    pie.checkLabelOverlap = True
+    drawing.add(pie)
+    return drawing
+
+
+def bar_chart(labels, values, size, title="Average Parameters", ylabel="Value"):
+    drawing = Drawing(size, size)
+    _title(drawing, title)
+
+    chart = VerticalBarChart()
+    chart.x = 42
+    chart.y = 28
+    chart.width = size - chart.x - 10
+    chart.height = size - chart.y - TITLE_FONT[1] - 14
+    data = [_number(v) for v in values]
+    chart.data = [data]
+    chart.bars[0].fillColor = BAR_COLOR
+    chart.bars[0].strokeColor = None
+    chart.barSpacing = 0
+    chart.groupSpacing = 12
+    chart.valueAxis.valueMin = min(0, *data)
+    chart.valueAxis.rangeRound = "ceiling"  # headroom up to the next tick
+    chart.valueAxis.labels.fontName = LABEL_FONT[0]
+    chart.valueAxis.labels.fontSize = LABEL_FONT[1]
+    chart.valueAxis.visibleGrid = False
+    chart.categoryAxis.categoryNames = list(labels)
+    chart.categoryAxis.labels.fontName = LABEL_FONT[0]
+    chart.categoryAxis.labels.fontSize = LABEL_FONT[1]
+    chart.categoryAxis.labels.dy = -2
+    drawing.add(chart)
+
+    axis_label = Group(String(
+        0, 0, ylabel, fontName=LABEL_FONT[0], fontSize=LABEL_FONT[1] + 1, textAnchor="middle",
+    ))
+    axis_label.rotate(90)
+    axis_label.translate(chart.y + chart.height / 2, -12)
+    drawing.add(axis_label)
+    return drawing
+
+
+def summary_charts(summary, size):
+    """The ``(pie, bar)`` drawings for a dataset summary, ``size`` points square."""
+    return (
+        pie_chart(summary["type_distribution"], size),
+        bar_chart(
+            ["Flowrate", "Pressure", "Temperature"],
+            [summary["avg_flowrate"], summary["avg_pressure"], summary["avg_temperature"]],
+            size,
+        ),
+    )
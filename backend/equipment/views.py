@@ -1,171 +1,398 @@
-import pandas as pd
+import hashlib
+import hmac
+import tempfile
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FileUploadParser, FormParser, MultiPartParser
 from .models import Dataset
 from .serializers import DatasetSerializer
+from .pagination import KeysetPagination, OffsetPagination, RowPagination
+from .queries import filter_datasets
+from .ingest import summarize_csv
+from .parsing import ParseError, UnsupportedFormat, detect_format, strip_compression
+from .uploads import ContentHashUploadHandler, hash_file
 
-from django.http import HttpResponse
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, Image
+from . import (
+    bulk_export, dataset_cache, instrumentation, jobs, ranges, report_cache, retention, row_queries,
+    row_store,
 )
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import inch
-from io import BytesIO
-import matplotlib.pyplot as plt
+from .compare import compare
+from .instrumentation import phase
+from .reports import build_comparison_report, comparison_version, report_version
 
-from .models import Dataset
-from reportlab.platypus import TableStyle
-from reportlab.lib import colors
-from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.decorators import permission_classes
 
-class HistoryView(APIView):
+class SparseFieldsMixin:
+    default_fields = None
+
+    def get_fields(self, request):
+        raw = request.query_params.get('fields')
+        if not raw:
+            return self.default_fields
+        fields = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = set(fields) - set(DatasetSerializer().fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        return fields
+
+
+class HistoryView(SparseFieldsMixin, APIView):
+    @permission_classes([IsAuthenticated])
+    def get(self, request):
+        fields = self.get_fields(request)
+        paginator = KeysetPagination(request)
+
+        key = dataset_cache.history_key(paginator.cursor, paginator.limit, fields)
+        with phase("cache"):
+            page = dataset_cache.get_page(key)
+        if page is None:
+            page = self.build_page(paginator, fields)
+            dataset_cache.set_page(key, page)
+        paginator.next_params = page["next_params"]
+
+        not_modified = get_conditional_response(request, etag=page["etag"])
+        if not_modified is not None:
+            return paginator.add_headers(not_modified)
+
+        response = Response(page["data"])
+        response["ETag"] = page["etag"]
+        return paginator.add_headers(response)
+
+    def build_page(self, paginator, fields):
+        with phase("query"):
+            keys = paginator.page_keys(Dataset.objects.all())
+
+        datasets = Dataset.objects.filter(id__in=[pk for pk, _ in keys])
+        if fields is not None:
+            datasets = datasets.only(*fields)
+        datasets = datasets.order_by('-uploaded_at', '-id')
+
+        with phase("serialize"):
+            data = DatasetSerializer(datasets, many=True, fields=fields).data
+        return history_page(keys, fields, paginator, data)
+
+
+def history_page(keys, fields, paginator, data):
+    """The cached form of a history page."""
+    # datasets are immutable after upload, so the page's keys and the
+    # requested shape identify the response body
+    etag = '"%s"' % hashlib.sha256(
+        repr((keys, fields, paginator.next_cursor)).encode()
+    ).hexdigest()[:32]
+    return {"etag": etag, "next_params": paginator.next_params, "data": list(data)}
+
+class DatasetQueryView(SparseFieldsMixin, APIView):
+    """Datasets filtered and sorted in SQL on the summary columns (see ``queries``)."""
+
+    # the summary JSON is left out unless asked for with ?fields=
+    default_fields = [
+        'id', 'name', 'uploaded_at', 'owner',
+        'row_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature',
+    ]
+
     @permission_classes([IsAuthenticated])
     def get(self, request):
-        datasets = Dataset.objects.order_by('-uploaded_at')[:5]
-        serializer = DatasetSerializer(datasets, many=True)
-        return Response(serializer.data)
+        fields = self.get_fields(request)
+        paginator = OffsetPagination(request)
+
+        with phase("query"):
+            datasets = filter_datasets(Dataset.objects.only(*fields), request.query_params)
+            page = paginator.paginate(datasets)
+
+        with phase("serialize"):
+            serializer = DatasetSerializer(page, many=True, fields=fields)
+            response = Response(serializer.data)
+        return paginator.add_headers(response)
+
+
+class DatasetRowsView(APIView):
+    """Stored rows of one dataset, filtered, sorted and paged (see ``row_queries``)."""
+
+    @permission_classes([IsAuthenticated])
+    def get(self, request, dataset_id):
+        _get_dataset(dataset_id)
+        query = row_queries.parse_query(request.query_params)
+        paginator = RowPagination(request)
+
+        try:
+            with phase("query"):
+                rows, next_cursor = row_queries.find_rows(
+                    dataset_id, query, paginator.limit, paginator.cursor
+                )
+            with phase("serialize"):
+                data = row_queries.fetch_rows(dataset_id, query, rows)
+        except row_store.MissingRows:
+            # uploaded before rows were kept
+            raise Http404("This dataset has no stored rows.")
+
+        paginator.set_next_cursor(next_cursor)
+        return paginator.add_headers(Response(data))
+
+
+def _upload_error(exc, file_format=None):
+    """Body and status for an upload that can't be read."""
+    if isinstance(exc, UnsupportedFormat):
+        return {"error": str(exc)}, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    return {"error": f"Invalid {file_format.upper()}: {exc}"}, status.HTTP_400_BAD_REQUEST
+
 
 class UploadCSVView(APIView):
+    # multipart form uploads, or the file as the raw request body (named by
+    # Content-Disposition, optionally with a Content-Encoding)
+    parser_classes = [MultiPartParser, FormParser, FileUploadParser]
+
     @permission_classes([IsAuthenticated])
     def post(self, request):
+        hasher = ContentHashUploadHandler(request)
+        request.upload_handlers.insert(0, hasher)
+
         file = request.FILES.get('file')
         if not file:
             return Response({"error": "No file uploaded"}, status=400)
 
-        df = pd.read_csv(file)
+        try:
+            file_format, compression = detect_format(
+                file.name, file.content_type, request.headers.get("Content-Encoding")
+            )
+        except UnsupportedFormat as exc:
+            return Response(*_upload_error(exc))
 
-        summary = {
-            "count": len(df),
-            "avg_flowrate": float(df["Flowrate"].mean()),
-            "avg_pressure": float(df["Pressure"].mean()),
-            "avg_temperature": float(df["Temperature"].mean()),
-            "type_distribution": df["Type"].value_counts().to_dict()
-        }
+        with phase("dedupe"):
+            try:
+                # compressed uploads are hashed decompressed (see hash_file)
+                content_hash = (not compression and hasher.digests.get('file')) or hash_file(
+                    file, compression
+                )
+            except ParseError as exc:
+                return Response(*_upload_error(exc, file_format))
+            existing = (
+                Dataset.objects.filter(content_hash=content_hash)
+                .only('summary')
+                .first()
+            )
+        if existing:
+            # identical bytes were already analysed; don't parse or add a row
+            return Response(existing.summary, status=status.HTTP_200_OK)
 
-        dataset = Dataset.objects.create(
-            name=file.name,
-            summary=summary
-        )
+        with row_store.RowWriter() as rows:
+            try:
+                summary = summarize_csv(
+                    file, file_format=file_format, compression=compression, rows=rows
+                )
+            except ParseError as exc:
+                return Response(*_upload_error(exc, file_format))
 
-        # keep only last 5
-        while Dataset.objects.count() > 5:
-            oldest = Dataset.objects.order_by('uploaded_at').first()
-            if oldest:
-                oldest.delete()
-            else:
-                break
+            with phase("db"):
+                dataset = Dataset.objects.create_from_summary(
+                    summary,
+                    name=strip_compression(file.name),
+                    content_hash=content_hash,
+                    owner=request.user if request.user.is_authenticated else None,
+                )
+            with phase("store"):
+                rows.commit(dataset.id)
+
+        with phase("retention"):
+            retention.prune()
 
         return Response(summary, status=status.HTTP_201_CREATED)
 
-@permission_classes([IsAuthenticated])
-def generate_pdf_report(request, dataset_id):  
-    dataset = Dataset.objects.get(id=dataset_id)
-    s = dataset.summary
+def _get_dataset(dataset_id):
+    try:
+        return dataset_cache.get_dataset(dataset_id)
+    except Dataset.DoesNotExist:
+        raise Http404("No Dataset matches the given query.")
+
+
+def _pdf_response(request, dataset, version):
+    response = ranges.file_response(
+        request,
+        report_cache.open_or_build(dataset, version),
+        "application/pdf",
+        etag=f'"{version}"',
+        last_modified=http_date(dataset.uploaded_at.timestamp()),
+    )
+    return _report_headers(response, dataset, version)
 
-    response = HttpResponse(content_type="application/pdf")
+
+def _report_headers(response, dataset, version):
     response["Content-Disposition"] = (
         f'attachment; filename="{dataset.name}_report.pdf"'
     )
+    response["ETag"] = f'"{version}"'
+    response["Last-Modified"] = http_date(dataset.uploaded_at.timestamp())
+    return response
+
+
+def _job_payload(request, job):
+    payload = job.as_dict()
+    payload["status_url"] = request.build_absolute_uri(
+        reverse("report-job", args=[job.id])
+    )
+    if job.status == jobs.DONE:
+        payload["result_url"] = request.build_absolute_uri(
+            reverse("report-job-result", args=[job.id])
+        )
+    return payload
 
-    doc = SimpleDocTemplate(
-        response,
-        pagesize=A4,
-        rightMargin=36,
-        leftMargin=36,
-        topMargin=36,
-        bottomMargin=36
+
+@permission_classes([IsAuthenticated])
+def generate_pdf_report(request, dataset_id):
+    dataset = _get_dataset(dataset_id)
+
+    version = report_version(dataset)
+    not_modified = get_conditional_response(
+        request, etag=f'"{version}"', last_modified=int(dataset.uploaded_at.timestamp())
     )
+    if not_modified is not None:
+        return not_modified
 
-    styles = getSampleStyleSheet()
-    elements = []
+    if request.GET.get("async") in ("1", "true"):
+        job = jobs.submit(dataset, version)
+        payload = _job_payload(request, job)
+        response = JsonResponse(payload, status=202)
+        response["Location"] = payload["status_url"]
+        return response
 
-    # ---------- TITLE ----------
-    elements.append(Paragraph("ChemViz – Analysis Report", styles["Title"]))
-    elements.append(Spacer(1, 12))
+    return _pdf_response(request, dataset, version)
 
-    elements.append(Paragraph(f"<b>Dataset:</b> {dataset.name}", styles["Normal"]))
-    elements.append(Paragraph(f"<b>Uploaded:</b> {dataset.uploaded_at}", styles["Normal"]))
-    elements.append(Spacer(1, 16))
 
-    # ---------- SUMMARY TABLE ----------
-    table_data = [
-        ["Metric", "Value"],
-        ["Samples", s["count"]],
-        ["Avg Flowrate", round(s["avg_flowrate"], 2)],
-        ["Avg Pressure", round(s["avg_pressure"], 2)],
-        ["Avg Temperature", round(s["avg_temperature"], 2)],
-    ]
+@permission_classes([IsAuthenticated])
+def report_job_status(request, job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise Http404("Unknown report job")
+    return JsonResponse(_job_payload(request, job))
 
-    summary_table = Table(table_data, colWidths=[3 * inch, 2 * inch])
-    summary_table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-        ("TOPPADDING", (0, 0), (-1, 0), 8),
-    ]))
-
-    elements.append(summary_table)
-    elements.append(Spacer(1, 24))
-
-    # ---------- PIE CHART ----------
-    pie_buffer = BytesIO()
-    labels = list(s["type_distribution"].keys())
-    values = list(s["type_distribution"].values())
-
-    plt.figure(figsize=(4, 4))
-    plt.pie(values, labels=labels, autopct="%1.1f%%", startangle=140)
-    plt.title("Equipment Type Distribution")
-    plt.tight_layout()
-    plt.savefig(pie_buffer, format="png", dpi=150)
-    plt.close()
-    pie_buffer.seek(0)
-
-    # ---------- BAR CHART ----------
-    bar_buffer = BytesIO()
-    metrics = ["Flowrate", "Pressure", "Temperature"]
-    averages = [
-        s["avg_flowrate"],
-        s["avg_pressure"],
-        s["avg_temperature"],
-    ]
 
-    plt.figure(figsize=(4, 4))
-    plt.bar(metrics, averages, color="#6366f1")
-    plt.title("Average Parameters")
-    plt.ylabel("Value")
-    plt.tight_layout()
-    plt.savefig(bar_buffer, format="png", dpi=150)
-    plt.close()
-    bar_buffer.seek(0)
-
-    # ---------- CHARTS SIDE-BY-SIDE (SINGLE PAGE) ----------
-    elements.append(Paragraph("Visual Analysis", styles["Heading2"]))
-    elements.append(Spacer(1, 12))
-
-    charts_table = Table(
-        [[
-            Image(pie_buffer, width=3.2 * inch, height=3.2 * inch),
-            Image(bar_buffer, width=3.2 * inch, height=3.2 * inch),
-        ]],
-        colWidths=[3.5 * inch, 3.5 * inch]
-    )
+@permission_classes([IsAuthenticated])
+def report_job_result(request, job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise Http404("Unknown report job")
+    if job.status != jobs.DONE:
+        return JsonResponse(_job_payload(request, job), status=409)
+
+    dataset = _get_dataset(job.dataset_id)
+    return _pdf_response(request, dataset, job.version)
+
+
+MAX_COMPARE_DATASETS = 50
+MAX_EXPORT_DATASETS = 100
+DEFAULT_SPOOL_BYTES = 1024 * 1024
 
-    charts_table.setStyle(TableStyle([
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("LEFTPADDING", (0, 0), (-1, -1), 10),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-        ("TOPPADDING", (0, 0), (-1, -1), 10),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 10),
-    ]))
 
-    elements.append(charts_table)
+def _requested_datasets(request, minimum=2, maximum=MAX_COMPARE_DATASETS):
+    """The datasets named by ``?ids=1,2,3``, in that order."""
+    raw = request.GET.get("ids", "")
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise ValidationError({"ids": "Must be a comma-separated list of dataset ids."})
+    if not minimum <= len(ids) <= maximum:
+        raise ValidationError({"ids": f"Give between {minimum} and {maximum} dataset ids."})
 
-    # ---------- BUILD PDF ----------
-    doc.build(elements)
-    return response
\ No newline at end of file
+    datasets = dataset_cache.get_datasets(ids)
+    missing = [pk for pk in ids if pk not in datasets]
+    if missing:
+        raise Http404(f"Unknown dataset(s): {', '.join(map(str, missing))}")
+    return [datasets[pk] for pk in ids]
+
+
+class CompareView(APIView):
+    @permission_classes([IsAuthenticated])
+    def get(self, request):
+        datasets = _requested_datasets(request)
+        return Response(compare(datasets))
+
+
+class CompareReportView(APIView):
+    @permission_classes([IsAuthenticated])
+    def get(self, request):
+        datasets = _requested_datasets(request)
+
+        version = comparison_version(datasets)
+        not_modified = get_conditional_response(request, etag=f'"{version}"')
+        if not_modified is not None:
+            return not_modified
+
+        # spooled to disk past EQUIPMENT_REPORT_SPOOL_BYTES, so many large
+        # reports at once don't all sit in memory while they are sent
+        out = tempfile.SpooledTemporaryFile(
+            max_size=getattr(settings, "EQUIPMENT_REPORT_SPOOL_BYTES", DEFAULT_SPOOL_BYTES)
+        )
+        try:
+            build_comparison_report(compare(datasets), out)
+        except BaseException:
+            out.close()
+            raise
+        response = ranges.file_response(request, out, "application/pdf", etag=f'"{version}"')
+        response["Content-Disposition"] = 'attachment; filename="comparison_report.pdf"'
+        response["ETag"] = f'"{version}"'
+        return response
+
+
+def _zip_response(chunks):
+    response = StreamingHttpResponse(chunks, content_type="application/zip")
+    response["Content-Disposition"] = 'attachment; filename="reports.zip"'
+    return response
+
+
+class ExportReportsView(APIView):
+    """The reports of ``?ids=1,2,3`` in one ZIP archive, streamed (see ``bulk_export``)."""
+
+    @permission_classes([IsAuthenticated])
+    def get(self, request):
+        datasets = _requested_datasets(request, 1, MAX_EXPORT_DATASETS)
+        return _zip_response(bulk_export.iter_zip(datasets))
+
+
+# request.auth of requests that presented EQUIPMENT_METRICS_TOKEN
+METRICS_TOKEN = "metrics-token"
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """``Authorization: Bearer <EQUIPMENT_METRICS_TOKEN>``, for scrapers without a user."""
+
+    def authenticate(self, request):
+        token = getattr(settings, "EQUIPMENT_METRICS_TOKEN", None)
+        scheme, _, given = request.headers.get("Authorization", "").partition(" ")
+        if token and scheme == "Bearer" and hmac.compare_digest(given.encode(), token.encode()):
+            return AnonymousUser(), METRICS_TOKEN
+        return None  # not the metrics token; try a JWT
+
+    def authenticate_header(self, request):
+        # DRF answers 401 rather than 403 only if the first class names a scheme
+        return JWTAuthentication().authenticate_header(request)
+
+
+class CanReadMetrics(BasePermission):
+    def has_permission(self, request, view):
+        return request.auth == METRICS_TOKEN or bool(request.user and request.user.is_staff)
+
+
+class MetricsView(APIView):
+    """Request and phase latency histograms in the Prometheus text format, for staff."""
+
+    authentication_classes = [MetricsTokenAuthentication, JWTAuthentication]
+    permission_classes = [CanReadMetrics]
+
+    def get(self, request):
+        if not instrumentation.is_enabled():
+            raise Http404("Instrumentation is disabled")
+        return HttpResponse(
+            instrumentation.registry.render(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -0,0 +1,393 @@
+"""
+HTTP client for the ChemViz backend.
+
+One ``ApiClient`` is shared by every call the desktop app makes. It keeps a
+``requests.Session``, so connections to the server stay open and are reused
+instead of being set up for every request. It also adds:
+
+* default connect/read timeouts on every request;
+* bounded retries with exponential backoff for connection failures and
+  502/503/504 responses;
+* the JWT access token on every request, refreshed through
+  ``/api/token/refresh/`` and the request replayed once when it expires;
+* gzip/deflate response decoding (``requests`` does the decoding);
+* with a ``DiskCache``, conditional requests for the history and reports,
+  and the cached copies when the server can't be reached.
+
+The client is safe to share between worker threads.
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE = "http://127.0.0.1:8000/api"
+
+DEFAULT_TIMEOUT = (3.05, 15)  # connect, read
+CHUNK_SIZE = 64 * 1024
+RESUME_ATTEMPTS = 3  # per download, after the connection drops mid-body
+
+# Already compressed (or compressed internally); sent as they are
+PACKED_EXTENSIONS = (".gz", ".zst", ".parquet", ".arrow", ".feather")
+GZIP_LEVEL = 6
+
+
+class MultipartFile:
+    """
+    A ``multipart/form-data`` body holding one file, read lazily.
+
+    ``requests`` streams objects with ``read()`` and ``__len__`` instead of
+    buffering them. ``on_progress(sent, total)`` is called after every read;
+    raising from it aborts the upload.
+    """
+
+    def __init__(self, field, path, content_type="text/csv", on_progress=None, filename=None):
+        self.on_progress = on_progress
+        self.boundary = uuid.uuid4().hex
+        self.file = open(path, "rb")
+        self.file_size = os.path.getsize(path)
+        name = (filename or os.path.basename(path)).replace('"', "")
+
+        self.head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.sent = 0
+        self.parts = [self.head, None, self.tail]
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self.head) + self.file_size + len(self.tail)
+
+    def read(self, size=-1):
+        size = CHUNK_SIZE if size is None or size < 0 else size
+
+        while self.parts:
+            part = self.parts[0]
+            if part is None:
+                data = self.file.read(size)
+                if data:
+                    break
+                self.parts.pop(0)
+                continue
+            data, rest = part[:size], part[size:]
+            if rest:
+                self.parts[0] = rest
+            else:
+                self.parts.pop(0)
+            break
+        else:
+            data = b""
+
+        self.sent += len(data)
+        if self.on_progress:
+            self.on_progress(self.sent, len(self))
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class ApiClient:
+    def __init__(self, base_url=API_BASE, timeout=DEFAULT_TIMEOUT, retries=3,
+                 backoff_factor=0.3, pool_size=8, cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = cache
+        self.access_token = None
+        self.refresh_token = None
+        self._refresh_lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def close(self):
+        self.session.close()
+
+    # --- Auth ---
+
+    def login(self, username, password):
+        res = self.session.post(
+            self.url("/token/"),
+            json={"username": username, "password": password},
+            timeout=self.timeout,
+        )
+        if res.status_code == 200:
+            tokens = res.json()
+            self.access_token = tokens["access"]
+            self.refresh_token = tokens.get("refresh")
+        return res
+
+    def refresh(self, stale_token):
+        """
+        Swap ``stale_token`` for a fresh access token. Returns False when
+        there is no way to refresh. Concurrent callers holding the same
+        stale token share a single refresh.
+        """
+        with self._refresh_lock:
+            if self.access_token != stale_token:
+                return True  # another thread already refreshed
+            if not self.refresh_token:
+                return False
+
+            res = self.session.post(
+                self.url("/token/refresh/"),
+                json={"refresh": self.refresh_token},
+                timeout=self.timeout,
+            )
+            if res.status_code != 200:
+                return False
+            tokens = res.json()
+            self.access_token = tokens["access"]
+            self.refresh_token = tokens.get("refresh", self.refresh_token)
+            return True
+
+    # --- Requests ---
+
+    def request(self, method, path, body=None, headers=None, **kwargs):
+        """
+        Send a request with auth and default timeouts. ``body`` may be a
+        callable that builds a fresh request body, so the request can be
+        replayed after a token refresh.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(2):
+            token = self.access_token
+            request_headers = dict(headers or {})
+            if token:
+                request_headers["Authorization"] = f"Bearer {token}"
+
+            data = body() if callable(body) else body
+            if isinstance(data, MultipartFile):
+                request_headers["Content-Type"] = data.content_type
+            try:
+                res = self.session.request(
+                    method, self.url(path), data=data, headers=request_headers, **kwargs
+                )
+            finally:
+                if hasattr(data, "close"):
+                    data.close()
+
+            if res.status_code == 401 and attempt == 0 and self.refresh(token):
+                res.close()
+                continue
+            return res
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    # --- Endpoints ---
+
+    def cached_history(self):
+        """The last history the server sent, without touching the network."""
+        entry = self.cache.history() if self.cache else None
+        if entry is None:
+            return None
+        try:
+            return json.loads(entry.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def history(self):
+        """
+        The dataset history. A cached copy is revalidated with its ETag and
+        reused on 304. Raises ``requests.RequestException`` on failure.
+        """
+        entry = self.cache.history() if self.cache else None
+        headers = {"If-None-Match": entry.etag} if entry else None
+        res = self.get("/history/", headers=headers)
+
+        if res.status_code == 304 and entry:
+            try:
+                return json.loads(entry.read_bytes())
+            except (OSError, ValueError):
+                # evicted or damaged since the lookup; fetch it whole
+                res = self.get("/history/")
+
+        res.raise_for_status()
+        if self.cache:
+            self.cache.put_history(res.headers.get("ETag"), res.content)
+        return res.json()
+
+    def upload(self, path, on_progress=None, compress=True):
+        """
+        Upload a dataset file. Plain CSV is gzipped first (the server
+        decompresses by extension, names the dataset without the ``.gz``
+        and hashes it decompressed, so it still dedups against the raw
+        file). Compressed and columnar files go as-is.
+
+        When compressing, the first half of the ``on_progress`` range is
+        the compression and the second half the upload; raising from it
+        aborts either.
+        """
+        if not compress or path.lower().endswith(PACKED_EXTENSIONS):
+            return self.post(
+                "/upload/",
+                body=lambda: MultipartFile("file", path, on_progress=on_progress),
+            )
+
+        def sending(sent, total):
+            on_progress(total + sent, 2 * total)
+
+        fd, packed = tempfile.mkstemp(suffix=".csv.gz")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                self._gzip(path, out, on_progress)
+
+            name = os.path.basename(path) + ".gz"
+            return self.post(
+                "/upload/",
+                body=lambda: MultipartFile(
+                    "file", packed, content_type="application/gzip",
+                    on_progress=sending if on_progress else None, filename=name,
+                ),
+            )
+        finally:
+            os.remove(packed)
+
+    def _gzip(self, path, out, on_progress):
+        total = 2 * os.path.getsize(path)
+        done = 0
+        with open(path, "rb") as src:
+            # fixed mtime and no name in the header: the same CSV always
+            # gives the same bytes
+            with gzip.GzipFile(filename="", mode="wb", fileobj=out,
+                               compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                while block := src.read(CHUNK_SIZE):
+                    gz.write(block)
+                    done += len(block)
+                    if on_progress:
+                        on_progress(done, total)
+
+    def _stream(self, response, f, on_progress, path=None):
+        """
+        Write the body of ``response`` to ``f``. Given the request ``path``,
+        a body cut off by a dropped connection is resumed with a ``Range``
+        request, if the server takes ranges and sent an ETag for
+        ``If-Range``. A 200 to that request means the file changed on the
+        server, so ``f`` is emptied and the new version written instead.
+        """
+        total = int(response.headers.get("Content-Length") or 0)
+        etag = response.headers.get("ETag")
+        resumable = (
+            path is not None and etag is not None
+            and response.headers.get("Accept-Ranges") == "bytes"
+        )
+        done = 0
+        resumed = None
+        try:
+            for attempt in range(RESUME_ATTEMPTS + 1):
+                try:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        done += len(chunk)
+                        if on_progress:
+                            on_progress(done, total)
+                    return
+                except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                    if not resumable or attempt == RESUME_ATTEMPTS:
+                        raise
+
+                if resumed is not None:
+                    resumed.close()
+                resumed = response = self.get(
+                    path, stream=True, headers={"Range": f"bytes={done}-", "If-Range": etag},
+                )
+                if response.status_code == 200:
+                    f.seek(0)
+                    f.truncate()
+                    done = 0
+                    total = int(response.headers.get("Content-Length") or 0)
+                elif response.status_code != 206:
+                    response.raise_for_status()
+                    raise requests.HTTPError(
+                        f"Unexpected {response.status_code} resuming {path}", response=response
+                    )
+        finally:
+            if resumed is not None:
+                resumed.close()
+
+    def _save(self, response, file_path, on_progress, path=None):
+        partial = file_path + ".part"
+        try:
+            with open(partial, "wb") as f:
+                self._stream(response, f, on_progress, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        os.replace(partial, file_path)
+
+    def download(self, path, file_path, on_progress=None):
+        """Stream ``path`` into ``file_path``; returns the HTTP status code."""
+        with self.get(path, stream=True) as response:
+            if response.status_code != 200:
+                return response.status_code
+            self._save(response, file_path, on_progress, path)
+        return 200
+
+    def download_report(self, dataset_id, file_path, on_progress=None):
+        """
+        Save the PDF report of ``dataset_id`` to ``file_path``; returns the
+        HTTP status code. The PDF is kept in the cache, revalidated with its
+        ETag, and served from there when the server can't be reached.
+        """
+        path = f"/report/{dataset_id}/"
+        if self.cache is None:
+            return self.download(path, file_path, on_progress)
+
+        entry = self.cache.report(dataset_id)
+        headers = {"If-None-Match": entry.etag} if entry else None
+        try:
+            with self.get(path, stream=True, headers=headers) as response:
+                if response.status_code == 200:
+                    entry = self.cache.put_report(
+                        dataset_id, response.headers.get("ETag"),
+                        lambda f: self._stream(response, f, on_progress, path),
+                    )
+                    if entry is None:
+                        # no usable ETag, so nothing to revalidate later
+                        self._save(response, file_path, on_progress, path)
+                        return 200
+                elif response.status_code != 304 or entry is None:
+                    return response.status_code
+        except (requests.ConnectionError, requests.Timeout):
+            if entry is None:
+                raise
+            # offline: hand out the last copy we saw
+
+        shutil.copyfile(entry.path, file_path)
+        return 200
@@ -0,0 +1,65 @@
+"""
+Round-trip latency of history and upload calls against a running backend,
+comparing one-off ``requests`` calls with the pooled ``ApiClient``.
+
+    python bench_client.py --username admin --password secret ../sample_equipment_data.csv
+
+Start the backend first (``python manage.py runserver``). Every upload
+of the same file after the first is answered from the content-hash
+dedup, so upload numbers mostly measure transport.
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+from api_client import API_BASE, ApiClient
+
+
+def timed(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        res = fn()
+        samples.append(time.perf_counter() - start)
+        res.close()
+    return statistics.median(samples) * 1000, max(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("csv", help="CSV file to upload")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--base-url", default=API_BASE)
+    parser.add_argument("-n", type=int, default=50)
+    args = parser.parse_args()
+
+    client = ApiClient(args.base_url)
+    if client.login(args.username, args.password).status_code != 200:
+        raise SystemExit("login failed")
+    headers = {"Authorization": f"Bearer {client.access_token}"}
+
+    def plain_history():
+        return requests.get(f"{args.base_url}/history/", headers=headers, timeout=5)
+
+    def plain_upload():
+        with open(args.csv, "rb") as f:
+            return requests.post(
+                f"{args.base_url}/upload/", files={"file": f}, headers=headers, timeout=15
+            )
+
+    print(f"{'call':<28}{'p50':>10}{'max':>10}")
+    for name, fn in (
+        ("history  requests.get", plain_history),
+        ("history  ApiClient", client.history),
+        ("upload   requests.post", plain_upload),
+        ("upload   ApiClient", lambda: client.upload(args.csv)),
+    ):
+        p50, worst = timed(fn, args.n)
+        print(f"{name:<28}{p50:>8.1f}ms{worst:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Timing harness for switching the dashboard between datasets.
+
+    python bench_dashboard.py            # add QT_QPA_PLATFORM=offscreen when headless
+
+Cycles through synthetic summaries and times each switch including the
+canvas repaint. The first mode rebuilds the stat boxes, Figure and
+canvas each time, as update_dashboard used to. The other modes update
+the persistent Dashboard in place. One forces the repaint, and one
+measures only the update, with the repaint left to draw_idle.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from PyQt6.QtWidgets import QApplication, QGridLayout, QVBoxLayout, QWidget
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from dashboard import Dashboard, ModernStatBox
+from main import STYLESHEET
+
+TYPES = ["Pump", "Compressor", "Valve", "HeatExchanger", "Reactor", "Tank"]
+
+
+def make_summaries(n, seed=0):
+    rng = random.Random(seed)
+    summaries = []
+    for _ in range(n):
+        types = TYPES[: rng.randint(3, len(TYPES))]
+        dist = {t: rng.randint(1, 40) for t in types}
+        summaries.append({
+            "count": sum(dist.values()),
+            "avg_flowrate": rng.uniform(40, 160),
+            "avg_pressure": rng.uniform(2, 12),
+            "avg_temperature": rng.uniform(80, 400),
+            "type_distribution": dist,
+        })
+    return summaries
+
+
+class RebuildingPanel(QWidget):
+    """The old behaviour: tear everything down and build it again."""
+
+    def __init__(self):
+        super().__init__()
+        self.layout_ = QVBoxLayout(self)
+        self.canvas = None
+
+    def show_summary(self, data):
+        while self.layout_.count():
+            item = self.layout_.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+            elif item.layout():
+                while item.layout().count():
+                    child = item.layout().takeAt(0)
+                    child.widget().deleteLater()
+
+        stats_grid = QGridLayout()
+        stats_grid.addWidget(ModernStatBox("Samples", f"{data['count']}"), 0, 0)
+        stats_grid.addWidget(ModernStatBox("Flowrate", f"{data['avg_flowrate']:.1f}"), 0, 1)
+        stats_grid.addWidget(ModernStatBox("Pressure", f"{data['avg_pressure']:.1f}"), 0, 2)
+        stats_grid.addWidget(ModernStatBox("Temperature", f"{data['avg_temperature']:.1f}"), 0, 3)
+        self.layout_.addLayout(stats_grid)
+
+        figure = Figure(figsize=(10, 5), facecolor='white', tight_layout=True)
+        self.canvas = FigureCanvas(figure)
+        self.layout_.addWidget(self.canvas)
+        ax1 = figure.add_subplot(121)
+        dist = data["type_distribution"]
+        ax1.pie(dist.values(), labels=dist.keys(), autopct="%1.1f%%", startangle=140)
+        ax2 = figure.add_subplot(122)
+        bars = ax2.bar(['Flow', 'Press', 'Temp'],
+                       [data['avg_flowrate'], data['avg_pressure'], data['avg_temperature']])
+        for bar in bars:
+            ax2.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 1,
+                     f'{bar.get_height():.1f}', ha='center', va='bottom', fontsize=8)
+        self.canvas.draw()
+
+
+class PersistentPanel(Dashboard):
+    def show_summary(self, data):
+        self.update_summary(data)
+        # force the repaint draw_idle would schedule, so it is timed too
+        self.canvas.draw()
+
+
+class PersistentPanelNoRepaint(Dashboard):
+    """What a switch costs the event handler; draw_idle repaints later, once."""
+
+    def show_summary(self, data):
+        self.update_summary(data)
+
+
+def run(app, panel, summaries):
+    panel.resize(1100, 650)
+    panel.show()
+    panel.show_summary(summaries[0])
+    app.processEvents()
+
+    samples = []
+    for data in summaries[1:]:
+        start = time.perf_counter()
+        panel.show_summary(data)
+        app.processEvents()
+        samples.append(time.perf_counter() - start)
+    panel.close()
+    return statistics.median(samples) * 1000, max(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", type=int, default=40, help="number of switches")
+    args = parser.parse_args()
+
+    app = QApplication([])
+    app.setStyleSheet(STYLESHEET)
+    summaries = make_summaries(args.n + 1)
+
+    print(f"{'dashboard':<26}{'p50':>10}{'max':>10}")
+    for name, panel in (("rebuild every switch", RebuildingPanel()),
+                        ("persistent + repaint", PersistentPanel()),
+                        ("persistent, update only", PersistentPanelNoRepaint())):
+        p50, worst = run(app, panel, summaries)
+        print(f"{name:<26}{p50:>8.1f}ms{worst:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
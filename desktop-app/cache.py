@@ -0,0 +1,150 @@
+"""
+Local on-disk cache of server responses.
+
+The history listing and report PDFs are kept together with the ETag the
+server sent for them, so the app can paint the last known history at
+startup, revalidate with ``If-None-Match`` instead of downloading again,
+and keep working from the cache while the backend is unreachable.
+
+Entries are plain files named after what they hold and their ETag:
+
+    history-<etag>.json
+    report-<dataset id>-<etag>.pdf
+
+Only the newest history and the newest report per dataset are kept. The
+directory is capped at ``max_bytes``; reads refresh a file's mtime and the
+least recently used files are evicted first.
+"""
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 200 * 2**20
+
+# the server's ETags are quoted hex digests; anything else is not cached
+_TAG = re.compile(r'^(?:W/)?"([0-9A-Za-z_-]{1,64})"$')
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "chemviz")
+
+
+def etag_tag(etag):
+    """The filename-safe part of a server ETag, or None."""
+    match = _TAG.match((etag or "").strip())
+    return match.group(1) if match else None
+
+
+def tag_etag(tag):
+    return f'"{tag}"'
+
+
+class CacheEntry:
+    def __init__(self, path, etag):
+        self.path = path
+        self.etag = etag
+
+    def read_bytes(self):
+        return self.path.read_bytes()
+
+
+class DiskCache:
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root or default_cache_dir())
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    # --- Lookup ---
+
+    def _latest(self, prefix, suffix):
+        newest = None
+        for path in self.root.glob(f"{prefix}*{suffix}"):
+            tag = path.name[len(prefix):-len(suffix)]
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if newest is None or mtime > newest[0]:
+                newest = (mtime, path, tag)
+        if newest is None:
+            return None
+
+        _, path, tag = newest
+        try:
+            os.utime(path)  # LRU touch
+        except FileNotFoundError:
+            return None
+        return CacheEntry(path, tag_etag(tag))
+
+    def history(self):
+        return self._latest("history-", ".json")
+
+    def report(self, dataset_id):
+        return self._latest(f"report-{dataset_id}-", ".pdf")
+
+    # --- Storage ---
+
+    def _put(self, prefix, suffix, etag, write):
+        """
+        Store the bytes produced by ``write(fileobj)`` as the only entry
+        under ``prefix``. Returns the entry, or None if ``etag`` can't be
+        used to revalidate it.
+        """
+        tag = etag_tag(etag)
+        if tag is None:
+            return None
+        path = self.root / f"{prefix}{tag}{suffix}"
+
+        # write next to the target and rename, so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        for old in self.root.glob(f"{prefix}*{suffix}"):
+            if old != path:
+                self._unlink(old)  # superseded by the new ETag
+        self.evict(keep=path)
+        return CacheEntry(path, tag_etag(tag))
+
+    def put_history(self, etag, body):
+        return self._put("history-", ".json", etag, lambda f: f.write(body))
+
+    def put_report(self, dataset_id, etag, write):
+        return self._put(f"report-{dataset_id}-", ".pdf", etag, write)
+
+    # --- Eviction ---
+
+    def _unlink(self, path):
+        try:
+            path.unlink(missing_ok=True)
+            return True
+        except OSError:
+            return False  # still open on platforms that lock it
+
+    def evict(self, keep=None):
+        with self._lock:
+            entries = []
+            for path in self.root.iterdir():
+                if path.suffix not in (".json", ".pdf"):
+                    continue
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path != keep and self._unlink(path):
+                    total -= size
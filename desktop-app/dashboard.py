@@ -0,0 +1,178 @@
+"""
+The analysis results panel.
+
+The panel's widgets, figure, canvas and chart artists are created once.
+Showing another dataset only changes bar heights, wedge angles and label
+text, then asks for a ``draw_idle``, so rapid switching and resizes collapse
+into a single repaint. The pie is rebuilt only when the number of equipment
+types changes.
+"""
+import math
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (
+    QFrame, QGridLayout, QHBoxLayout, QLabel, QPushButton, QSizePolicy,
+    QVBoxLayout, QWidget
+)
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+PIE_COLORS = ["#6366f1", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6"]
+BAR_COLOR = "#818cf8"
+TITLE_STYLE = {"fontsize": 10, "fontweight": "bold", "color": "#475569"}
+
+PIE_START_ANGLE = 140
+LABEL_DISTANCE = 1.1
+PCT_DISTANCE = 0.6
+
+STATS = [
+    ("Samples", "count", "{:.0f}"),
+    ("Flowrate", "avg_flowrate", "{:.1f}"),
+    ("Pressure", "avg_pressure", "{:.1f}"),
+    ("Temperature", "avg_temperature", "{:.1f}"),
+]
+
+
+class ModernStatBox(QFrame):
+    def __init__(self, label, value="--"):
+        super().__init__()
+        self.setObjectName("StatBox")
+        self.setFixedHeight(90)
+        layout = QVBoxLayout(self)
+        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.lbl = QLabel(label.upper())
+        self.lbl.setObjectName("StatLabel")
+        self.lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.val = QLabel(str(value))
+        self.val.setObjectName("StatValue")
+        self.val.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        layout.addWidget(self.lbl)
+        layout.addWidget(self.val)
+
+    def set_value(self, value):
+        self.val.setText(str(value))
+
+
+class Dashboard(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(20)
+
+        # Header with Download
+        header = QHBoxLayout()
+        title = QLabel("Analysis Results")
+        title.setStyleSheet("font-size: 18px; font-weight: 800; color: #1e293b;")
+        header.addWidget(title)
+        header.addStretch()
+
+        self.download_btn = QPushButton("Download Report")
+        self.download_btn.setObjectName("SecondaryBtn")
+        self.download_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        header.addWidget(self.download_btn)
+        layout.addLayout(header)
+
+        # Stats Row
+        stats_grid = QGridLayout()
+        stats_grid.setSpacing(20)
+        self.stat_boxes = {}
+        for column, (label, key, _) in enumerate(STATS):
+            self.stat_boxes[key] = ModernStatBox(label)
+            stats_grid.addWidget(self.stat_boxes[key], 0, column)
+        layout.addLayout(stats_grid)
+
+        # Charts Area; fixed margins instead of tight_layout, which would
+        # re-measure every text artist on each redraw
+        self.figure = Figure(figsize=(10, 5), facecolor='white')
+        self.figure.subplots_adjust(left=0.04, right=0.97, top=0.9, bottom=0.1, wspace=0.25)
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        layout.addWidget(self.canvas)
+
+        self.pie_ax = self.figure.add_subplot(121)
+        self.pie_ax.set_title("Equipment Distribution", **TITLE_STYLE)
+        self.pie_ax.set_aspect("equal")
+        self.pie_ax.set_xlim(-1.4, 1.4)
+        self.pie_ax.set_ylim(-1.25, 1.25)
+        self.pie_ax.set_axis_off()
+        self.wedges, self.pie_labels, self.pie_pcts = [], [], []
+
+        self.bar_ax = self.figure.add_subplot(122)
+        self.bar_ax.set_title("PERFORMANCE AVERAGE", **TITLE_STYLE)
+        self.bars = self.bar_ax.bar(['Flow', 'Press', 'Temp'], [0, 0, 0], color=BAR_COLOR, width=0.5)
+        self.bar_labels = [
+            self.bar_ax.text(bar.get_x() + bar.get_width() / 2, 0, "", ha='center',
+                             va='bottom', fontsize=8, color='#64748b')
+            for bar in self.bars
+        ]
+        self.bar_ax.spines['top'].set_visible(False)
+        self.bar_ax.spines['right'].set_visible(False)
+        self.bar_ax.yaxis.grid(True, linestyle='-', alpha=0.15)
+
+    def update_summary(self, data):
+        for label, key, fmt in STATS:
+            self.stat_boxes[key].set_value(fmt.format(data.get(key, 0)))
+
+        self._update_pie(data.get("type_distribution", {}))
+        self._update_bars([
+            data.get('avg_flowrate', 0),
+            data.get('avg_pressure', 0),
+            data.get('avg_temperature', 0),
+        ])
+        self.canvas.draw_idle()
+
+    def _rebuild_pie(self, count):
+        for artist in self.wedges + self.pie_labels + self.pie_pcts:
+            artist.remove()
+        self.wedges, self.pie_labels, self.pie_pcts = [], [], []
+        if not count:
+            return
+
+        self.wedges, self.pie_labels, self.pie_pcts = self.pie_ax.pie(
+            [1] * count, labels=[""] * count, autopct="%1.1f%%",
+            startangle=PIE_START_ANGLE, colors=PIE_COLORS,
+            wedgeprops={'edgecolor': 'white', 'linewidth': 1.5},
+            labeldistance=LABEL_DISTANCE, pctdistance=PCT_DISTANCE,
+        )
+        # pie() resets these on the axes
+        self.pie_ax.set_xlim(-1.4, 1.4)
+        self.pie_ax.set_ylim(-1.25, 1.25)
+
+    def _update_pie(self, dist):
+        if len(dist) != len(self.wedges):
+            self._rebuild_pie(len(dist))
+
+        total = float(sum(dist.values())) or 1.0
+        theta = PIE_START_ANGLE
+        for wedge, label, pct, (name, value) in zip(
+            self.wedges, self.pie_labels, self.pie_pcts, dist.items()
+        ):
+            span = 360.0 * value / total
+            wedge.set_theta1(theta)
+            wedge.set_theta2(theta + span)
+
+            mid = math.radians(theta + span / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            label.set_position((LABEL_DISTANCE * x, LABEL_DISTANCE * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            label.set_text(name)
+            pct.set_position((PCT_DISTANCE * x, PCT_DISTANCE * y))
+            pct.set_text(f"{100.0 * value / total:.1f}%")
+            theta += span
+
+    def _update_bars(self, values):
+        for bar, label, value in zip(self.bars, self.bar_labels, values):
+            bar.set_height(value)
+            # past the end of the bar, below it for negative averages
+            label.set_y(value + 1 if value >= 0 else value - 1)
+            label.set_verticalalignment('bottom' if value >= 0 else 'top')
+            label.set_text(f'{value:.1f}')
+        top = max(values + [0])
+        bottom = min(values + [0])
+        if top == bottom:
+            top = 1  # all zero
+        self.bar_ax.set_ylim(bottom * 1.15, top * 1.15)
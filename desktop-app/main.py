@@ -1,18 +1,36 @@
 import sys
-import requests
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QFileDialog, QMessageBox, QComboBox, QFrame, QGridLayout,
+    QPushButton, QFileDialog, QMessageBox, QComboBox, QFrame,
     QSizePolicy
 )
-from PyQt6.QtCore import Qt
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from PyQt6.QtCore import Qt, QThreadPool
 
 from PyQt6.QtWidgets import QLineEdit
 from PyQt6.QtWidgets import QDialog
 
-API_BASE = "http://127.0.0.1:8000/api"
+from api_client import ApiClient
+from cache import DiskCache
+from dashboard import Dashboard
+from workers import Worker
+
+
+# --- Network calls (run on worker threads, never on the GUI thread) ---
+
+def request_token(worker, client, username, password):
+    return client.login(username, password)
+
+
+def get_history(worker, client):
+    return client.history()
+
+
+def upload_csv(worker, client, path):
+    return client.upload(path, on_progress=worker.checkpoint)
+
+
+def download_report(worker, client, dataset_id, file_path):
+    return client.download_report(dataset_id, file_path, on_progress=worker.checkpoint)
 
 # --- Styling Config ---
 STYLESHEET = """
@@ -141,26 +159,6 @@ QPushButton#SecondaryBtn:hover {
 }
 """
 
-class ModernStatBox(QFrame):
-    def __init__(self, label, value="--"):
-        super().__init__()
-        self.setObjectName("StatBox")
-        self.setFixedHeight(90)
-        layout = QVBoxLayout(self)
-        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        
-        self.lbl = QLabel(label.upper())
-        self.lbl.setObjectName("StatLabel")
-        self.lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        
-        self.val = QLabel(str(value))
-        self.val.setObjectName("StatValue")
-        self.val.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        
-        layout.addWidget(self.lbl)
-        layout.addWidget(self.val)
-
-
 class LoginDialog(QDialog):
     def __init__(self):
         super().__init__()
@@ -192,12 +190,18 @@ class LoginDialog(QDialog):
         self.login_btn.clicked.connect(self.login)
         layout.addWidget(self.login_btn)
 
+        self.offline_btn = QPushButton("Continue Offline")
+        self.offline_btn.setObjectName("SecondaryBtn")
+        self.offline_btn.clicked.connect(self.accept)
+        self.offline_btn.setVisible(False)
+        layout.addWidget(self.offline_btn)
+
         self.status = QLabel("")
         self.status.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.status.setStyleSheet("color: red;")
         layout.addWidget(self.status)
 
-        self.token = None
+        self.client = ApiClient(cache=DiskCache())
         self.loading = False
 
 
@@ -241,35 +245,33 @@ class LoginDialog(QDialog):
             return
 
         self.set_loading(True)
-        QApplication.processEvents()  # force UI repaint
-
-        try:
-            res = requests.post(
-                "http://127.0.0.1:8000/api/token/",
-                json={
-                    "username": self.username.text(),
-                    "password": self.password.text()
-                },
-                timeout=5
-            )
-
-            if res.status_code == 200:
-                self.token = res.json()["access"]
-                self.accept()   # ✅ CORRECT WAY
-                return
-            else:
-                self.status.setText("Invalid credentials")
-
-        except Exception:
-            self.status.setText("Server unavailable")
 
+        self.worker = Worker(request_token, self.client, self.username.text(), self.password.text())
+        self.worker.signals.finished.connect(self.on_login_response)
+        self.worker.signals.failed.connect(self.on_login_failed)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def on_login_response(self, res):
+        if res.status_code == 200:
+            self.accept()   # ✅ CORRECT WAY
+            return
+
+        self.status.setText("Invalid credentials")
+        self.set_loading(False)
+
+    def on_login_failed(self, error):
+        self.status.setText("Server unavailable")
         self.set_loading(False)
+        if self.client.cached_history():
+            # past datasets can still be browsed from the local cache
+            self.setFixedSize(350, 275)
+            self.offline_btn.setVisible(True)
 
 
 class ChemVizDesktop(QWidget):
-    def __init__(self, token):
+    def __init__(self, client):
         super().__init__()
-        self.token = token
+        self.client = client
         self.setWindowTitle("ChemViz Pro")
         self.setMinimumSize(1100, 800)
         self.setStyleSheet(STYLESHEET)
@@ -278,18 +280,39 @@ class ChemVizDesktop(QWidget):
         self.history = []
         self.current_file_path = None
         self.current_dataset_id = None
+        self.history_worker = None
+        self.upload_worker = None
+        self.download_worker = None
+        self.dashboard = None
         
         self.init_ui()
+        # paint the last known history right away, then revalidate it
+        self.show_history(self.client.cached_history() or [])
         self.fetch_history()
 
-    def auth_headers(self):
-        return {
-            "Authorization": f"Bearer {self.token}"
-        }
-    
     def logout(self):
         self.close()
 
+    def start_worker(self, worker):
+        QThreadPool.globalInstance().start(worker)
+        return worker
+
+    def transfers(self):
+        return [w for w in (self.upload_worker, self.download_worker) if w]
+
+    def update_cancel_button(self):
+        self.cancel_btn.setVisible(bool(self.transfers()))
+
+    def cancel_transfers(self):
+        for worker in self.transfers():
+            worker.cancel()
+
+    def closeEvent(self, event):
+        self.cancel_transfers()
+        if self.history_worker:
+            self.history_worker.cancel()
+        super().closeEvent(event)
+
 
     def init_ui(self):
         main_layout = QVBoxLayout(self)
@@ -346,6 +369,13 @@ class ChemVizDesktop(QWidget):
 
         control_layout.addStretch()
 
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setObjectName("SecondaryBtn")
+        self.cancel_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.cancel_btn.clicked.connect(self.cancel_transfers)
+        self.cancel_btn.setVisible(False)
+        control_layout.addWidget(self.cancel_btn)
+
         self.upload_btn = QPushButton("Analyze Dataset")
         self.upload_btn.setObjectName("PrimaryBtn")
         self.upload_btn.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -371,23 +401,43 @@ class ChemVizDesktop(QWidget):
         main_layout.addWidget(self.res_card)
 
     def fetch_history(self):
-        try:
-            res = requests.get(
-                f"{API_BASE}/history/",
-                headers=self.auth_headers(),
-                timeout=5
-            )
-
-            if res.status_code == 200:
-                self.history = res.json()
-                self.history_dropdown.clear()
-                self.history_dropdown.addItem("Select Past Dataset")
-                for item in self.history:
-                    self.history_dropdown.addItem(item["name"])
-        except Exception: pass
+        if self.history_worker:
+            self.history_worker.cancel()
+        self.history_worker = Worker(get_history, self.client)
+        self.history_worker.signals.finished.connect(self.on_history_loaded)
+        self.history_worker.signals.failed.connect(self.on_history_failed)
+        self.start_worker(self.history_worker)
+
+    def on_history_failed(self, error):
+        if self.history_worker and self.sender() is self.history_worker.signals:
+            self.history_worker = None
+            self.set_offline(True)
+
+    def on_history_loaded(self, history):
+        if self.history_worker is None or self.sender() is not self.history_worker.signals:
+            return  # superseded by a newer fetch
+        self.history_worker = None
+        self.set_offline(False)
+        self.show_history(history)
+
+    def set_offline(self, offline):
+        title = "ChemViz Pro"
+        self.setWindowTitle(f"{title} (offline)" if offline else title)
+
+    def show_history(self, history):
+        if history == self.history:
+            return  # unchanged (e.g. revalidated from the cache)
+        self.history = history
+        self.history_dropdown.clear()
+        self.history_dropdown.addItem("Select Past Dataset")
+        for item in self.history:
+            self.history_dropdown.addItem(item["name"])
 
     def select_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select CSV", "", "CSV Files (*.csv)")
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Select Dataset", "",
+            "Datasets (*.csv *.csv.gz *.csv.zst *.parquet *.arrow *.feather);;CSV Files (*.csv)"
+        )
         if file_path:
             self.current_file_path = file_path
             self.file_lbl.setText(file_path.split("/")[-1])
@@ -400,32 +450,45 @@ class ChemVizDesktop(QWidget):
 
         self.upload_btn.setText("Analyzing...")
         self.upload_btn.setEnabled(False)
-        QApplication.processEvents()
-
-        try:
-            with open(self.current_file_path, "rb") as f:
-                response = requests.post(
-                    f"{API_BASE}/upload/",
-                    files={"file": f},
-                    headers=self.auth_headers(),
-                    timeout=15
-                )
-            
-            if response.status_code in [200, 201]:
-                res_json = response.json()
-                self.current_dataset_id = res_json.get("id")
-                self.data = res_json.get("summary", res_json)
-                
-                self.update_dashboard()
-                self.fetch_history()
-                self.upload_btn.setText("Analyze")
-            else:
-                self.upload_btn.setText("Analyze Dataset")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed: {str(e)}")
-            self.upload_btn.setText("Analyze Dataset")
-        finally:
-            self.upload_btn.setEnabled(True)
+
+        self.upload_worker = Worker(upload_csv, self.client, self.current_file_path)
+        self.upload_worker.signals.progress.connect(self.on_upload_progress)
+        self.upload_worker.signals.finished.connect(self.on_upload_done)
+        self.upload_worker.signals.failed.connect(self.on_upload_failed)
+        self.upload_worker.signals.cancelled.connect(self.on_upload_cancelled)
+        self.start_worker(self.upload_worker)
+        self.update_cancel_button()
+
+    def on_upload_progress(self, done, total):
+        if total and done < total:
+            self.upload_btn.setText(f"Uploading {done * 100 // total}%")
+        else:
+            self.upload_btn.setText("Analyzing...")
+
+    def end_upload(self, label):
+        self.upload_worker = None
+        self.update_cancel_button()
+        self.upload_btn.setText(label)
+        self.upload_btn.setEnabled(True)
+
+    def on_upload_done(self, response):
+        if response.status_code in [200, 201]:
+            res_json = response.json()
+            self.current_dataset_id = res_json.get("id")
+            self.data = res_json.get("summary", res_json)
+
+            self.update_dashboard()
+            self.fetch_history()
+            self.end_upload("Analyze")
+        else:
+            self.end_upload("Analyze Dataset")
+
+    def on_upload_failed(self, error):
+        self.end_upload("Analyze Dataset")
+        QMessageBox.critical(self, "Error", f"Failed: {error}")
+
+    def on_upload_cancelled(self):
+        self.end_upload("Analyze Dataset")
 
     def load_history_item(self, index):
         if index <= 0: return
@@ -438,114 +501,57 @@ class ChemVizDesktop(QWidget):
         if not self.current_dataset_id:
             QMessageBox.warning(self, "Error", "No dataset loaded.")
             return
+        if self.download_worker:
+            return
 
         default_name = f"chemviz_report_{self.current_dataset_id}.pdf"
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Report", default_name, "PDF Files (*.pdf)")
 
         if file_path:
-            try:
-                url = f"{API_BASE}/report/{self.current_dataset_id}/"
-                response = requests.get(
-                    url,
-                    headers=self.auth_headers(),
-                    stream=True
-                )
-
-                if response.status_code == 200:
-                    with open(file_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    # The QMessageBox call here will now be visible
-                    QMessageBox.information(self, "Success", "Report downloaded successfully!")
-                else:
-                    QMessageBox.warning(self, "Failed", f"Server error: {response.status_code}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
+            self.download_worker = Worker(download_report, self.client, self.current_dataset_id, file_path)
+            self.download_worker.signals.progress.connect(self.on_download_progress)
+            self.download_worker.signals.finished.connect(self.on_download_done)
+            self.download_worker.signals.failed.connect(self.on_download_failed)
+            self.download_worker.signals.cancelled.connect(self.end_download)
+            self.start_worker(self.download_worker)
+            self.update_cancel_button()
+            self.download_btn.setEnabled(False)
+
+    def on_download_progress(self, done, total):
+        if total:
+            self.download_btn.setText(f"Downloading {done * 100 // total}%")
+        else:
+            self.download_btn.setText(f"Downloading {done // 1024} KB")
+
+    def end_download(self):
+        self.download_worker = None
+        self.update_cancel_button()
+        self.download_btn.setText("Download Report")
+        self.download_btn.setEnabled(True)
+
+    def on_download_done(self, status_code):
+        self.end_download()
+        if status_code == 200:
+            QMessageBox.information(self, "Success", "Report downloaded successfully!")
+        else:
+            QMessageBox.warning(self, "Failed", f"Server error: {status_code}")
+
+    def on_download_failed(self, error):
+        self.end_download()
+        QMessageBox.critical(self, "Error", error)
 
     def update_dashboard(self):
-        while self.res_layout.count():
-            item = self.res_layout.takeAt(0)
-            if item.widget(): item.widget().deleteLater()
-            elif item.layout(): self.clear_layout(item.layout())
-
-        self.placeholder_lbl = None
-
-        # Dashboard Header with Download
-        dash_header = QHBoxLayout()
-        dash_title = QLabel("Analysis Results")
-        dash_title.setStyleSheet("font-size: 18px; font-weight: 800; color: #1e293b;")
-        dash_header.addWidget(dash_title)
-        dash_header.addStretch()
-        
-        self.download_btn = QPushButton("Download Report")
-        self.download_btn.setObjectName("SecondaryBtn")
-        self.download_btn.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.download_btn.clicked.connect(self.download_report)
-        dash_header.addWidget(self.download_btn)
-        
-        self.res_layout.addLayout(dash_header)
-
-        # Stats Row
-        stats_grid = QGridLayout()
-        stats_grid.setSpacing(20)
-        stats_grid.addWidget(ModernStatBox("Samples", f"{self.data.get('count', 0)}"), 0, 0)
-        stats_grid.addWidget(ModernStatBox("Flowrate", f"{self.data.get('avg_flowrate', 0):.1f}"), 0, 1)
-        stats_grid.addWidget(ModernStatBox("Pressure", f"{self.data.get('avg_pressure', 0):.1f}"), 0, 2)
-        stats_grid.addWidget(ModernStatBox("Temperature", f"{self.data.get('avg_temperature', 0):.1f}"), 0, 3)
-        self.res_layout.addLayout(stats_grid)
-
-        # Charts Area
-        self.figure = Figure(figsize=(10, 5), facecolor='white', tight_layout=True)
-        self.canvas = FigureCanvas(self.figure)
-        self.canvas.setParent(self.res_card)
-        self.canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.canvas.updateGeometry()
-        self.res_layout.addWidget(self.canvas)
-
-        # Pie Chart
-        ax1 = self.figure.add_subplot(121)
-        dist = self.data.get("type_distribution", {})
-        if dist:
-            colors = ["#6366f1", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6"]
-            ax1.pie(dist.values(), labels=dist.keys(), autopct="%1.1f%%", 
-                   startangle=140, colors=colors, 
-                   wedgeprops={'edgecolor': 'white', 'linewidth': 1.5})
-            ax1.set_title("Equipment Distribution", fontsize=10, fontweight='bold', color='#475569')
-
-        # Bar Graph
-        ax2 = self.figure.add_subplot(122)
-        metrics = ['Flow', 'Press', 'Temp']
-        values = [
-            self.data.get('avg_flowrate', 0), 
-            self.data.get('avg_pressure', 0), 
-            self.data.get('avg_temperature', 0)
-        ]
-        
-        bars = ax2.bar(metrics, values, color="#818cf8", width=0.5)
-        ax2.set_title("PERFORMANCE AVERAGE", fontsize=10, fontweight='bold', color='#475569')
-        
-        for bar in bars:
-            yval = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2, yval + 1, f'{yval:.1f}', 
-                    ha='center', va='bottom', fontsize=8, color='#64748b')
-
-        ax2.spines['top'].set_visible(False)
-        ax2.spines['right'].set_visible(False)
-        ax2.yaxis.grid(True, linestyle='-', alpha=0.15)
-        
-        self.canvas.draw()
-        QApplication.processEvents()
-
-    def clear_layout(self, layout):
-        while layout.count():
-            child = layout.takeAt(0)
-            if child.widget(): child.widget().deleteLater()
-            elif child.layout(): self.clear_layout(child.layout())
-    
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        if hasattr(self, 'canvas') and self.canvas:
-            self.canvas.draw_idle()
+        if self.dashboard is None:
+            self.res_layout.removeWidget(self.placeholder_lbl)
+            self.placeholder_lbl.deleteLater()
+            self.placeholder_lbl = None
+
+            self.dashboard = Dashboard(self.res_card)
+            self.dashboard.download_btn.clicked.connect(self.download_report)
+            self.download_btn = self.dashboard.download_btn
+            self.res_layout.addWidget(self.dashboard)
+
+        self.dashboard.update_summary(self.data)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -555,6 +561,6 @@ if __name__ == "__main__":
         if login.exec() != QDialog.DialogCode.Accepted:
             sys.exit()
 
-        window = ChemVizDesktop(login.token)
+        window = ChemVizDesktop(login.client)
         window.show()
         app.exec()
@@ -0,0 +1,75 @@
+"""
+Background workers for network calls.
+
+Every HTTP request the desktop app makes runs on ``QThreadPool`` through a
+``Worker``, so the GUI thread never blocks. The worker reports back through
+Qt signals, which are delivered on the GUI thread:
+
+    worker = Worker(fetch, url)
+    worker.signals.finished.connect(self.on_loaded)
+    worker.signals.failed.connect(self.on_error)
+    QThreadPool.globalInstance().start(worker)
+
+The wrapped function receives the worker as its first argument. It can call
+``worker.report_progress(done, total)`` and should check
+``worker.raise_if_cancelled()`` between chunks of work; ``worker.checkpoint``
+does both and fits the ``on_progress`` hooks of ``ApiClient``.
+"""
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class Cancelled(Exception):
+    pass
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    progress = pyqtSignal("qint64", "qint64")  # bytes done, bytes total (0 if unknown)
+
+
+class Worker(QRunnable):
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def raise_if_cancelled(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def report_progress(self, done, total=0):
+        self.signals.progress.emit(int(done), int(total or 0))
+
+    def checkpoint(self, done, total=0):
+        """Progress callback for transfers: report, and stop if cancelled."""
+        self.raise_if_cancelled()
+        self.report_progress(done, total)
+
+    def run(self):
+        try:
+            result = self.fn(self, *self.args, **self.kwargs)
+        except Cancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            if self.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.failed.emit(str(e))
+        else:
+            if self.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)